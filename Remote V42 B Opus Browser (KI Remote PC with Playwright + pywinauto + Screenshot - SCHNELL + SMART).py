@@ -14,102 +14,198 @@ Neu in V42 B:
 - Mini-DOM Extraktion (aus V41)
 """
 
-import os, sys, json, re, base64, threading, time, subprocess, platform
+import os, sys, json, re, base64, threading, time, subprocess, platform, queue, itertools, secrets, argparse, signal, socket
+_T_START = time.perf_counter()   # für "GUI bereit nach …"
+import importlib
+import sqlite3
 from io import BytesIO
 import tkinter as tk
 from tkinter import ttk, Text, Scrollbar, Toplevel
 import requests
-from PIL import Image, ImageTk
-import tempfile
-from collections import Counter
-
-# Document Libraries - werden bei Bedarf installiert
-DOCX_AVAILABLE = False
-XLSX_AVAILABLE = False
-PPTX_AVAILABLE = False
-
-try:
-    from docx import Document
-    from docx.shared import Pt, Inches
-    DOCX_AVAILABLE = True
-except ImportError:
-    pass
-
-try:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment
-    XLSX_AVAILABLE = True
-except ImportError:
-    pass
-
-try:
-    from pptx import Presentation
-    from pptx.util import Inches as PptxInches, Pt as PptxPt
-    PPTX_AVAILABLE = True
-except ImportError:
-    pass
-
-try:
-    import pyautogui
-    from playwright.sync_api import sync_playwright
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError as e:
-    print(f"FEHLER: {e}")
-    if 'playwright' in str(e).lower():
-        PLAYWRIGHT_AVAILABLE = False
-    else:
-        sys.exit(1)
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageTk, ImageChops
+import tempfile, random, functools, hashlib, glob, codecs, mmap, math
+from collections import Counter, OrderedDict, defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import MISSING, dataclass, field, fields
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote, quote_plus
 
 IS_WINDOWS = platform.system() == 'Windows'
 
-PYWINAUTO_AVAILABLE = False
-if IS_WINDOWS:
-    try:
-        from pywinauto import Application
-        PYWINAUTO_AVAILABLE = True
-    except:
-        pass
-
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 LLM_CONFIG_DIR = os.path.join(SCRIPT_DIR, "Auswahl llm")
 SYSTEM_PROMPT_FILE = os.path.join(SCRIPT_DIR, "system_prompt_gui_v42b.txt")
+TRACE_DIR = os.path.join(SCRIPT_DIR, "traces")
+RESPONSE_CACHE_FILE = os.path.join(SCRIPT_DIR, "llm_cache.sqlite")
+CAPABILITY_FILE = os.path.join(SCRIPT_DIR, "capabilities.json")
 
 # Einzige Stelle für den GUI-Namen – hier anpassen
 APP_TITLE = "Remote V42 B - KI Remote PC with Playwright + pywinauto + Screenshot"
 
 
-def install_doc_libraries():
-    """Installiert fehlende Dokumentbibliotheken"""
-    global DOCX_AVAILABLE, XLSX_AVAILABLE, PPTX_AVAILABLE
-    
-    libs = []
-    if not DOCX_AVAILABLE: libs.append('python-docx')
-    if not XLSX_AVAILABLE: libs.append('openpyxl')
-    if not PPTX_AVAILABLE: libs.append('python-pptx')
-    
-    if libs:
-        print(f"📦 Installiere: {', '.join(libs)}...")
+# ═══════════════════════════════════════════════════════════════════════════════
+# FÄHIGKEITEN (optionale Backends erst bei Bedarf laden)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Name → (Modul für den Import-Test, pip-Paket, nur Windows)
+CAPABILITIES = {
+    'docx': ('docx', 'python-docx', False),
+    'xlsx': ('openpyxl', 'openpyxl', False),
+    'pptx': ('pptx', 'python-pptx', False),
+    'pyautogui': ('pyautogui', 'pyautogui', False),
+    'playwright': ('playwright.sync_api', 'playwright', False),
+    'pywinauto': ('pywinauto', 'pywinauto', True),
+}
+
+
+class CapabilityRegistry:
+    """Welche Backends importierbar sind – gecacht in capabilities.json.
+
+    Der Schlüssel aus Interpreter und installierten Paketversionen macht den
+    Start billig: ohne Änderung wird nichts importiert, erst die erste echte
+    Nutzung lädt das Modul (load). Nach einem Update wird einmal neu geprüft.
+    """
+
+    def __init__(self, path=CAPABILITY_FILE):
+        self.path, self.lock = path, threading.RLock()
+        self.key = self.fingerprint()
         try:
-            subprocess.run([sys.executable, '-m', 'pip', 'install'] + libs + ['-q'],
-                          capture_output=True, timeout=120)
-            # Neu importieren
-            if not DOCX_AVAILABLE:
-                try:
-                    from docx import Document
-                    DOCX_AVAILABLE = True
-                except: pass
-            if not XLSX_AVAILABLE:
-                try:
-                    from openpyxl import Workbook
-                    XLSX_AVAILABLE = True
-                except: pass
-            if not PPTX_AVAILABLE:
-                try:
-                    from pptx import Presentation
-                    PPTX_AVAILABLE = True
-                except: pass
-        except Exception as e:
-            print(f"⚠️ Installation fehlgeschlagen: {e}")
+            with open(path, encoding='utf-8') as f:
+                cached = json.load(f)
+        except: cached = {}
+        self.probes = cached.get('probes', {}) if cached.get('key') == self.key else {}
+
+    @staticmethod
+    def fingerprint():
+        # Versionen aus den dist-info-Ordnernamen (importlib.metadata allein kostet ~70 ms)
+        want = {pkg.lower().replace('-', '_') for _, pkg, _ in CAPABILITIES.values()}
+        dists = []
+        for d in sys.path:
+            try: names = os.listdir(d or '.')
+            except OSError: continue
+            dists += sorted(n for n in names if n.endswith(('.dist-info', '.egg-info'))
+                            and n.split('-')[0].lower().replace('.', '_') in want)
+        # Ohne Desktop (DISPLAY) scheitert pyautogui auch bei gleichen Versionen
+        env = [sys.executable, sys.version, platform.platform(), IS_WINDOWS or bool(os.environ.get('DISPLAY')), dists]
+        return hashlib.sha256(json.dumps(env, sort_keys=True).encode()).hexdigest()[:16]
+
+    def available(self, name):
+        if CAPABILITIES[name][0] in sys.modules:
+            return True
+        if name not in self.probes:
+            self.load(name)
+        return self.probes[name]['ok']
+
+    def known(self, name):
+        """Stand ohne Import (für Anzeigen): geladen oder laut Cache vorhanden"""
+        return CAPABILITIES[name][0] in sys.modules or self.probes.get(name, {}).get('ok', False)
+
+    def error(self, name):
+        return self.probes.get(name, {}).get('error', '')
+
+    def load(self, name):
+        """Modul importieren (nur beim ersten Mal teuer); None, wenn es fehlt"""
+        mod_name, _, win_only = CAPABILITIES[name]
+        if mod_name in sys.modules:
+            return sys.modules[mod_name]
+        with self.lock:
+            probe = self.probes.get(name)
+            if probe and not probe['ok']:
+                return None
+            t = time.perf_counter()
+            try:
+                if win_only and not IS_WINDOWS:
+                    raise ImportError("nur unter Windows")
+                mod, err = importlib.import_module(mod_name), ""
+            except Exception as e:
+                mod, err = None, f"{type(e).__name__}: {e}"
+            if not probe or probe['ok'] != (mod is not None):
+                self.probes[name] = {'ok': mod is not None, 'error': err, 'ms': round((time.perf_counter() - t) * 1000)}
+                self.save()
+            return mod
+
+    def forget(self, names=None):
+        """Nach einer Installation neu prüfen"""
+        with self.lock:
+            for n in names or list(self.probes):
+                self.probes.pop(n, None)
+            self.key = self.fingerprint()
+
+    def save(self):
+        try:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'key': self.key, 'probes': self.probes}, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError: pass
+
+    def missing(self):
+        return [n for n, (_, _, win_only) in CAPABILITIES.items()
+                if not (win_only and not IS_WINDOWS) and not self.available(n)]
+
+
+class LazyModule:
+    """Platzhalter für ein Backend-Modul: importiert beim ersten Attributzugriff"""
+
+    def __init__(self, cap):
+        self._cap, self._mod = cap, None
+
+    def __getattr__(self, attr):
+        if self._mod is None:
+            self._mod = CAPS.load(self._cap)
+            if self._mod is None:
+                raise ImportError(f"{self._cap} nicht verfügbar: {CAPS.error(self._cap)}")
+        return getattr(self._mod, attr)
+
+
+CAPS = CapabilityRegistry()
+pyautogui = LazyModule('pyautogui')
+
+
+def probe_capabilities(on_done=None):
+    """Alle Backends im Hintergrund prüfen (füllt capabilities.json) – nur beim Programmstart,
+    nie beim Import; on_done(fehlende) danach"""
+    def run():
+        missing = CAPS.missing()
+        if on_done:
+            on_done(missing)
+    t = threading.Thread(target=run, daemon=True, name='caps-probe')
+    t.start()
+    return t
+
+if IS_WINDOWS:
+    # Macht sonst pyautogui beim Import – der passiert jetzt erst später,
+    # Bildschirmgröße und Tk-Fenster sollen aber von Anfang an echte Pixel sehen
+    try:
+        import ctypes
+        ctypes.windll.user32.SetProcessDPIAware()
+    except: pass
+
+
+def install_dependencies(log=print):
+    """Fehlende Pakete per pip installieren – nur explizit (--setup), nie beim normalen Start"""
+    missing = CAPS.missing()
+    if not missing:
+        log("✅ Alle optionalen Pakete vorhanden\n")
+        return True, ""
+    pkgs = [CAPABILITIES[n][1] for n in missing]
+    log(f"📦 Installiere: {', '.join(pkgs)}...\n")
+    try:
+        r = subprocess.run([sys.executable, '-m', 'pip', 'install'] + pkgs + ['-q'],
+                           capture_output=True, text=True, timeout=600)
+    except Exception as e:
+        log(f"⚠️ Installation fehlgeschlagen: {e}\n")
+        return False, str(e)
+    CAPS.forget(missing)
+    still = CAPS.missing()
+    if r.returncode or still:
+        log(f"⚠️ Fehlt weiterhin: {', '.join(CAPABILITIES[n][1] for n in still) or '-'} {r.stderr.strip()[-300:]}\n")
+        return False, r.stderr.strip()[-300:]
+    log("✅ Installiert\n")
+    return True, ""
 
 
 class FailureTracker:
@@ -173,14 +269,18 @@ PowerPoint (.pptx):
 ═══════════════════════════════════════════════════════════════════════════════
 
 Du bekommst automatisch eine Liste der klickbaren Elemente im Browser.
-→ Nutze die EXAKTEN Selektoren aus der Liste!
+Format: 12 a "Text" →/link   |   5 input:search ph="Suchen"
+→ Klicke/tippe per Nummer: {"action": "playwright_click", "index": 12}
+Danach kommen nur noch ÄNDERUNGEN zur letzten vollen Liste:
+  +id neu   -id entfernt   ~id geändert   (volle Liste erneut: {"action": "get_dom"})
 
 ═══════════════════════════════════════════════════════════════════════════════
 🎯 KRITISCHE REGELN FÜR ÜBERSICHTEN
 ═══════════════════════════════════════════════════════════════════════════════
 
 ⚠️ NIEMALS "done" wenn read_file FEHLGESCHLAGEN ist!
-⚠️ Bei JEDER Übersicht: run_commands → read_file → done
+⚠️ Bei JEDER Übersicht: run_commands → done (die Ausgabe kommt direkt zurück, KEIN Umweg über Datei + read_file)
+⚠️ exit ≠ 0 oder Timeout = Befehl fehlgeschlagen → anderen Befehl versuchen
 
 ═══════════════════════════════════════════════════════════════════════════════
 🔧 AKTIONEN
@@ -188,14 +288,15 @@ Du bekommst automatisch eine Liste der klickbaren Elemente im Browser.
 
 DOKUMENTE:
 {"action": "create_docx", "path": "...", "title": "...", "content": "..."}
-{"action": "create_xlsx", "path": "...", "data": [[...]]}
+{"action": "create_xlsx", "path": "...", "data": [[...]]}   ("append": true = Zeilen an bestehende Datei anhängen)
 {"action": "create_pptx", "path": "...", "slides": [{...}]}
 
 BROWSER:
-{"action": "browser_start", "url": "https://..."}
-{"action": "playwright_click", "selector": "CSS"}
-{"action": "playwright_type", "selector": "CSS", "text": "..."}
-{"action": "playwright_get_text", "selector": "body"}
+{"action": "browser_start", "url": "https://..."}   (Browser läuft schon → nur Navigation; "new_tab": true = neuer Tab)
+{"action": "playwright_click", "index": 12}             (Nummer aus der Mini-DOM-Liste)
+{"action": "playwright_type", "index": 5, "text": "..."}
+{"action": "playwright_click", "selector": "CSS"}        (nur wenn kein Index passt)
+{"action": "playwright_get_text", "selector": "body", "query": "Preis Lieferzeit"}   (relevanteste Abschnitte; query = wonach du suchst)
 {"action": "get_dom"}
 
 MAUS/TASTATUR:
@@ -204,12 +305,14 @@ MAUS/TASTATUR:
 {"action": "pywinauto_type", "text": "...", "auto_enter": false}
 
 SYSTEM:
-{"action": "run_commands", "commands": ["start notepad"]}
-{"action": "read_file", "path": "%TEMP%\\datei.txt"}
+{"action": "run_commands", "commands": ["systeminfo", "ipconfig /all"]}   (Ausgabe + Exit-Code im nächsten Schritt; laufen nacheinander, "parallel": true = unabhängige gleichzeitig, "timeout": 60)
+{"action": "run_commands", "commands": ["start notepad"]}   (start/Programme mit Fenster: nur starten, keine Ausgabe)
+{"action": "read_file", "path": "%TEMP%\\datei.txt"}   (vorhandene Dateien; Zeilen kommen nummeriert, max. 8000 Zeichen)
+{"action": "read_file", "path": "...\\app.log", "tail": 50}   ("head": n, "grep": "Fehler|Error" + "context": 2, "offset"/"length" in Bytes)
 
 KONTROLLE:
-{"action": "screenshot", "reason": "..."}
-{"action": "wait"}
+{"action": "screenshot", "reason": "..."}   (unverändert → nur Hinweis, geändert → ggf. Ausschnitt; "full": true = ganzes Bild)
+{"action": "wait", "seconds": 2}   (wartet bis Seite/Bildschirm ruhig, höchstens seconds)
 {"action": "done", "message": "Kurz!"}
 
 Max 30 Schritte. EINE JSON-Aktion pro Antwort! KURZ ANTWORTEN!
@@ -238,7 +341,7 @@ def save_system_prompt(prompt_text):
 
 def create_docx_file(path, title=None, content=""):
     """Erstellt ein Word-Dokument direkt via Python"""
-    if not DOCX_AVAILABLE:
+    if not CAPS.available('docx'):
         return False, "python-docx nicht installiert"
     
     try:
@@ -250,8 +353,8 @@ def create_docx_file(path, title=None, content=""):
         if title:
             heading = doc.add_heading(title, level=1)
         
-        # Content kann mehrzeilig sein
-        for paragraph in content.split('\n\n'):
+        # Content kann mehrzeilig sein oder direkt eine Folge von Absätzen
+        for paragraph in (content.split('\n\n') if isinstance(content, str) else content or ()):
             if paragraph.strip():
                 doc.add_paragraph(paragraph.strip())
         
@@ -266,26 +369,73 @@ def create_docx_file(path, title=None, content=""):
         return False, str(e)
 
 
-def create_xlsx_file(path, data=None, sheet_name="Tabelle1"):
-    """Erstellt eine Excel-Tabelle direkt via Python"""
-    if not XLSX_AVAILABLE:
+XLSX_WIDTH_SAMPLE = 200    # Zeilen, aus denen die Spaltenbreiten geschätzt werden
+XLSX_MAX_WIDTH = 60
+
+
+def _xlsx_widths(rows, widths=None):
+    """Spaltenbreiten (Zeichen) aus einer Stichprobe von Zeilen"""
+    widths = widths or {}
+    for row in rows:
+        for i, v in enumerate(row, 1):
+            if v is not None:
+                widths[i] = max(widths.get(i, 0), min(XLSX_MAX_WIDTH, len(str(v)) + 2))
+    return widths
+
+
+def create_xlsx_file(path, data=None, sheet_name=None, append=False):
+    """Erstellt eine Excel-Tabelle direkt via Python.
+
+    data darf jede Zeilenfolge sein (Liste oder Iterator/Generator): neue Dateien
+    werden im write_only-Modus gestreamt, der Speicher bleibt bei 100k Zeilen flach.
+    append=True hängt an eine bestehende Datei/Tabelle an (die wird dafür geladen).
+    """
+    if not CAPS.available('xlsx'):
         return False, "openpyxl nicht installiert"
     
     try:
-        from openpyxl import Workbook
+        from openpyxl import Workbook, load_workbook
+        from openpyxl.cell import WriteOnlyCell
         from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
         
-        wb = Workbook()
-        ws = wb.active
-        ws.title = sheet_name
+        rows = (r if isinstance(r, (list, tuple)) else [r] for r in (data or ()))
+        sample = list(itertools.islice(rows, XLSX_WIDTH_SAMPLE))
+        bold = Font(bold=True)   # ein Style-Objekt für alle Kopfzellen
         
-        if data:
-            for row_idx, row in enumerate(data, 1):
-                for col_idx, value in enumerate(row, 1):
-                    cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                    # Erste Zeile fett (Header)
-                    if row_idx == 1:
-                        cell.font = Font(bold=True)
+        append = append and os.path.exists(path)
+        if append:
+            wb = load_workbook(path)
+            ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.create_sheet(sheet_name) if sheet_name else wb.active
+            header = not any(True for _ in ws.iter_rows(values_only=True))   # leere Tabelle → Kopfzeile
+            widths = {}
+            for i in range(1, ws.max_column + 1):
+                dim = ws.column_dimensions[get_column_letter(i)]
+                if dim.customWidth:
+                    widths[i] = dim.width
+            for i, w in _xlsx_widths(sample, widths).items():
+                ws.column_dimensions[get_column_letter(i)].width = w
+            written = 0
+            for row in itertools.chain(sample, rows):
+                ws.append(row)
+                if header and not written:
+                    for cell in ws[ws.max_row]:
+                        cell.font = bold
+                written += 1
+        else:
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet(sheet_name or "Tabelle1")
+            # Breiten müssen im write_only-Modus vor der ersten Zeile stehen
+            for i, w in _xlsx_widths(sample).items():
+                ws.column_dimensions[get_column_letter(i)].width = w
+            written = 0
+            for row in itertools.chain(sample, rows):
+                if not written:
+                    row = [WriteOnlyCell(ws, value=v) for v in row]
+                    for cell in row:
+                        cell.font = bold
+                ws.append(row)
+                written += 1
         
         # Verzeichnis erstellen falls nötig
         dir_path = os.path.dirname(path)
@@ -293,14 +443,14 @@ def create_xlsx_file(path, data=None, sheet_name="Tabelle1"):
             os.makedirs(dir_path, exist_ok=True)
         
         wb.save(path)
-        return True, f"Gespeichert: {path}"
+        return True, f"Gespeichert: {path} ({written} Zeilen{' angehängt' if append else ''})"
     except Exception as e:
         return False, str(e)
 
 
 def create_pptx_file(path, slides=None, title=None):
     """Erstellt eine PowerPoint-Präsentation direkt via Python"""
-    if not PPTX_AVAILABLE:
+    if not CAPS.available('pptx'):
         return False, "python-pptx nicht installiert"
     
     try:
@@ -312,9 +462,9 @@ def create_pptx_file(path, slides=None, title=None):
         if not slides:
             slides = [{"title": title or "Präsentation", "content": ""}]
         
-        for slide_data in slides:
+        for n, slide_data in enumerate(slides):
             # Titelfolie oder Inhaltsfolie
-            if slides.index(slide_data) == 0:
+            if n == 0:
                 slide_layout = prs.slide_layouts[0]  # Titelfolie
             else:
                 slide_layout = prs.slide_layouts[1]  # Titel + Inhalt
@@ -348,7 +498,14 @@ def create_pptx_file(path, slides=None, title=None):
 # STANDARD-FUNKTIONEN
 # ═══════════════════════════════════════════════════════════════════════════════
 
+DESKTOP_LOCK = threading.RLock()   # Maus/Tastatur: immer nur eine Agent-Sitzung
+
+
 def get_desktop_size():
+    if IS_WINDOWS:
+        # Wie pyautogui.size(), aber ohne dessen Import beim GUI-Start
+        try: return ctypes.windll.user32.GetSystemMetrics(0), ctypes.windll.user32.GetSystemMetrics(1)
+        except: pass
     try: return pyautogui.size()
     except: return 1920, 1080
 
@@ -363,17 +520,147 @@ def press_key(key):
         key_map = {'return': 'enter', 'enter': 'enter', 'tab': 'tab', 'escape': 'esc'}
         pyautogui.press(key_map.get(key.lower(), key.lower()))
 
-def take_screenshot():
-    img = pyautogui.screenshot()
-    tmp_path = os.path.join(tempfile.gettempdir(), f'screenshot_v42_{int(time.time()*1000)}.png')
-    img.save(tmp_path)
+# Screenshot-Pipeline: einmal kodieren, auf Modellgröße skalieren
+SCREENSHOT_MAX_SIDE = 1568      # längste Seite fürs Modell (0 = Originalgröße)
+SCREENSHOT_FORMAT = 'JPEG'      # PNG, JPEG oder WEBP
+SCREENSHOT_QUALITY = 80
+IMAGE_MIME = {'PNG': 'image/png', 'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+
+# Hintergrund-Aufgaben abseits des Agent-Threads (Datei speichern, Zwischenablage)
+_BACKGROUND = ThreadPoolExecutor(max_workers=2, thread_name_prefix='remote-bg')
+
+
+def encode_image(img, fmt=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY, max_side=SCREENSHOT_MAX_SIDE):
+    """Skaliert (falls nötig) und kodiert genau einmal.
+
+    Gibt (bytes, mime, scale) zurück; scale = Bildpixel pro Bildschirmpixel.
+    """
+    fmt = (fmt or 'PNG').upper().replace('JPG', 'JPEG')
+    if fmt not in IMAGE_MIME: fmt = 'PNG'
+    w, h = img.size
+    scale = min(1.0, max_side / max(w, h)) if max_side else 1.0
+    if scale < 1.0:
+        img = img.resize((max(1, round(w * scale)), max(1, round(h * scale))),
+                         Image.Resampling.BILINEAR, reducing_gap=2.0)
+    if fmt == 'JPEG' and img.mode != 'RGB':
+        img = img.convert('RGB')
     buf = BytesIO()
-    img.save(buf, format='PNG')
-    
-    # Automatisch in Zwischenablage kopieren
-    copy_image_to_clipboard(img)
-    
-    return base64.b64encode(buf.getvalue()).decode('utf-8'), tmp_path, img
+    if fmt == 'PNG':
+        img.save(buf, format='PNG', compress_level=1)
+    else:
+        img.save(buf, format=fmt, quality=quality)
+    return buf.getvalue(), IMAGE_MIME[fmt], scale
+
+
+def _write_bytes(path, data):
+    try:
+        with open(path, 'wb') as f:
+            f.write(data)
+    except OSError:
+        pass
+
+
+def take_screenshot(max_side=SCREENSHOT_MAX_SIDE, fmt=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY,
+                    save=True, clipboard=True, img=None):
+    """Screenshot → (b64, tmp_path, img, meta).
+
+    meta: mime, scale, size (gesendete Größe), bytes, encode_ms. Speichern
+    und Zwischenablage laufen im Hintergrund; tmp_path ist None ohne save.
+    Mit img wird statt einer neuen Aufnahme dieses Bild verarbeitet.
+    """
+    if img is None:
+        img = pyautogui.screenshot()
+    t = time.perf_counter()
+    data, mime, scale = encode_image(img, fmt, quality, max_side)
+    meta = {'mime': mime, 'scale': scale, 'bytes': len(data),
+            'size': (round(img.size[0] * scale), round(img.size[1] * scale)),
+            'encode_ms': (time.perf_counter() - t) * 1000}
+    tmp_path = None
+    if save:
+        ext = mime.split('/')[1].replace('jpeg', 'jpg')
+        tmp_path = os.path.join(tempfile.gettempdir(), f'screenshot_v42_{int(time.time()*1000)}.{ext}')
+        _BACKGROUND.submit(_write_bytes, tmp_path, data)
+    if clipboard:
+        # Automatisch in Zwischenablage kopieren
+        _BACKGROUND.submit(copy_image_to_clipboard, img)
+    return base64.b64encode(data).decode('ascii'), tmp_path, img, meta
+
+
+class FrameDiffer:
+    """Erkennt unveränderte oder nur teilweise veränderte Screenshots.
+
+    Hält vom zuletzt gesendeten Bild ein verkleinertes Graustufenbild plus
+    dHash. compare() liefert ('unchanged' | 'region' | 'full', box) – box
+    ist das Rechteck der geänderten Kacheln in Bildschirm-Koordinaten.
+    """
+    THUMB = 4            # Vergleich auf 1/4 Auflösung
+    TILE = 32            # Kachelgröße im Vorschaubild (= 128 Bildschirm-Pixel)
+    PIXEL_THRESHOLD = 24
+    MAX_REGION = 0.4     # größerer Änderungsanteil → ganzes Bild senden
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.ref = self.ref_hash = self.ref_size = None
+        self.full_bytes, self.full_size = 0, (0, 0)
+        self.stats = {'unchanged': 0, 'region': 0, 'full': 0, 'bytes_saved': 0, 'tokens_saved': 0}
+
+    @staticmethod
+    def dhash(gray):
+        small = gray.resize((9, 8), Image.Resampling.BILINEAR).tobytes()
+        bits = 0
+        for row in range(8):
+            for col in range(8):
+                bits = (bits << 1) | (small[row * 9 + col] > small[row * 9 + col + 1])
+        return bits
+
+    def _thumb(self, img):
+        w, h = img.size
+        return img.convert('L').resize((max(1, w // self.THUMB), max(1, h // self.THUMB)),
+                                        Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+    def compare(self, img):
+        thumb = self._thumb(img)
+        h = self.dhash(thumb)
+        if self.ref is None or self.ref_size != img.size:
+            return 'full', None, thumb, h
+        mask = ImageChops.difference(thumb, self.ref).point(lambda v: 255 if v > self.PIXEL_THRESHOLD else 0)
+        bbox = mask.getbbox()
+        if bbox is None and h == self.ref_hash:
+            return 'unchanged', None, thumb, h
+        if bbox is None:
+            return 'full', None, thumb, h
+        tw, th = thumb.size
+        dirty = []
+        for ty in range(bbox[1] // self.TILE * self.TILE, bbox[3], self.TILE):
+            for tx in range(bbox[0] // self.TILE * self.TILE, bbox[2], self.TILE):
+                if mask.crop((tx, ty, min(tx + self.TILE, tw), min(ty + self.TILE, th))).getbbox():
+                    dirty.append((tx, ty))
+        n_tiles = (-(-tw // self.TILE)) * (-(-th // self.TILE))
+        x0 = min(x for x, _ in dirty); y0 = min(y for _, y in dirty)
+        x1 = min(max(x for x, _ in dirty) + self.TILE, tw); y1 = min(max(y for _, y in dirty) + self.TILE, th)
+        box = tuple(min(v * self.THUMB, lim) for v, lim in
+                    zip((x0, y0, x1, y1), (img.size[0], img.size[1], img.size[0], img.size[1])))
+        area = (box[2] - box[0]) * (box[3] - box[1]) / (img.size[0] * img.size[1])
+        if len(dirty) / n_tiles > self.MAX_REGION or area > self.MAX_REGION:
+            return 'full', None, thumb, h
+        return 'region', box, thumb, h
+
+    def update(self, img, thumb=None, h=None):
+        """Merkt sich das gesendete Bild als neue Referenz"""
+        self.ref = thumb if thumb is not None else self._thumb(img)
+        self.ref_hash = h if h is not None else self.dhash(self.ref)
+        self.ref_size = img.size
+
+
+def screenshot_note(meta, screen_size):
+    """Hinweis fürs Modell zur Bildgröße; umgerechnet wird in AgentSession.to_screen"""
+    w, h = meta['size']
+    if meta['scale'] >= 1.0:
+        return f"📸 Screenshot {w}x{h} = Bildschirm-Koordinaten"
+    return (f"📸 Screenshot verkleinert auf {w}x{h} (Bildschirm {screen_size[0]}x{screen_size[1]}): "
+            "Klick-Koordinaten einfach aus dem Bild angeben – sie werden umgerechnet")
 
 
 def copy_image_to_clipboard(img):
@@ -417,6 +704,36 @@ def mouse_click(x=None, y=None, button='left', clicks=1):
         return False, str(e)
 
 
+def _parse_bool(value):
+    return value.strip().lower() in ('ja', 'yes', 'true', '1', 'an', 'on')
+
+
+# Optionale Zeilen in den LLM-Dateien: (Label, Schlüssel, Konverter)
+LLM_OPTIONAL_SETTINGS = [
+    ('Stream', 'stream', _parse_bool),
+    ('Anfragen pro Minute', 'rpm', float),
+    ('Max Retries', 'max_retries', int),
+    ('Parallele Anfragen', 'max_parallel', int),
+    ('Cache Preisfaktor', 'cache_price_factor', lambda v: float(v.replace(',', '.'))),
+    ('Kontext Budget', 'context_budget', int),
+    ('Prompt Cache', 'prompt_cache', _parse_bool),
+    ('Antwort Cache', 'response_cache', _parse_bool),
+    ('Antwort Cache Stunden', 'response_cache_hours', lambda v: float(v.replace(',', '.'))),
+    ('Antwort Cache MB', 'response_cache_mb', int),
+    ('Makros', 'macros', _parse_bool),
+    ('Plan Modus', 'plan_mode', _parse_bool),
+    ('Tool Calling', 'tool_calling', _parse_bool),
+    ('Hedge LLM', 'hedge', str),
+    ('Hedge Perzentil', 'hedge_percentile', lambda v: float(v.replace(',', '.'))),
+    ('Hedge Sekunden', 'hedge_delay', lambda v: float(v.replace(',', '.'))),
+    ('Screenshot Format', 'screenshot_format', str.upper),
+    ('Screenshot Qualität', 'screenshot_quality', int),
+    ('Screenshot Max', 'screenshot_max_side', int),
+    ('Screenshot Speichern', 'screenshot_save', _parse_bool),
+    ('Screenshot Zwischenablage', 'screenshot_clipboard', _parse_bool),
+]
+
+
 def load_llm_configs(config_dir):
     configs = {}
     if not os.path.exists(config_dir): return configs
@@ -439,9 +756,19 @@ def load_llm_configs(config_dir):
                         break
                 if 'token_price' not in config:
                     config['token_price'] = 10.0
+                for label, key, conv in LLM_OPTIONAL_SETTINGS:
+                    m = re.search(rf'^{re.escape(label)}:\s*(.+)$', content, re.M)
+                    if m:
+                        try: config[key] = conv(m.group(1).strip())
+                        except ValueError: pass
                 if 'url' in config and 'api_key' in config and 'model' in config:
                     configs[filename.replace('.txt', '')] = config
             except: pass
+    for config in configs.values():
+        # "Hedge LLM: <Dateiname>" → zweiter Anbieter für langsame Antworten (nur eine Ebene)
+        backup = configs.get(config.get('hedge', ''))
+        if backup is not None and backup is not config:
+            config['hedge_config'] = backup
     return configs
 
 
@@ -486,28 +813,982 @@ Kosten pro Million: {token_price}
         return False, str(e)
 
 
-def call_llm(config, messages, ss_b64=None):
-    headers = {"Authorization": f"Bearer {config['api_key']}", "Content-Type": "application/json"}
+class JsonStreamParser:
+    """Inkrementeller Klammer-Scanner für gestreamte Antworten.
+
+    Bekommt die Token-Stücke nacheinander und meldet, sobald das erste
+    vollständige JSON-Objekt geschlossen ist (gleiche Logik wie parse_json).
+    """
+    def __init__(self):
+        self.text = ""
+        self.start = -1
+        self.end = -1
+        self.depth = 0
+        self.in_string = self.escape = False
+        self.broken = False
+        self.result = None
+        self._pos = 0
+
+    @property
+    def done(self):
+        return self.result is not None
+
+    def feed(self, chunk):
+        if self.done or self.broken or not chunk:
+            return self.result
+        self.text += chunk
+        while self._pos < len(self.text):
+            i, c = self._pos, self.text[self._pos]
+            self._pos += 1
+            if self.start < 0:
+                if c == '{':
+                    self.start, self.depth = i, 1
+                continue
+            if self.escape: self.escape = False; continue
+            if c == '\\': self.escape = True; continue
+            if c == '"': self.in_string = not self.in_string; continue
+            if self.in_string: continue
+            if c == '{': self.depth += 1
+            elif c == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        self.result = json.loads(self.text[self.start:i+1])
+                        self.end = i + 1
+                    except ValueError:
+                        # Kaputtes Objekt → Rest abwarten, parse_json entscheidet
+                        self.broken = True
+                    break
+        return self.result
+
+    def json_text(self):
+        """Text bis einschließlich des ersten Objekts (Geplapper danach entfällt)"""
+        return self.text[:self.end] if self.done else self.text
+
+
+def cache_hint_style(config):
+    """Welche Cache-Hinweise der Anbieter versteht: 'anthropic', 'openai' oder None"""
+    model = config.get('model', '').lower()
+    if 'claude' in model or 'anthropic' in model:
+        return 'anthropic'  # cache_control wird von OpenRouter/Anthropic ausgewertet
+    if urlparse(config.get('url', '')).netloc.endswith('openai.com'):
+        return 'openai'  # automatisches Prefix-Caching, prompt_cache_key hilft beim Routing
+    return None
+
+
+def _build_llm_messages(messages, ss_b64=None, volatile=None, cache_style=None):
+    """Baut die API-Nachrichten.
+
+    volatile (Maus, Mini-DOM, Seitentext …) kommt als eigener Block ans
+    Ende; alles davor ist von Schritt zu Schritt byte-gleich und damit
+    cachebar. Bei cache_style 'anthropic' werden System-Prompt und das Ende
+    des stabilen Teils mit cache_control markiert.
+    """
+    mark = {"cache_control": {"type": "ephemeral"}} if cache_style == 'anthropic' else {}
     msgs = []
-    for m in messages[:-1]:
-        msgs.append({"role": m["role"], "content": m["content"]})
+    for i, m in enumerate(messages[:-1]):
+        if i == 0 and m["role"] == "system" and mark:
+            msgs.append({"role": "system", "content": [{"type": "text", "text": m["content"], **mark}]})
+        else:
+            msgs.append({"role": m["role"], "content": m["content"]})
     last = messages[-1]
+    parts = [{"type": "text", "text": last["content"], **(mark if volatile else {})}]
+    if volatile:
+        parts.append({"type": "text", "text": volatile})
     if ss_b64:
-        msgs.append({"role": last["role"], "content": [
-            {"type": "text", "text": last["content"]},
-            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{ss_b64}"}}
-        ]})
-    else:
+        url = ss_b64 if ss_b64.startswith('data:') else f"data:image/png;base64,{ss_b64}"
+        parts.append({"type": "image_url", "image_url": {"url": url}})
+    if len(parts) == 1 and not parts[0].get("cache_control"):
         msgs.append({"role": last["role"], "content": last["content"]})
-    
-    payload = {"model": config['model'], "messages": msgs, "max_tokens": 4000, "temperature": 0}
+    else:
+        msgs.append({"role": last["role"], "content": parts})
+    return msgs
+
+
+SSE_USAGE_DRAIN = 20.0          # Sekunden, die der Rest des Streams im Hintergrund auf usage gelesen wird (0 = aus)
+
+
+def _drain_usage(lines, r, done):
+    """Liest nach dem fertigen JSON im Hintergrund weiter bis zum usage-Chunk → done(usage)"""
+    usage, t_end = None, time.monotonic() + SSE_USAGE_DRAIN
     try:
-        r = requests.post(config['url'].rstrip('/')+'/chat/completions', headers=headers, json=payload, timeout=90)
-        if r.status_code == 200:
-            return r.json()['choices'][0]['message']['content'], None
-        return '{"action":"done","message":"API Error"}', f"Status {r.status_code}"
-    except Exception as e:
-        return '{"action":"done","message":"API Error"}', str(e)
+        for line in lines:
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[5:].strip()
+            if data == '[DONE]':
+                break
+            try:
+                usage = json.loads(data).get('usage') or usage
+            except (ValueError, AttributeError):
+                continue
+            if usage or time.monotonic() > t_end:
+                break
+    except Exception:
+        pass  # Verbindung weg → bleibt bei der Schätzung
+    finally:
+        r.close()
+        done(usage)
+
+
+def _read_sse_stream(r, on_delta=None, timing=None, cancel=None, on_first=None, drain=None):
+    """Liest eine SSE-Antwort bis zum ersten vollständigen JSON-Objekt.
+
+    Gibt (text, usage) zurück; usage steht erst im letzten Chunk
+    (stream_options.include_usage). Ohne drain wird die Verbindung nach dem
+    JSON geschlossen und usage ist None; mit drain liest ein Hintergrund-Thread
+    den Rest und ruft drain(usage) auf, während die Aktion schon läuft.
+    timing (dict mit 't_send') bekommt 'first_token' in Sekunden. Mit cancel
+    (gesetzt) oder on_first() → False endet das Lesen, timing['cancelled'].
+    """
+    parser = JsonStreamParser()
+    usage = None
+    calls = {}  # Tool-Calls kommen stückweise: index → name + arguments
+    r.encoding = 'utf-8'  # text/event-stream ohne charset → sonst latin-1
+    lines = r.iter_lines(decode_unicode=True)
+    draining = False
+    try:
+        for line in lines:
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[5:].strip()
+            if data == '[DONE]':
+                break
+            if cancel is not None and cancel.is_set():
+                timing['cancelled'] = True
+                break
+            try:
+                chunk = json.loads(data)
+                usage = chunk.get('usage') or usage
+                delta = (chunk.get('choices') or [{}])[0].get('delta') or {}
+            except (ValueError, AttributeError):
+                continue
+            for c in delta.get('tool_calls') or ():
+                slot = calls.setdefault(c.get('index', 0), {'name': '', 'arguments': ''})
+                fn = c.get('function') or {}
+                slot['name'] += fn.get('name') or ''
+                slot['arguments'] += fn.get('arguments') or ''
+            piece = delta.get('content') or ''
+            if (calls or piece) and timing is not None and 'first_token' not in timing:
+                timing['first_token'] = time.perf_counter() - timing['t_send']
+                if on_first and not on_first():
+                    timing['cancelled'] = True  # anderer Anbieter war schneller
+                    break
+            if not piece:
+                continue
+            parser.feed(piece)
+            if on_delta:
+                tail = len(parser.text) - parser.end if parser.done else 0
+                on_delta(piece[:len(piece) - tail])
+            if parser.done:
+                # Aktion steht fest → zurück zum Agenten; usage kommt ggf. im Hintergrund
+                if drain and not usage and SSE_USAGE_DRAIN > 0:
+                    threading.Thread(target=_drain_usage, args=(lines, r, drain), daemon=True,
+                                     name='sse-usage').start()
+                    draining = True
+                break
+    finally:
+        if not draining:
+            r.close()
+    if calls:
+        if timing is not None:
+            timing['tool_calls'] = len(calls)
+        return tool_calls_text([calls[k] for k in sorted(calls)]), usage
+    return parser.json_text(), usage
+
+
+class TokenBucket:
+    """Einfacher Token-Bucket: rate Anfragen pro Sekunde, burst auf Vorrat"""
+    def __init__(self, rate, burst=None):
+        self.rate = max(rate, 0.001)
+        self.capacity = burst or max(1.0, self.rate * 10)
+        self.tokens = self.capacity
+        self.t = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blockiert bis ein Token frei ist, gibt die Wartezeit zurück"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+_PROVIDER_BUCKETS = {}
+_PROVIDER_SLOTS = {}
+_PROVIDER_BUCKETS_LOCK = threading.Lock()
+_LLM_CLIENTS = {}
+_LLM_CLIENTS_LOCK = threading.Lock()
+
+
+def get_provider_bucket(config):
+    """Ein Bucket pro Anbieter-Host, egal wie viele Modelle darüber laufen"""
+    host = urlparse(config.get('url', '')).netloc or config.get('url', '')
+    with _PROVIDER_BUCKETS_LOCK:
+        if host not in _PROVIDER_BUCKETS:
+            _PROVIDER_BUCKETS[host] = TokenBucket(config.get('rpm', 120) / 60.0)
+        return _PROVIDER_BUCKETS[host]
+
+
+def get_provider_slots(config):
+    """Höchstens max_parallel gleichzeitige Anfragen pro Anbieter-Host (über alle Sitzungen)"""
+    host = urlparse(config.get('url', '')).netloc or config.get('url', '')
+    with _PROVIDER_BUCKETS_LOCK:
+        if host not in _PROVIDER_SLOTS:
+            _PROVIDER_SLOTS[host] = threading.BoundedSemaphore(max(1, config.get('max_parallel', 2)))
+        return _PROVIDER_SLOTS[host]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ANTWORT-CACHE (SQLite, opt-in)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_MOUSE_STATE_RE = re.compile(r'🖱️ Maus: -?\d+,-?\d+')
+
+
+def _normalize_content(content):
+    """Text ohne Whitespace-Unterschiede und Mausposition; Bilder nur als Digest"""
+    if isinstance(content, str):
+        return _MOUSE_STATE_RE.sub('🖱️ Maus', ' '.join(content.split()))
+    out = []
+    for part in content or ():
+        if part.get('type') == 'image_url':
+            url = part['image_url']['url']
+            out.append('img:' + hashlib.sha256(url[url.find(',') + 1:].encode('ascii', 'replace')).hexdigest())
+        else:
+            out.append(_normalize_content(part.get('text', '')))
+    # Ein Block oder mehrere (Prompt-Cache an/aus) → derselbe Schlüssel
+    return ' '.join(out)
+
+
+def response_cache_key(payload):
+    """Hash über Modell, Parameter und normalisierte Nachrichten (cache_control, Stream zählen nicht)"""
+    msgs = [[m['role'], _normalize_content(m.get('content'))] for m in payload['messages']]
+    blob = json.dumps([payload['model'], payload.get('temperature'), payload.get('max_tokens'), msgs],
+                      ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """LLM-Antworten auf der Platte: TTL in Sekunden, LRU-Verdrängung ab max_bytes.
+
+    Eine Verbindung für alle Sitzungen (WAL, Zugriffe über ein Lock). Die
+    Größe wird mitgezählt, damit put() nicht jedes Mal die Tabelle summiert.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_FILE, max_bytes=200 << 20, ttl=7 * 86400):
+        self.path, self.max_bytes, self.ttl = path, max_bytes, ttl
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, text TEXT, "
+                        "usage TEXT, created REAL, used REAL, size INTEGER, hits INTEGER DEFAULT 0)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses(used)")
+        with self.lock:
+            self._expire(time.time())
+
+    def _expire(self, now):
+        self.db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        self.size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """(text, usage) oder None; abgelaufene Einträge zählen als Fehltreffer"""
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT text, usage, created, size FROM responses WHERE key=?", (key,)).fetchone()
+            if row and now - row[2] > self.ttl:
+                self.db.execute("DELETE FROM responses WHERE key=?", (key,))
+                self.size -= row[3]
+                row = None
+            if not row:
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE responses SET used=?, hits=hits+1 WHERE key=?", (now, key))
+            self.hits += 1
+        return row[0], json.loads(row[1]) if row[1] else None
+
+    def put(self, key, model, text, usage=None):
+        now = time.time()
+        size = len(key) + len(text.encode('utf-8')) + 64
+        with self.lock:
+            old = self.db.execute("SELECT size FROM responses WHERE key=?", (key,)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?,?,?,?,?,?,?,0)",
+                            (key, model, text, json.dumps(usage) if usage else None, now, now, size))
+            self.size += size - (old[0] if old else 0)
+            if self.size > self.max_bytes:
+                self._evict(now)
+
+    def _evict(self, now):
+        """Erst Abgelaufenes, dann die am längsten unbenutzten Einträge bis 90 % der Grenze"""
+        self._expire(now)
+        excess = self.size - int(self.max_bytes * 0.9)
+        if excess <= 0:
+            return
+        drop, freed = [], 0
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY used"):
+            drop.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.db.executemany("DELETE FROM responses WHERE key=?", drop)
+        self.size -= freed
+
+    def stats(self):
+        with self.lock:
+            n = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {'entries': n, 'bytes': self.size, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.size = 0
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+_RESPONSE_CACHE = None
+
+
+def get_response_cache(config):
+    """Gemeinsamer Cache aller Sitzungen; TTL und Größe aus der aktuellen LLM-Datei"""
+    global _RESPONSE_CACHE
+    with _LLM_CLIENTS_LOCK:
+        if _RESPONSE_CACHE is None:
+            _RESPONSE_CACHE = ResponseCache()
+        _RESPONSE_CACHE.ttl = config.get('response_cache_hours', 168) * 3600
+        _RESPONSE_CACHE.max_bytes = config.get('response_cache_mb', 200) << 20
+        return _RESPONSE_CACHE
+
+
+class LLMClient:
+    """Ein Client pro LLM-Konfiguration.
+
+    Hält eine Keep-Alive-Session (kein TLS-Handshake pro Schritt), wiederholt
+    429/5xx mit Backoff (Retry-After wird beachtet) und drosselt über den
+    Token-Bucket des Anbieters. Threadsicher: alle Sitzungen teilen sich einen
+    Client; gleichzeitige Anfragen begrenzen die Slots des Anbieters.
+    """
+    RETRY_STATUS = (408, 409, 425, 429, 500, 502, 503, 504)
+    TOOLS_REJECTED_RE = re.compile(r'tool|function', re.I)  # 400/422 wegen Tool-Calling, nicht wegen Kontext/Bild/Modell
+
+    def __init__(self, config, max_retries=None, backoff=1.0, max_delay=30.0):
+        self.config = config
+        self.max_retries = config.get('max_retries', 4) if max_retries is None else max_retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.bucket = get_provider_bucket(config)
+        self.slots = get_provider_slots(config)
+        self.tools_off = False  # Anbieter hat tools abgelehnt → nur noch Text-JSON
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def endpoint(self):
+        return self.config['url'].rstrip('/') + '/chat/completions'
+
+    def retry_delay(self, attempt, response=None):
+        """Wartezeit vor dem nächsten Versuch; Retry-After hat Vorrang"""
+        ra = response.headers.get('Retry-After') if response is not None else None
+        if ra:
+            try:
+                return min(float(ra), self.max_delay)
+            except ValueError:
+                try:
+                    return min(max(parsedate_to_datetime(ra).timestamp() - time.time(), 0), self.max_delay)
+                except (TypeError, ValueError):
+                    pass
+        return min(self.backoff * (2 ** attempt) * (0.5 + random.random()), self.max_delay)
+
+    def build_payload(self, messages, ss_b64=None, volatile=None):
+        style = cache_hint_style(self.config) if self.config.get('prompt_cache', True) else None
+        payload = {"model": self.config['model'],
+                   "messages": _build_llm_messages(messages, ss_b64, volatile, style),
+                   "max_tokens": 4000, "temperature": 0}
+        if style == 'openai':
+            payload["prompt_cache_key"] = hashlib.sha256(
+                message_text(messages[0].get("content")).encode('utf-8')).hexdigest()[:32]
+        if self.config.get('tool_calling') and not self.tools_off:
+            payload["tools"] = tool_specs(bool(self.config.get('plan_mode')))
+            payload["tool_choice"] = "required"
+        if self.config.get('stream', True):
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    def chat(self, messages, ss_b64=None, on_delta=None, volatile=None, cancel=None, on_first=None):
+        """Gibt (text, fehler, info) zurück – text ist None, wenn alle Versuche scheitern.
+
+        Mit "Antwort Cache: ja" kommt eine schon bekannte Anfrage (gleiches
+        Modell, gleiche Nachrichten, gleiches Bild) aus dem SQLite-Cache;
+        info['cached'] ist dann True und die Nutzung 0 Tokens.
+        Für das Hedging (llm_chat): cancel (CancelToken) bricht ab, on_first()
+        wird beim ersten Token gefragt, ob diese Anfrage weiterlaufen soll.
+        Reißt ein Stream ab und es gibt einen neuen Versuch, bekommt on_delta
+        vorher None – der bisher gezeigte Text ist verworfen.
+        Lehnt der Anbieter tools ab (400/422 mit tools/function im Fehlertext),
+        geht die Anfrage sofort ohne tools nochmal raus; das zählt nicht als
+        Wiederholung. Gemerkt wird das am Client erst, wenn diese Anfrage klappt.
+        """
+        headers = {"Authorization": f"Bearer {self.config['api_key']}", "Content-Type": "application/json"}
+        payload = self.build_payload(messages, ss_b64, volatile)
+        stream = bool(payload.get("stream"))
+        info = {'attempts': 0, 'retry_wait': 0.0, 'rate_wait': 0.0, 'slot_wait': 0.0, 'usage': None}
+        err = None
+        deltas = on_delta
+        if deltas:
+            def on_delta(piece):
+                info['streamed'] = True
+                deltas(piece)
+        cache = get_response_cache(self.config) if self.config.get('response_cache') else None
+        if cache:
+            key = response_cache_key(payload)
+            hit = cache.get(key)
+            if hit:
+                info.update(cached=True, usage={'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0})
+                return hit[0], None, info
+        attempt = 0
+        while True:
+            if cancel is not None and cancel.is_set():
+                info['cancelled'] = True
+                return None, "abgebrochen", info
+            info['attempts'] = attempt + 1
+            info['rate_wait'] += self.bucket.acquire()
+            t_slot = time.perf_counter()
+            self.slots.acquire()
+            info['slot_wait'] += time.perf_counter() - t_slot
+            r = None
+            t_send = time.perf_counter()
+            try:
+                r = self.session.post(self.endpoint, headers=headers, json=payload, timeout=90, stream=stream)
+                # elapsed = Senden bis Antwort-Header (auch mit stream=True) → Time-to-first-byte
+                info['t_send'], info['ttfb'] = t_send, r.elapsed.total_seconds()
+                if cancel is not None and not cancel.attach(r):
+                    info['cancelled'] = True
+                    return None, "abgebrochen", info
+                if r.status_code == 200:
+                    if stream and 'text/event-stream' in r.headers.get('Content-Type', ''):
+                        later = Future()
+                        text, info['usage'] = _read_sse_stream(r, on_delta, info, cancel, on_first, later.set_result)
+                        if info['usage'] is None and not info.get('cancelled'):
+                            info['usage_later'] = later
+                    else:
+                        body = r.json()
+                        msg, info['usage'] = body['choices'][0]['message'], body.get('usage')
+                        text = msg.get('content') or ''
+                        if msg.get('tool_calls'):
+                            text, info['tool_calls'] = tool_calls_text(msg['tool_calls']), len(msg['tool_calls'])
+                        if on_first and not on_first():
+                            info['cancelled'] = True
+                    if info.get('cancelled'):
+                        return None, "abgebrochen", info
+                    PROVIDER_STATS.record(self.config, info.get('first_token', time.perf_counter() - t_send))
+                    if cache and text:
+                        try: cache.put(key, payload['model'], text, info['usage'])
+                        except sqlite3.Error: pass  # Cache-Fehler kosten nie die Antwort
+                    if info.get('tools_off'):
+                        self.tools_off = True
+                    return text, None, info
+                err = f"Status {r.status_code}"
+                retry = r.status_code in self.RETRY_STATUS
+                if r.status_code in (400, 422):
+                    try: detail = r.text[:300].strip()
+                    except: detail = ""
+                    if detail:
+                        err += f": {detail}"
+                    if "tools" in payload and self.TOOLS_REJECTED_RE.search(detail):
+                        # Kein Tool-Calling beim Anbieter → sofort nochmal als Text-JSON (parse_json),
+                        # ohne einen Versuch zu verbrauchen
+                        r.close()
+                        info['tools_off'] = True
+                        del payload["tools"], payload["tool_choice"]
+                        continue
+                r.close()
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                err, retry = str(e), True  # ChunkedEncodingError = Stream beim Lesen abgerissen
+            except Exception as e:
+                err, retry = str(e), False
+            finally:
+                self.slots.release()  # Backoff-Pausen belegen keinen Slot
+            if cancel is not None and cancel.is_set():
+                info['cancelled'] = True  # Fehler kam vom Schließen der Verbindung
+                return None, "abgebrochen", info
+            if not retry or attempt >= self.max_retries:
+                break
+            delay = self.retry_delay(attempt, r)
+            info['retry_wait'] += delay
+            if info.pop('streamed', False):
+                deltas(None)  # Teilantwort des abgerissenen Streams verwerfen
+            if cancel is not None: cancel.wait(delay)
+            else: time.sleep(delay)
+            attempt += 1
+        return None, err, info
+
+    def close(self):
+        self.session.close()
+
+
+def get_llm_client(config):
+    """Liefert den (wiederverwendeten) Client für eine Konfiguration"""
+    key = (config.get('url'), config.get('api_key'), config.get('model'))
+    with _LLM_CLIENTS_LOCK:
+        client = _LLM_CLIENTS.get(key)
+        if client is None:
+            client = _LLM_CLIENTS[key] = LLMClient(config)
+        client.config = config  # Optionen (Stream, Preis …) können sich geändert haben
+        return client
+
+
+def close_llm_clients():
+    global _RESPONSE_CACHE
+    with _LLM_CLIENTS_LOCK:
+        for client in _LLM_CLIENTS.values():
+            client.close()
+        _LLM_CLIENTS.clear()
+        if _RESPONSE_CACHE is not None:
+            _RESPONSE_CACHE.close()
+            _RESPONSE_CACHE = None
+
+
+def call_llm(config, messages, ss_b64=None, on_delta=None):
+    """Schickt den Verlauf an das LLM (über den gepoolten LLMClient).
+
+    Mit "Stream: ja" in der LLM-Datei wird per SSE gelesen: on_delta bekommt
+    die Teilstücke, und die Antwort steht fest, sobald das erste JSON-Objekt
+    komplett ist (der Rest wird nur noch im Hintergrund auf usage gelesen). Gibt (text, fehler) zurück; text ist None,
+    wenn auch nach allen Wiederholungen keine Antwort kam.
+    """
+    text, err, _ = llm_chat(config, messages, ss_b64, on_delta)
+    return text, err
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# HEDGING (zweiter Anbieter, wenn der erste zu lange schweigt)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+HEDGE_MIN_SAMPLES = 10          # bis dahin gilt "Hedge Sekunden" statt des Perzentils
+HEDGE_DEFAULT_DELAY = 4.0       # Sekunden bis zum ersten Token, bevor der zweite Anbieter startet
+HEDGE_MIN_DELAY = 0.3
+LATENCY_WINDOW = 200            # letzte Messungen pro Anbieter
+
+
+class ProviderStats:
+    """Zeit bis zum ersten Token und Hedge-Zähler pro Anbieter + Modell (alle Sitzungen)"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.data = {}
+
+    @staticmethod
+    def key(config):
+        return f"{urlparse(config.get('url', '')).netloc or config.get('url', '')} {config.get('model', '')}"
+
+    def _get(self, config):
+        k = self.key(config)
+        if k not in self.data:
+            self.data[k] = {'model': config.get('model', ''), 'first': deque(maxlen=self.window),
+                            'censored': deque(maxlen=self.window),
+                            'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'extra_cost': 0.0}
+        return self.data[k]
+
+    def record(self, config, first_token):
+        with self.lock:
+            st = self._get(config)
+            st['requests'] += 1
+            st['first'].append(first_token)
+
+    def record_censored(self, config, waited):
+        """Abgebrochener Verlierer: erstes Token kam nach mehr als waited s (nur Untergrenze)"""
+        with self.lock:
+            st = self._get(config)
+            st['requests'] += 1
+            st['censored'].append(waited)
+
+    def record_hedge(self, config, won, extra_cost):
+        """Beim primären Anbieter: Hedge ausgelöst, ob der zweite gewann, Kosten der verworfenen Anfrage"""
+        with self.lock:
+            st = self._get(config)
+            st['hedged'] += 1
+            st['hedge_wins'] += bool(won)
+            st['extra_cost'] += extra_cost
+
+    @staticmethod
+    def percentile(values, p):
+        """Nächster Rang, ohne Interpolation – reicht für 10–200 Messungen"""
+        v = sorted(values)
+        return v[min(len(v) - 1, max(0, math.ceil(p / 100 * len(v)) - 1))] if v else None
+
+    def deadline(self, config):
+        """Perzentil der gemessenen Zeiten; abgebrochene Anfragen können es nur anheben"""
+        with self.lock:
+            st = self._get(config)
+            first, censored = list(st['first']), list(st['censored'])
+        if len(first) < HEDGE_MIN_SAMPLES:
+            return config.get('hedge_delay', HEDGE_DEFAULT_DELAY)
+        p = config.get('hedge_percentile', 95)
+        est = self.percentile(first, p)
+        # Untergrenzen über dem Schätzwert zählen mit (so langsam war es mindestens),
+        # darunter sagen sie nichts – sie dürfen die Frist nicht drücken
+        above = [c for c in censored if c > est]
+        if above:
+            est = self.percentile(first + above, p)
+        return max(HEDGE_MIN_DELAY, est)
+
+    def snapshot(self):
+        with self.lock:
+            out = {}
+            for k, st in self.data.items():
+                first = list(st['first'])
+                out[k] = {'model': st['model'], 'requests': st['requests'],
+                          **{f'p{p}': self.percentile(first, p) for p in (50, 95, 99)},
+                          'censored': len(st['censored']),
+                          'hedged': st['hedged'], 'hedge_rate': st['hedged'] / st['requests'] if st['requests'] else 0.0,
+                          'hedge_wins': st['hedge_wins'], 'extra_cost': round(st['extra_cost'], 6)}
+            return out
+
+    def summary(self, configs):
+        """Eine Zeile pro Anbieter für den Aufgaben-Abschluss"""
+        snap, lines = self.snapshot(), []
+        for config in configs:
+            st = snap.get(self.key(config))
+            if not st or not st['requests']:
+                continue
+            if st['p50'] is None:
+                line = f"🏁 {st['model']}: 1. Token – nur abgebrochene Anfragen (n={st['requests']})"
+            else:
+                line = (f"🏁 {st['model']}: 1. Token p50 {st['p50']:.2f}s p95 {st['p95']:.2f}s "
+                        f"p99 {st['p99']:.2f}s (n={st['requests']})")
+            if st['censored']:
+                line += f", {st['censored']}x abgebrochen"
+            if st['hedged']:
+                line += (f" | Hedge {st['hedged']}x ({st['hedge_rate']:.0%}), {st['hedge_wins']}x schneller, "
+                         f"+{st['extra_cost']:.4f} €")
+            lines.append(line)
+        return "\n".join(lines)
+
+
+PROVIDER_STATS = ProviderStats()
+
+
+class CancelToken:
+    """Abbruch einer laufenden Anfrage: weckt auch einen blockierten Stream-Leser"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.response = None
+
+    def attach(self, r):
+        """Antwort merken, damit set() sie schließen kann; False = schon abgebrochen"""
+        with self.lock:
+            if self.event.is_set():
+                r.close()
+                return False
+            self.response = r
+            return True
+
+    def set(self):
+        with self.lock:
+            self.event.set()
+            r = self.response
+        if r is not None:
+            # close() wartete auf das Puffer-Lock des Lesers – shutdown weckt ihn sofort
+            try: r.raw._connection.sock.shutdown(socket.SHUT_RDWR)
+            except: pass
+
+    def is_set(self):
+        return self.event.is_set()
+
+    def wait(self, timeout):
+        return self.event.wait(timeout)
+
+
+def llm_chat(config, messages, ss_b64=None, on_delta=None, volatile=None):
+    """LLM-Anfrage wie LLMClient.chat; mit "Hedge LLM: <Datei>" als Wettlauf.
+
+    Liefert der primäre Anbieter bis zur Frist (Perzentil seiner bisherigen
+    Zeiten bis zum ersten Token) nichts, geht dieselbe Anfrage an den zweiten.
+    Wer zuerst ein Token liefert, führt (nur sein Text geht an on_delta); der
+    andere läuft still weiter und wird erst abgebrochen, wenn der Führende
+    fertig ist. Scheitert der Führende auch nach dem ersten Token noch, übernimmt
+    der andere (gepufferter Text, on_delta bekommt vorher None) – läuft keiner
+    mehr, wird der zweite Anbieter jetzt gestartet. info['hedge'] beschreibt
+    den Wettlauf.
+    """
+    backup = config.get('hedge_config')
+    if not backup:
+        return get_llm_client(config).chat(messages, ss_b64, on_delta, volatile)
+    cond, lead, runs = threading.Condition(), [], []
+    shown = [False]   # hat on_delta schon Text des Führenden bekommen?
+
+    def ok(run):
+        return run['done'] and run['result'][0] is not None
+
+    def start(cfg):
+        run = {'config': cfg, 'cancel': CancelToken(), 'result': None, 'done': False, 't0': time.perf_counter(),
+               't_first': None, 'buf': []}
+
+        def first():
+            with cond:
+                run['t_first'] = time.perf_counter()
+                if not lead:
+                    lead.append(run)
+                cond.notify_all()
+            return True   # abgebrochen wird erst, wenn der Führende fertig ist
+
+        def forward(piece):
+            with cond:
+                if lead and lead[0] is run:
+                    if on_delta:
+                        shown[0] = piece is not None
+                        on_delta(piece)
+                elif piece is None:
+                    run['buf'].clear()   # eigener neuer Versuch
+                else:
+                    run['buf'].append(piece)
+
+        def work():
+            try:
+                run['result'] = get_llm_client(cfg).chat(messages, ss_b64, forward, volatile, run['cancel'], first)
+            except Exception as e:
+                run['result'] = (None, str(e), {'attempts': 1, 'retry_wait': 0.0, 'rate_wait': 0.0,
+                                                'slot_wait': 0.0, 'usage': None})
+            finally:
+                with cond:
+                    run['done'] = True
+                    if lead and lead[0] is run and not ok(run):
+                        # Führender nach dem ersten Token gescheitert → der andere übernimmt
+                        lead.clear()
+                        if on_delta and shown[0]:
+                            on_delta(None)
+                            shown[0] = False
+                        nxt = [o for o in runs if not o['done'] and o['t_first'] is not None]
+                        if nxt:
+                            lead.append(nxt[0])
+                            for piece in nxt[0]['buf']:
+                                if on_delta:
+                                    shown[0] = True
+                                    on_delta(piece)
+                            nxt[0]['buf'].clear()
+                    cond.notify_all()
+
+        with cond:
+            runs.append(run)
+        threading.Thread(target=work, name='llm-hedge', daemon=True).start()
+        return run
+
+    def settled():
+        return (lead and ok(lead[0])) or any(ok(r) for r in runs) or all(r['done'] for r in runs)
+
+    primary = start(config)
+    deadline = PROVIDER_STATS.deadline(config)
+    with cond:
+        cond.wait_for(lambda: lead or primary['done'], deadline)
+        fire = not lead and not ok(primary)
+        failover = primary['done'] and not ok(primary)  # primärer schon gescheitert, nicht nur langsam
+    hedge = start(backup) if fire else None
+    with cond:
+        cond.wait_for(settled)
+        if not any(ok(r) for r in runs) and hedge is None:
+            failover = True   # primärer nach dem ersten Token gescheitert, zweiter war noch nicht gestartet
+    if failover and hedge is None:
+        hedge = start(backup)
+        with cond:
+            cond.wait_for(settled)
+    with cond:
+        done = [r for r in lead + runs if ok(r)]
+    best = done[0] if done else primary if primary['done'] else hedge
+    text, err, info = best['result']
+    if hedge:
+        loser = hedge if best is primary else primary
+        loser['cancel'].set()
+        # Der Verlierer hat den Prompt trotzdem verarbeitet → Mehrkosten (geschätzt, ohne Bild);
+        # ein gescheiterter primärer Anbieter kostet nichts extra
+        extra = 0.0 if failover else (sum(estimate_tokens(message_text(m.get('content'))) + 4 for m in messages)
+                                      + estimate_tokens(volatile or '')) / 1_000_000 * loser['config'].get('token_price', 10.0)
+        PROVIDER_STATS.record_hedge(config, best is hedge, extra)
+        if loser['t_first'] is not None and not ok(loser):
+            # Verlierer hatte schon ein Token (wird nur wegen des Abbruchs nicht gezählt) → echter Messwert
+            PROVIDER_STATS.record(loser['config'], loser['t_first'] - loser['t0'])
+        elif not ok(loser):
+            # Kein Messwert, nur Untergrenze: so lange kam vom Verlierer nichts
+            PROVIDER_STATS.record_censored(loser['config'], time.perf_counter() - loser['t0'])
+        info = dict(info, hedge={'deadline': deadline, 'winner': best['config'].get('model'),
+                                 'loser': loser['config'].get('model'), 'extra_cost': extra,
+                                 'failover': failover})
+    return text, err, info
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TOKEN-BUCHHALTUNG
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_TOKENIZER = None
+
+
+def _get_tokenizer():
+    """tiktoken falls installiert, sonst None (→ Schätzung über Zeichen)"""
+    global _TOKENIZER
+    if _TOKENIZER is None:
+        try:
+            import tiktoken
+            _TOKENIZER = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _TOKENIZER = False
+    return _TOKENIZER or None
+
+
+@functools.lru_cache(maxsize=8192)
+def estimate_tokens(text):
+    """Lokale Token-Schätzung, pro Text gecacht (der Verlauf wird nur einmal gezählt)"""
+    if not text:
+        return 0
+    enc = _get_tokenizer()
+    if enc:
+        return len(enc.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def estimate_image_tokens(width, height, model=''):
+    """Bild-Tokens nach den veröffentlichten Formeln der Anbieter"""
+    if not width or not height:
+        return 0
+    if 'claude' in model.lower() or 'anthropic' in model.lower():
+        r = min(1.0, 1568 / max(width, height))
+        return int(width * r * height * r / 750)
+    # OpenAI-Stil: in 2048er Box, kurze Seite 768, dann 512er Kacheln
+    r = min(1.0, 2048 / max(width, height))
+    w, h = width * r, height * r
+    r = min(1.0, 768 / min(w, h))
+    w, h = w * r, h * r
+    return 85 + 170 * (-(-int(w) // 512)) * (-(-int(h) // 512))
+
+
+def message_text(content):
+    """Text eines Nachrichteninhalts (String oder Liste von Teilen)"""
+    if isinstance(content, str):
+        return content
+    return "".join(p.get('text', '') for p in content or [] if isinstance(p, dict))
+
+
+class TokenLedger:
+    """Zählt Tokens pro Schritt/Aufgabe aus dem usage-Block der API.
+
+    Fehlt usage (z.B. abgebrochener Stream), wird lokal geschätzt; solche
+    Einträge sind mit estimated=True markiert und erscheinen mit "~".
+    Kommt usage nachträglich (Stream-Rest im Hintergrund), ersetzt amend()
+    die Schätzung.
+    """
+    FIELDS = ('prompt', 'completion', 'cached', 'image')
+
+    def __init__(self, price=10.0, cache_factor=1.0):
+        self.price = price
+        self.cache_factor = cache_factor
+        self.steps = []
+        self.task = dict.fromkeys(self.FIELDS, 0)
+        self.session = dict.fromkeys(self.FIELDS, 0)
+        self.task_estimated = False
+        self.lock = threading.Lock()
+
+    def start_task(self):
+        self.steps = []
+        self.task = dict.fromkeys(self.FIELDS, 0)
+        self.task_estimated = False
+
+    def reset(self):
+        self.start_task()
+        self.session = dict.fromkeys(self.FIELDS, 0)
+
+    @staticmethod
+    def parse_usage(usage):
+        if not usage:
+            return None
+        details = usage.get('prompt_tokens_details') or {}
+        cached = (details.get('cached_tokens') or usage.get('cache_read_input_tokens')
+                  or usage.get('prompt_cache_hit_tokens') or usage.get('cached_tokens') or 0)
+        return {'prompt': int(usage.get('prompt_tokens') or 0),
+                'completion': int(usage.get('completion_tokens') or 0),
+                'cached': int(cached),
+                'image': int(details.get('image_tokens') or usage.get('image_tokens') or 0)}
+
+    def record(self, usage, messages=(), response='', image_size=None, model=''):
+        entry = self.parse_usage(usage)
+        image_est = estimate_image_tokens(*image_size, model) if image_size else 0
+        if entry is None:
+            prompt = sum(estimate_tokens(message_text(m.get('content'))) + 4 for m in messages)
+            entry = {'prompt': prompt + image_est, 'completion': estimate_tokens(response or ''),
+                     'cached': 0, 'image': image_est, 'estimated': True}
+            self.task_estimated = True
+        else:
+            entry['image'] = entry['image'] or image_est
+            entry['estimated'] = False
+        entry['cost'] = self.cost(entry)
+        with self.lock:
+            for k in self.FIELDS:
+                self.task[k] += entry[k]
+                self.session[k] += entry[k]
+            self.steps.append(entry)
+        return entry
+
+    def amend(self, entry, usage):
+        """Ersetzt die Schätzung eines Eintrags durch den nachgelesenen usage-Block"""
+        exact = self.parse_usage(usage)
+        if exact is None or not entry.get('estimated'):
+            return False
+        exact['image'] = exact['image'] or entry['image']
+        with self.lock:
+            current = any(e is entry for e in self.steps)  # sonst gehört er zur vorigen Aufgabe
+            for k in self.FIELDS:
+                self.session[k] += exact[k] - entry[k]
+                if current:
+                    self.task[k] += exact[k] - entry[k]
+            entry.update(exact, estimated=False)
+            entry['cost'] = self.cost(entry)
+            if current:
+                self.task_estimated = any(e['estimated'] for e in self.steps)
+        return True
+
+    def cost(self, t):
+        uncached = t['prompt'] - t['cached'] + t['completion']
+        return (uncached + t['cached'] * self.cache_factor) / 1_000_000 * self.price
+
+    @staticmethod
+    def hit_rate(t):
+        """Anteil der Prompt-Tokens, die aus dem Anbieter-Cache kamen"""
+        return t['cached'] / t['prompt'] if t['prompt'] else 0.0
+
+    @staticmethod
+    def total(t):
+        return t['prompt'] + t['completion']
+
+    def step_summary(self, entry):
+        est = "~" if entry.get('estimated') else ""
+        parts = [f"📥{est}{entry['prompt']:,}", f"📤{est}{entry['completion']:,}"]
+        if entry['cached'] or not entry.get('estimated'):
+            parts.append(f"💾{entry['cached']:,} ({self.hit_rate(entry):.0%})")
+        if entry['image']: parts.append(f"🖼{entry['image']:,}")
+        return (" ".join(parts) + f" ≈ {self.cost(entry):.4f} €").replace(",", ".")
+
+    def task_summary(self):
+        est = "~" if self.task_estimated else ""
+        t = self.task
+        return (f"Aufgabe: {est}{self.total(t):,} (📥{t['prompt']:,} 📤{t['completion']:,} "
+                f"💾{t['cached']:,}={self.hit_rate(t):.0%} 🖼{t['image']:,}) ≈ {self.cost(t):.3f} € | "
+                f"{len(self.steps)} Schritte").replace(",", ".")
 
 
 def parse_json(txt):
@@ -533,13 +1814,13 @@ def parse_json(txt):
         m = re.search(r'"action"\s*:\s*"([^"]+)"', txt)
         if m:
             result = {"action": m.group(1)}
-            for f in ['selector', 'url', 'key', 'path', 'reason', 'message', 'text', 'title_re', 'title', 'content', 'sheet_name']:
+            for f in ['selector', 'url', 'key', 'path', 'reason', 'message', 'text', 'title_re', 'title', 'content', 'sheet_name', 'grep', 'query']:
                 fm = re.search(rf'"{f}"\s*:\s*"([^"]*)"', txt)
                 if fm: result[f] = fm.group(1)
-            for f in ['x', 'y']:
+            for f in ['x', 'y', 'index', 'seconds', 'timeout', 'offset', 'length', 'head', 'tail', 'context']:
                 fm = re.search(rf'"{f}"\s*:\s*(\d+)', txt)
                 if fm: result[f] = int(fm.group(1))
-            for f in ['auto_enter', 'double']:
+            for f in ['auto_enter', 'double', 'full', 'new_tab', 'parallel', 'detach', 'append']:
                 fm = re.search(rf'"{f}"\s*:\s*(true|false)', txt, re.I)
                 if fm: result[f] = fm.group(1).lower() == 'true'
             if result['action'] == 'run_commands':
@@ -563,6 +1844,604 @@ def parse_json(txt):
         return {"action": "wait"}
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# AKTIONS-SCHEMAS (Tool-Calling + Prüfung)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+ACTION_SCHEMAS = {}
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+_JSON_TYPES = {str: 'string', int: 'integer', float: 'number', bool: 'boolean', list: 'array'}
+
+
+def _opt(doc=None, default=None, **schema):
+    """Optionales Feld; schema (items, enum) landet im JSON-Schema"""
+    if default is not None:
+        schema['default'] = default
+    return field(default=default, metadata=dict(schema, **({'description': doc} if doc else {})))
+
+
+def _req(doc=None, **schema):
+    return field(metadata=dict(schema, **({'description': doc} if doc else {})))
+
+
+def action_schema(name):
+    """Registriert eine Aktion: Dataclass mit __slots__, Docstring = Tool-Beschreibung"""
+    def wrap(cls):
+        cls = dataclass(**_SLOTS)(cls)
+        cls.action = name
+        ACTION_SCHEMAS[name] = cls
+        return cls
+    return wrap
+
+
+@action_schema('create_docx')
+class CreateDocx:
+    """Word-Dokument erstellen"""
+    path: str = _req("Zielpfad .docx, %USERPROFILE% erlaubt")
+    title: str = _opt()
+    content: str = _opt("Text, Absätze mit \\n")
+
+
+@action_schema('create_xlsx')
+class CreateXlsx:
+    """Excel-Tabelle erstellen (erste Zeile = Kopf)"""
+    path: str = _req("Zielpfad .xlsx")
+    data: list = _opt("Zeilen als Listen", items={'type': 'array', 'items': {}})
+    sheet_name: str = _opt()
+    append: bool = _opt("Zeilen an bestehende Datei/Tabelle anhängen")
+
+
+@action_schema('create_pptx')
+class CreatePptx:
+    """PowerPoint-Präsentation erstellen"""
+    path: str = _req("Zielpfad .pptx")
+    title: str = _opt()
+    slides: list = _opt(items={'type': 'object', 'properties': {'title': {'type': 'string'},
+                                                                'content': {'type': 'string'}}})
+
+
+@action_schema('mouse_click')
+class MouseClick:
+    """Klick auf Koordinaten im zuletzt gesendeten Screenshot (ohne x/y: an der aktuellen Mausposition)"""
+    together = ('x', 'y')
+    x: int = _opt()
+    y: int = _opt()
+    button: str = _opt(enum=['left', 'right', 'middle'])
+    double: bool = _opt()
+
+
+@action_schema('browser_start')
+class BrowserStart:
+    """Browser öffnen bzw. laufenden Browser navigieren (URL-Trick für Suchen!)"""
+    url: str = _req()
+    new_tab: bool = _opt()
+
+
+@action_schema('get_dom')
+class GetDom:
+    """Volle Mini-DOM-Liste im nächsten Schritt statt Änderungen"""
+
+
+@action_schema('playwright_click')
+class PlaywrightClick:
+    """Element anklicken: index aus der Mini-DOM-Liste (bevorzugt), CSS-Selektor oder sichtbarer Text"""
+    one_of = ('index', 'selector', 'text')
+    index: int = _opt()
+    selector: str = _opt()
+    text: str = _opt()
+
+
+@action_schema('playwright_type')
+class PlaywrightType:
+    """Text in ein Eingabefeld schreiben"""
+    text: str = _req()
+    index: int = _opt()
+    selector: str = _opt()
+
+
+@action_schema('playwright_get_text')
+class PlaywrightGetText:
+    """Relevanteste Textabschnitte der Seite lesen"""
+    selector: str = _opt()
+    query: str = _opt("wonach gesucht wird (Rangfolge)")
+    reason: str = _opt()
+
+
+@action_schema('playwright_navigate')
+class PlaywrightNavigate:
+    """Aktuellen Tab auf eine URL schicken"""
+    url: str = _req()
+
+
+@action_schema('playwright_scroll')
+class PlaywrightScroll:
+    """Seite scrollen"""
+    direction: str = _opt(enum=['down', 'up'])
+
+
+@action_schema('key')
+class Key:
+    """Taste oder Kombination drücken, z.B. Return, ctrl+s"""
+    key: str = _req()
+
+
+@action_schema('run_commands')
+class RunCommands:
+    """Konsolenbefehle ausführen; Ausgabe + Exit-Code kommen im nächsten Schritt"""
+    commands: list = _req(items={'type': 'string'})
+    parallel: bool = _opt()
+    detach: bool = _opt()
+    timeout: int = _opt("Sekunden")
+
+
+@action_schema('read_file')
+class ReadFile:
+    """Textdatei lesen (max. 8000 Zeichen, nummerierte Zeilen)"""
+    path: str = _req()
+    head: int = _opt()
+    tail: int = _opt()
+    grep: str = _opt("Regex")
+    context: int = _opt()
+    offset: int = _opt("Byte-Offset")
+    length: int = _opt("Bytes")
+
+
+@action_schema('pywinauto_connect')
+class PywinautoConnect:
+    """Mit einem Fenster verbinden"""
+    title: str = _opt()
+    title_re: str = _opt()
+
+
+@action_schema('pywinauto_type')
+class PywinautoType:
+    """Text ins aktive Fenster tippen"""
+    text: str = _req()
+    auto_enter: bool = _opt()
+    title_re: str = _opt()
+
+
+@action_schema('screenshot')
+class Screenshot:
+    """Screenshot für den nächsten Schritt"""
+    reason: str = _opt()
+    full: bool = _opt("ganzes Bild statt Ausschnitt erzwingen")
+
+
+@action_schema('wait')
+class Wait:
+    """Warten bis Seite/Bildschirm ruhig ist"""
+    seconds: float = _opt()
+
+
+@action_schema('done')
+class Done:
+    """Aufgabe erledigt – kurze Meldung (1-2 Sätze)"""
+    message: str = _opt(default="Fertig")
+
+
+@action_schema('plan')
+class Plan:
+    """Mehrere Aktionen direkt nacheinander (nur im Plan-Modus); Schritte optional mit if/expect"""
+    steps: list = _req(items={'type': 'object', 'properties': {'action': {'type': 'string'}},
+                              'required': ['action']})
+
+
+def _coerce(v, typ, meta):
+    """Wert an den Feldtyp angleichen, wo es eindeutig ist ("640" → 640, "true" → True)"""
+    if 'enum' in meta and v not in meta['enum']:
+        raise ValueError(v)
+    if typ is bool:
+        if isinstance(v, str):
+            if v.strip().lower() in ('true', 'ja', 'yes', '1'): return True
+            if v.strip().lower() in ('false', 'nein', 'no', '0'): return False
+            raise ValueError(v)
+        if isinstance(v, (int, float)): return bool(v)
+        raise TypeError(v)
+    if isinstance(v, bool) and typ in (int, float):
+        raise TypeError(v)
+    if typ is int: return int(round(float(v)))
+    if typ is float: return float(str(v).replace(',', '.'))
+    if typ is str:
+        if isinstance(v, (dict, list)): raise TypeError(v)
+        return str(v)
+    if typ is list:
+        if not isinstance(v, list): raise TypeError(v)
+        if meta.get('items', {}).get('type') == 'string':
+            return [str(x) for x in v if isinstance(x, (str, int, float))]
+    return v
+
+
+def validate_action(data):
+    """Prüft eine Aktion gegen ihr Schema: (aktion, None) oder (None, fehler).
+
+    Typen werden angeglichen, unbekannte Felder fallen weg, Pflichtfelder
+    müssen da sein; one_of (mindestens eins davon) und together (alle oder
+    keins) im Schema prüfen Feldgruppen. Plan-Schritte werden einzeln geprüft
+    und behalten "if"/"expect".
+    """
+    if not isinstance(data, dict):
+        return None, "keine JSON-Aktion"
+    name = data.get('action')
+    cls = ACTION_SCHEMAS.get(name)
+    if cls is None:
+        return None, f"unbekannte Aktion '{name}' (erlaubt: {', '.join(ACTION_SCHEMAS)})"
+    kwargs = {}
+    for f in fields(cls):
+        v = data.get(f.name)
+        if v is None or v == '' and f.type is not str:
+            if f.default is MISSING:
+                return None, f"{name}: Pflichtfeld '{f.name}' fehlt"
+            continue
+        try:
+            kwargs[f.name] = _coerce(v, f.type, f.metadata)
+        except (TypeError, ValueError):
+            want = f"eins von {f.metadata['enum']}" if 'enum' in f.metadata else _JSON_TYPES[f.type]
+            return None, f"{name}: '{f.name}' muss {want} sein, nicht {json.dumps(v, ensure_ascii=False)[:60]}"
+    one_of, together = getattr(cls, 'one_of', ()), getattr(cls, 'together', ())
+    if one_of and not any(k in kwargs for k in one_of):
+        return None, f"{name}: eins von {', '.join(one_of)} nötig"
+    if 0 < sum(k in kwargs for k in together) < len(together):
+        return None, f"{name}: {' und '.join(together)} nur zusammen"
+    action = cls(**kwargs)
+    out = {'action': name}
+    out.update((f.name, getattr(action, f.name)) for f in fields(cls) if getattr(action, f.name) is not None)
+    if name == 'plan':
+        steps = []
+        for k, st in enumerate(out['steps']):
+            checked, err = validate_action(st)
+            if err:
+                return None, f"plan Schritt {k + 1}: {err}"
+            steps.append(dict(checked, **{c: st[c] for c in ('if', 'expect') if isinstance(st.get(c), dict)}))
+        out['steps'] = steps
+    return out, None
+
+
+def parse_action(txt):
+    """Antworttext → (aktion, None) oder (None, fehler) – parse_json plus Schema-Prüfung.
+
+    Anders als parse_json wird eine unlesbare Antwort nicht still zu "wait".
+    """
+    data = parse_json(txt)
+    if data == {"action": "wait"} and not re.search(r'"action"\s*:\s*"wait"', txt or ''):
+        return None, "keine JSON-Aktion gefunden" if txt and txt.strip() else "leere Antwort"
+    return validate_action(data)
+
+
+@functools.lru_cache(maxsize=2)
+def tool_specs(plan=False):
+    """Alle Aktionen als OpenAI-kompatible tools-Liste (Plan nur im Plan-Modus)"""
+    specs = []
+    for name, cls in ACTION_SCHEMAS.items():
+        if name == 'plan' and not plan:
+            continue
+        props, required = {}, []
+        for f in fields(cls):
+            props[f.name] = {'type': _JSON_TYPES[f.type], **f.metadata}
+            if f.default is MISSING:
+                required.append(f.name)
+        specs.append({'type': 'function', 'function': {
+            'name': name, 'description': cls.__doc__,
+            'parameters': {'type': 'object', 'properties': props, 'required': required}}})
+    return specs
+
+
+def tool_calls_text(calls):
+    """Tool-Calls → Aktions-JSON wie im Text-Modus; mehrere Calls werden ein Plan"""
+    actions = []
+    for c in calls:
+        fn = c.get('function') or c
+        try:
+            args = json.loads(fn.get('arguments') or '{}')
+        except ValueError:
+            args = {}
+        action = {'action': fn.get('name')}
+        action.update((k, v) for k, v in (args if isinstance(args, dict) else {}).items() if k != 'action')
+        actions.append(action)
+    return json.dumps(actions[0] if len(actions) == 1 else {'action': 'plan', 'steps': actions}, ensure_ascii=False)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# KONTEXT-VERWALTUNG
+# ═══════════════════════════════════════════════════════════════════════════════
+
+STEP_LOG_HEADER = "📜 BISHERIGE SCHRITTE (kompaktiert):"
+DOM_BLOCK_MARK = "\n\n📋 "
+
+
+def summarize_action(data):
+    """Einzeilige Kurzform einer Aktion – Nutzlast (content, data, slides) entfällt"""
+    action = data.get('action', '?')
+    parts = [action]
+    for f in ('url', 'selector', 'index', 'path', 'key', 'title', 'title_re'):
+        if data.get(f) not in (None, ''):
+            parts.append(f"{f}={str(data[f])[:60]}")
+    if data.get('text'):
+        parts.append(f"text=\"{data['text'][:40]}\"")
+    if data.get('x') is not None and data.get('y') is not None:
+        parts.append(f"@{data['x']},{data['y']}")
+    if data.get('commands'):
+        parts.append(" | ".join(c[:50] for c in data['commands'][:3]))
+    if action == 'done' and data.get('message'):
+        parts.append(data['message'][:80])
+    if action == 'plan' and isinstance(data.get('steps'), list):
+        parts.append(" ; ".join(summarize_action(st) for st in data['steps'][:PLAN_MAX_ACTIONS] if isinstance(st, dict)))
+    return " ".join(parts)
+
+
+def assemble_context(msgs, dom_block, warn, state, prompt_cache=True):
+    """Verlauf für den nächsten LLM-Aufruf: (msgs, volatile, last).
+
+    Der DOM-Block bleibt dauerhaft im Verlauf (Basis für spätere Diffs).
+    Mit Prompt-Cache geht der flüchtige Zustand als eigener Block mit,
+    sonst wird er nur für diesen Aufruf in die letzte Nachricht gemischt –
+    nach dem Aufruf msgs[-1] = last setzen.
+    """
+    if dom_block:
+        msgs[-1] = {"role": msgs[-1]["role"], "content": msgs[-1]["content"] + dom_block}
+    last = msgs[-1]
+    if prompt_cache:
+        # Stabiler Verlauf + flüchtiger Zustand als eigener Block am Ende
+        return msgs, (warn + "\n" if warn else "") + state.lstrip("\n"), last
+    msgs[-1] = {"role": last["role"], "content": (warn + "\n" if warn else "") + last["content"] + state}
+    return msgs, None, last
+
+
+class ContextManager:
+    """Hält den Verlauf (self.msgs) unter einem Token-Budget.
+
+    System-Prompt und ursprüngliche Aufgabe bleiben immer stehen. Ältere
+    Aktion/Ergebnis-Paare werden zu einem kompakten Schritt-Protokoll
+    zusammengefasst; die letzten Schritte bleiben wörtlich. Kompaktiert wird
+    erst bei Budget-Überschreitung und dann auf etwa die Hälfte, damit der
+    Präfix danach wieder viele Schritte lang unverändert bleibt.
+    """
+    MAX_LOG_LINES = 80
+
+    def __init__(self, budget=16000, keep_ratio=0.5):
+        self.budget = budget
+        self.keep_ratio = keep_ratio
+        self.reset()
+
+    def reset(self):
+        self.step_log = []
+        self.step_no = 0
+        self.results = {}
+        self.stats = {'compactions': 0, 'tokens_before': 0, 'tokens_after': 0, 'payload_chars': 0}
+
+    def record(self, resp, result):
+        """Merkt sich das Ergebnis zu einer Assistenten-Antwort fürs Protokoll"""
+        if resp:
+            self.results[resp] = result
+
+    @staticmethod
+    def estimate(msgs):
+        return sum(estimate_tokens(message_text(m.get('content'))) + 4 for m in msgs)
+
+    def _log_message(self):
+        lines = self.step_log
+        if len(lines) > self.MAX_LOG_LINES:
+            lines = [f"… {len(lines) - self.MAX_LOG_LINES} ältere Schritte"] + lines[-self.MAX_LOG_LINES:]
+        return {"role": "user", "content": STEP_LOG_HEADER + "\n" + "\n".join(lines)}
+
+    def _collapse(self, m):
+        content = message_text(m.get('content'))
+        if m['role'] == 'assistant':
+            data = parse_json(content)
+            line = summarize_action(data)
+            self.stats['payload_chars'] += max(0, len(content) - len(line))
+            result = self.results.get(content)
+            self.step_no += 1
+            self.step_log.append(f"[{self.step_no}] {line}" + (f" → {result}" if result else ""))
+        elif content.startswith("Nachfrage:"):
+            self.step_log.append(f"👤 {content[:300]}")
+        elif content and not content.startswith("Weiter."):
+            first = content.strip().split('\n', 1)[0][:200]
+            self.stats['payload_chars'] += max(0, len(content) - len(first))
+            self.step_log.append(f"   ↳ {first}")
+
+    def compact(self, msgs):
+        """Gibt (msgs, info) zurück; info ist None, wenn nichts zu tun war"""
+        if not self.budget or len(msgs) < 5:
+            return msgs, None
+        before = self.estimate(msgs)
+        if before <= self.budget:
+            return msgs, None
+
+        head = msgs[:2]
+        task = message_text(head[1].get('content'))
+        if DOM_BLOCK_MARK in task:
+            # Mini-DOM vom ersten Schritt hängt an der Aufgabe – veraltet
+            head = [head[0], {"role": head[1]["role"], "content": task.split(DOM_BLOCK_MARK, 1)[0]}]
+        body = msgs[2:]
+        if body and message_text(body[0].get('content')).startswith(STEP_LOG_HEADER):
+            body = body[1:]
+        # Von hinten so viele Nachrichten behalten, wie in keep_ratio * budget passen
+        keep_budget = self.budget * self.keep_ratio - self.estimate(head)
+        cut, used = len(body), 0
+        while cut > 0:
+            cost = self.estimate([body[cut - 1]])
+            if used + cost > keep_budget and len(body) - cut >= 2:
+                break
+            used += cost
+            cut -= 1
+        # Schnitt vor einer Assistenten-Antwort, damit Paare zusammenbleiben
+        while 0 < cut < len(body) and body[cut]['role'] != 'assistant':
+            cut -= 1
+        if cut <= 0:
+            return msgs, None
+
+        for m in body[:cut]:
+            self._collapse(m)
+        new_msgs = head + [self._log_message()] + body[cut:]
+        after = self.estimate(new_msgs)
+        self.stats['compactions'] += 1
+        self.stats['tokens_before'] += before
+        self.stats['tokens_after'] += after
+        return new_msgs, {'msgs_before': len(msgs), 'msgs_after': len(new_msgs),
+                          'tokens_before': before, 'tokens_after': after}
+
+    def summary(self):
+        st = self.stats
+        if not st['compactions']:
+            return ""
+        n = lambda v: f"{v:,}".replace(",", ".")
+        return (f"🗜️ {st['compactions']}x kompaktiert, ~{n(st['tokens_before'])} → ~{n(st['tokens_after'])} Tokens, "
+                f"{n(st['payload_chars'])} Zeichen Nutzlast entfernt")
+
+
+class TaskStats:
+    """Erfolgsquote mit/ohne Kompaktierung, um deren Einfluss zu prüfen"""
+    def __init__(self):
+        self.counts = {True: [0, 0], False: [0, 0]}  # kompaktiert → [fertig, gesamt]
+
+    def record(self, done, compacted):
+        c = self.counts[bool(compacted)]
+        c[0] += bool(done)
+        c[1] += 1
+
+    def summary(self):
+        (d1, n1), (d0, n0) = self.counts[True], self.counts[False]
+        return f"🎯 Erfolgsquote: mit Kompaktierung {d1}/{n1}, ohne {d0}/{n0}"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TRACING (Zeitspannen pro Schritt)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class Tracer:
+    """Zeitspannen einer Aufgabe; Export als Chrome-Trace (chrome://tracing, ui.perfetto.dev)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.events = []
+            self.threads = {}
+            self.t0 = time.perf_counter()
+            self.t_end = None
+
+    def add(self, name, start, end, cat='step', **args):
+        tid = threading.get_ident()
+        ev = {'name': name, 'cat': cat, 'ph': 'X', 'ts': round((start - self.t0) * 1e6),
+              'dur': max(0, round((end - start) * 1e6)), 'pid': os.getpid(), 'tid': tid, 'args': args}
+        with self.lock:
+            self.threads.setdefault(tid, threading.current_thread().name)
+            self.events.append(ev)
+
+    @contextmanager
+    def span(self, name, cat='step', **args):
+        t = time.perf_counter()
+        try:
+            yield args  # Aufrufer kann args noch ergänzen
+        finally:
+            self.add(name, t, time.perf_counter(), cat, **args)
+
+    def finish(self):
+        self.t_end = time.perf_counter()
+
+    def wall(self):
+        return (self.t_end or time.perf_counter()) - self.t0
+
+    def to_chrome(self):
+        with self.lock:
+            meta = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': n}}
+                    for tid, n in self.threads.items()]
+            return {'traceEvents': meta + list(self.events), 'displayTimeUnit': 'ms'}
+
+    def summary(self):
+        """[(name, anzahl, gesamt_s, mittel_ms, max_ms, anteil_%)] nach Gesamtzeit sortiert"""
+        agg = defaultdict(lambda: [0, 0, 0])
+        with self.lock:
+            for ev in self.events:
+                a = agg[ev['name']]
+                a[0] += 1
+                a[1] += ev['dur']
+                a[2] = max(a[2], ev['dur'])
+        wall = self.wall() or 1e-9
+        rows = [(name, n, tot / 1e6, tot / n / 1e3, mx / 1e3, tot / 1e6 / wall * 100)
+                for name, (n, tot, mx) in agg.items()]
+        return sorted(rows, key=lambda r: -r[2])
+
+    def table(self, limit=14):
+        rows = self.summary()
+        if not rows:
+            return ""
+        lines = [f"⏱️ PROFIL (Wandzeit {self.wall():.1f}s)",
+                 f"{'Spanne':<26}{'n':>4}{'gesamt':>9}{'Ø ms':>8}{'max ms':>8}{'%':>6}"]
+        for name, n, tot, avg, mx, pct in rows[:limit]:
+            lines.append(f"{name[:25]:<26}{n:>4}{tot:>8.2f}s{avg:>8.0f}{mx:>8.0f}{pct:>6.1f}")
+        return "\n".join(lines)
+
+
+def write_chrome_trace(path, trace, keep=20):
+    """Schreibt den Trace und behält nur die neuesten keep Dateien im Ordner"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+        old = sorted(glob.glob(os.path.join(os.path.dirname(path), 'trace_*.json')))[:-keep]
+        for o in old:
+            os.remove(o)
+    except Exception:
+        pass
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BEREITSCHAFT (statt fester Pausen)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def wait_for_cdp(port=9222, timeout=10.0, interval=0.05):
+    """Wartet, bis Chrome den DevTools-Endpunkt /json/version beantwortet"""
+    t0 = time.perf_counter()
+    while True:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/json/version", timeout=0.5).ok:
+                return True, time.perf_counter() - t0
+        except requests.RequestException:
+            pass
+        if time.perf_counter() - t0 >= timeout:
+            return False, time.perf_counter() - t0
+        time.sleep(interval)
+
+
+def _screen_thumb():
+    return pyautogui.screenshot().convert('L').reduce(8)
+
+
+def wait_screen_stable(timeout=1.0, settle=0.15, expect_change=0.0, interval=0.05):
+    """Wartet, bis der Bildschirm ruhig ist. Gibt (ok, sekunden, geändert) zurück.
+
+    expect_change: so lange wird zuerst auf eine Änderung gewartet (z.B.
+    Fenster, das sich erst öffnen muss). Winzige Änderungen wie ein
+    blinkender Cursor zählen nicht.
+    """
+    t0 = time.perf_counter()
+    try:
+        ref = _screen_thumb()
+    except Exception:
+        return False, 0.0, False
+    min_pixels = max(3, ref.size[0] * ref.size[1] // 2000)
+    changed, stable_since = False, t0
+    while True:
+        now = time.perf_counter()
+        if now - t0 >= timeout:
+            return False, now - t0, changed
+        if (changed or now - t0 >= expect_change) and now - stable_since >= settle:
+            return True, now - t0, changed
+        time.sleep(interval)
+        cur = _screen_thumb()
+        if ImageChops.difference(cur, ref).point(lambda v: 255 if v > 16 else 0).histogram()[255] >= min_pixels:
+            changed, ref, stable_since = True, cur, time.perf_counter()
+
+
+BROWSER_DEBUG_PORT = 9222
+BROWSER_PREWARM = True          # Debug-Chrome schon beim Programmstart hochfahren
+CHROME_PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'chrome-debug')
+
+
 def find_chrome_path():
     for p in [r"C:\Program Files\Google\Chrome\Application\chrome.exe",
               r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
@@ -571,192 +2450,2416 @@ def find_chrome_path():
     return "chrome"
 
 
+# In-Page-Registry der interaktiven Elemente. Ein MutationObserver pflegt die
+# Menge laufend (kein querySelectorAll pro Schritt); snapshot() liefert die
+# volle Liste und setzt die Basis, diff() nur Neu/Weg/Geändert seit der Basis.
+MINI_DOM_INSTALL_JS = r"""
+if (!window.__miniDom) {
+    const SEL = 'button, a, input, select, textarea, [onclick], [role="button"], [role="link"], [type="submit"]';
+    const st = {version: 0, nextId: 1, ids: new WeakMap(), reg: new Set(), sent: new Map(),
+                doc: Math.random().toString(36).slice(2), lastMutation: performance.now()};
+    const idOf = (el) => {
+        let id = st.ids.get(el);
+        if (!id) {
+            // Nicht in der WeakMap = noch nie vergeben (geklonte Knoten erben sonst data-rid)
+            id = st.nextId++;
+            st.ids.set(el, id);
+            el.setAttribute('data-rid', id);
+        }
+        return id;
+    };
+    const addTree = (node) => {
+        if (node.nodeType !== 1) return;
+        // Kopien (cloneNode, innerHTML) bringen ein fremdes data-rid mit → sofort eigenes vergeben
+        // bzw. entfernen, sonst trifft der Locator [data-rid=n] zwei Elemente
+        for (const el of [node, ...node.querySelectorAll('[data-rid]')]) {
+            if (!el.hasAttribute('data-rid') || st.ids.has(el)) continue;
+            if (el.matches(SEL)) idOf(el); else el.removeAttribute('data-rid');
+        }
+        if (node.matches(SEL)) st.reg.add(node);
+        for (const el of node.querySelectorAll(SEL)) st.reg.add(el);
+    };
+    const info = (el) => ({
+        id: idOf(el),
+        tag: el.tagName.toLowerCase(),
+        elid: el.id || null,
+        text: (el.innerText || el.value || el.placeholder || '').trim().replace(/\s+/g, ' ').substring(0, 50),
+        type: el.tagName === 'INPUT' ? el.type : null,
+        href: el.href ? (el.href.startsWith(location.origin) ? el.href.slice(location.origin.length) || '/' : el.href) : null,
+        name: el.name || null,
+        placeholder: el.placeholder || null
+    });
+    const current = (max) => {
+        const els = [...st.reg].filter(el => el.isConnected);
+        st.reg = new Set(els);
+        els.sort((a, b) => a === b ? 0 : (a.compareDocumentPosition(b) & Node.DOCUMENT_POSITION_FOLLOWING ? -1 : 1));
+        const out = [];
+        for (const el of els) {
+            if (out.length >= max) break;
+            if (!el.offsetParent && el.tagName !== 'INPUT') continue;
+            out.push(info(el));
+        }
+        return out;
+    };
+    addTree(document.documentElement);
+    new MutationObserver((muts) => {
+        for (const m of muts) {
+            if (m.type === 'childList') m.addedNodes.forEach(addTree);
+            else if (m.type === 'attributes' && m.target.matches && m.target.matches(SEL)) st.reg.add(m.target);
+        }
+        st.version++;
+        st.lastMutation = performance.now();
+    }).observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true,
+        attributeFilter: ['class', 'id', 'href', 'value', 'disabled', 'hidden', 'style', 'type', 'name',
+                          'placeholder', 'role', 'onclick', 'aria-hidden', 'aria-expanded']});
+    window.__miniDom = {
+        snapshot(max) {
+            const items = current(max);
+            st.sent = new Map(items.map(i => [i.id, JSON.stringify(i)]));
+            st.sentVersion = st.version;
+            return {doc: st.doc, version: st.version, items};
+        },
+        diff(max) {
+            if (st.version === st.sentVersion)
+                return {doc: st.doc, version: st.version, total: st.sent.size, added: [], removed: [], changed: []};
+            st.sentVersion = st.version;
+            const items = current(max);
+            const now = new Map(items.map(i => [i.id, JSON.stringify(i)]));
+            const added = [], changed = [], removed = [];
+            for (const i of items) {
+                const old = st.sent.get(i.id);
+                if (old === undefined) added.push(i); else if (old !== now.get(i.id)) changed.push(i);
+            }
+            for (const id of st.sent.keys()) if (!now.has(id)) removed.push(id);
+            st.sent = now;
+            return {doc: st.doc, version: st.version, total: items.length, added, removed, changed};
+        },
+        quietFor() { return performance.now() - st.lastMutation; },
+        state() { return {doc: st.doc, version: st.version}; }
+    };
+}
+"""
+
+
+def format_dom_element(el):
+    """Kompakte Mini-DOM-Zeile: id tag#id "text" extras – id ist der Klick-Index"""
+    tag = el.get('tag', '?')
+    line = f"{el['id']} {tag}"
+    if el.get('elid'):
+        line += f"#{el['elid']}"
+    elif el.get('name'):
+        line += f"[name={el['name']}]"
+    if el.get('type'):
+        line += f":{el['type']}"
+    if el.get('text'):
+        line += f" \"{el['text']}\""
+    if el.get('placeholder') and el['placeholder'][:50] != el.get('text'):
+        line += f" ph=\"{el['placeholder'][:30]}\""
+    if el.get('href'):
+        line += f" →{el['href'][:40]}"
+    return line
+
+
+# Seitentext ohne Boilerplate: Blöcke (Absätze, Listen, Zellen …) mit der
+# letzten Überschrift. Navigation, Kopf/Fuß, Cookie-/Newsletter-Banner und
+# Unsichtbares fallen weg. key = Dokument + DOM-Version + URL → Cache.
+PAGE_TEXT_JS = r"""
+([sel, known, max]) => {
+    const s = window.__miniDom.state ? window.__miniDom.state() : {doc: Math.random(), version: 0};
+    const key = s.doc + ':' + s.version + ':' + location.href;
+    if (key === known) return {key, same: true};
+    const root = document.querySelector(sel) || document.body;
+    const SKIP = 'script,style,noscript,template,svg,canvas,iframe,nav,header,footer,aside,dialog,' +
+                 '[role=navigation],[role=banner],[role=contentinfo],[role=dialog],[role=alertdialog],' +
+                 '[aria-hidden=true],[hidden]';
+    const BOILER = /cookie|consent|gdpr|newsletter|popup|modal|overlay|breadcrumb|sidebar|share|social|promo|advert/i;
+    const BLOCK = /^(P|LI|H[1-6]|TD|TH|PRE|BLOCKQUOTE|DD|DT|FIGCAPTION|CAPTION|SUMMARY)$/;
+    const blocks = [];
+    let heading = '';
+    const skip = (el) => el !== root && (el.matches(SKIP) ||
+        BOILER.test((el.id || '') + ' ' + (typeof el.className === 'string' ? el.className : '')) ||
+        (el.offsetParent === null && getComputedStyle(el).position !== 'fixed' && el.tagName !== 'BODY'));
+    const walk = (el) => {
+        if (blocks.length >= max || skip(el)) return;
+        if (BLOCK.test(el.tagName)) {
+            const t = el.innerText.replace(/\s+/g, ' ').trim();
+            if (!t) return;
+            const h = /^H[1-6]$/.test(el.tagName);
+            if (h) heading = t.slice(0, 80);
+            blocks.push({t, h: heading, k: h ? 'h' : ''});
+            return;  // innerText enthält die Kinder schon
+        }
+        let own = '';
+        for (const c of el.childNodes) if (c.nodeType === 3) own += c.textContent;
+        own = own.replace(/\s+/g, ' ').trim();
+        if (own.length > 30) blocks.push({t: own, h: heading, k: ''});
+        for (const c of el.children) walk(c);
+    };
+    walk(root);
+    return {key, url: location.href, blocks};
+}
+"""
+
+PAGE_TEXT_BUDGET = 2000         # Zeichen Seitentext pro Schritt (die relevantesten Abschnitte)
+PAGE_CHUNK_CHARS = 500
+_STOPWORDS = set("""der die das den dem des ein eine einen einem einer eines und oder aber ist sind war wird
+mit für von zu zum zur im in am an auf aus bei nach über unter vor als auch nicht noch nur wie was wer wo
+es sie er ich du wir ihr sich so da dann bitte alle mir mich the a an and or of to in on for with is are
+be this that it as at by from""".split())
+
+
+def _terms(text):
+    return [w for w in re.findall(r'\w{2,}', text.lower()) if w not in _STOPWORDS]
+
+
+def chunk_blocks(blocks, size=PAGE_CHUNK_CHARS):
+    """Aufeinanderfolgende Blöcke zu Abschnitten um size Zeichen; jede Überschrift beginnt einen neuen"""
+    chunks, cur, n = [], [], 0
+    def flush():
+        nonlocal cur, n
+        if cur:
+            chunks.append({'head': cur[0].get('h', ''), 'text': "\n".join(b['t'] for b in cur)})
+        cur, n = [], 0
+    for b in blocks:
+        t = b['t']
+        lone_head = len(cur) == 1 and cur[0].get('k') == 'h'  # Überschrift bleibt bei ihrem Text
+        if cur and (b.get('k') == 'h' or (n + len(t) > size and not lone_head)):
+            flush()
+        while len(t) > size * 2:  # Textwüste: hart teilen, möglichst am Satzende
+            cut = t.rfind('. ', 0, size) + 1 or size
+            chunks.append({'head': b.get('h', ''), 'text': t[:cut].strip()})
+            t = t[cut:].strip()
+        cur.append(dict(b, t=t))
+        n += len(t)
+    flush()
+    return chunks
+
+
+def bm25_scores(chunks, query, k1=1.5, b=0.75):
+    """BM25 jedes Abschnitts (Text + Überschrift) gegen die Suchbegriffe"""
+    q = set(_terms(query))
+    docs = [Counter(_terms(f"{c['head']} {c['text']}")) for c in chunks]
+    if not q or not docs:
+        return [0.0] * len(chunks)
+    lens = [sum(d.values()) for d in docs]
+    avg = sum(lens) / len(docs) or 1.0
+    df = {t: sum(1 for d in docs if t in d) for t in q}
+    idf = {t: math.log(1 + (len(docs) - df[t] + 0.5) / (df[t] + 0.5)) for t in q}
+    return [sum(idf[t] * d[t] * (k1 + 1) / (d[t] + k1 * (1 - b + b * dl / avg)) for t in q if t in d)
+            for d, dl in zip(docs, lens)]
+
+
+def select_page_text(chunks, query, budget=PAGE_TEXT_BUDGET):
+    """Beste Abschnitte bis zum Budget, in Dokument-Reihenfolge mit Position [#n/N Überschrift].
+
+    Gibt (text, anzahl_gewählt, treffer_gesamt) zurück.
+    """
+    scores = bm25_scores(chunks, query)
+    total = len(chunks)
+    picked, used = [], 0
+    for i in sorted(range(total), key=lambda i: (-scores[i], i)):
+        n = len(chunks[i]['text']) + len(chunks[i]['head']) + 12
+        if used + n > budget and picked:
+            continue
+        picked.append(i)
+        used += n
+    lines = []
+    for i in sorted(picked):
+        c = chunks[i]
+        head = f" {c['head'][:60]}" if c['head'] and c['head'] != c['text'][:len(c['head'])] else ""
+        lines.append(f"[#{i + 1}/{total}{head}] {c['text']}")
+    return "\n".join(lines)[:budget], len(picked), sum(1 for s in scores if s > 0)
+
+
+def _browser_thread(fn):
+    """Sync-Playwright ist an den Thread gebunden, der es gestartet hat → alle Aufrufe dorthin"""
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if threading.get_ident() == self._tid:
+            return fn(self, *args, **kwargs)
+        return self.executor().submit(fn, self, *args, **kwargs).result()
+    return wrapper
+
+
+_CHROME_LAUNCH_LOCK = threading.Lock()   # mehrere Sitzungen starten nur ein Chrome
+
+
 class BrowserHelper:
-    def __init__(self):
-        self.playwright = self.browser = self.page = None
+    """Eine warme Debug-Chrome-Instanz samt CDP-Verbindung, die über Aufgaben hinweg lebt.
+
+    isolated=True: eigener Browser-Kontext (Cookies, Tabs) in derselben Instanz –
+    für parallele Sitzungen; der Kontext verschwindet mit der Verbindung.
+    """
+
+    def __init__(self, isolated=False):
+        self.playwright = self.browser = self.page = self.context = None
+        self.isolated = isolated
         self.connected = False
-    
-    def connect(self, port=9222):
-        if not PLAYWRIGHT_AVAILABLE: return False
-        for _ in range(10):
+        self.dom_doc = self.dom_version = None
+        self.text_cache = OrderedDict()   # selector → (key, abschnitte); key = Dokument:DOM-Version:URL
+        self.proc = None            # nur von uns gestartetes Chrome wird beim Beenden geschlossen
+        self.cdp_wait = 0.0
+        self._tid = None
+        self._exec = None
+        self._exec_lock = threading.Lock()
+
+    def _bind_thread(self):
+        self._tid = threading.get_ident()
+
+    def executor(self):
+        """Der Playwright-Thread; nach shutdown() legt der nächste Aufruf einen neuen an"""
+        with self._exec_lock:
+            if self._exec is None:
+                self._exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix='playwright',
+                                                initializer=self._bind_thread)
+            return self._exec
+
+    def launch(self, port=BROWSER_DEBUG_PORT):
+        """Startet die eigene Debug-Instanz (eigenes Profil, Cache bleibt zwischen Läufen)"""
+        args = [find_chrome_path(), f'--remote-debugging-port={port}', '--no-first-run',
+                '--no-default-browser-check', '--user-data-dir=' + CHROME_PROFILE_DIR, 'about:blank']
+        self.proc = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                     creationflags=subprocess.CREATE_NO_WINDOW if IS_WINDOWS else 0)
+
+    def alive(self):
+        try:
+            if not (self.connected and self.browser.is_connected()): return False
+            if self.page.is_closed():
+                contexts = [self.context] if self.isolated else self.browser.contexts
+                pages = [pg for c in contexts for pg in c.pages]
+                self.page = pages[-1] if pages else contexts[0].new_page()
+            return True
+        except: return False
+
+    @_browser_thread
+    def ensure(self, url='', new_tab=False, port=BROWSER_DEBUG_PORT):
+        """Warmen Browser sicherstellen, dann nur navigieren. Gibt (ok, wie) zurück"""
+        how = "warm"
+        if not self.alive():
+            self.disconnect()
+            with _CHROME_LAUNCH_LOCK:
+                if wait_for_cdp(port, 0.2)[0]:
+                    how = "verbunden"
+                else:
+                    self.launch(port)
+                    how = "gestartet"
+                if not self.connect(port): return False, "keine Verbindung"
+            how += f", CDP nach {self.cdp_wait:.2f}s"
+        if new_tab:
+            self.page = self.page.context.new_page()
+            how += ", neuer Tab"
+        if url and not self.navigate(url): return False, f"{how}, Navigation fehlgeschlagen"
+        return True, how
+
+    def shutdown(self):
+        """Verbindung trennen und nur die eigene Debug-Instanz beenden (nie fremdes Chrome)"""
+        try: self.disconnect()
+        except: pass
+        if self.proc and self.proc.poll() is None:
+            if IS_WINDOWS:
+                subprocess.run(['taskkill', '/f', '/t', '/pid', str(self.proc.pid)], capture_output=True,
+                               creationflags=subprocess.CREATE_NO_WINDOW)
+            else:
+                self.proc.terminate()
+        self.proc = None
+        with self._exec_lock:
+            ex, self._exec, self._tid = self._exec, None, None
+        if ex: ex.shutdown(wait=False)
+
+    @_browser_thread
+    def has_page(self):
+        """Verbunden und eine echte Seite geladen (nicht nur der vorgewärmte leere Tab)"""
+        try: return self.connected and not self.page.is_closed() and self.page.url != 'about:blank'
+        except: return False
+
+    @_browser_thread
+    def connect(self, port=BROWSER_DEBUG_PORT, timeout=10.0):
+        if not CAPS.available('playwright'): return False
+        self.cdp_wait = wait_for_cdp(port, timeout)[1]
+        for _ in range(3):
             try:
                 if not self.playwright:
-                    self.playwright = sync_playwright().start()
+                    self.playwright = CAPS.load('playwright').sync_playwright().start()
                 self.browser = self.playwright.chromium.connect_over_cdp(f"http://localhost:{port}")
                 ctx = self.browser.contexts
-                self.page = ctx[0].pages[0] if ctx and ctx[0].pages else (ctx[0].new_page() if ctx else self.browser.new_page())
+                if self.isolated:
+                    self.context = self.browser.new_context()
+                    self.page = self.context.new_page()
+                else:
+                    self.page = ctx[0].pages[0] if ctx and ctx[0].pages else (ctx[0].new_page() if ctx else self.browser.new_page())
                 self.connected = True
                 return True
-            except: time.sleep(0.5)
+            except: time.sleep(0.2)
         return False
     
+    @_browser_thread
     def disconnect(self):
         try:
             if self.browser: self.browser.close()
             if self.playwright: self.playwright.stop()
         except: pass
-        self.browser = self.page = self.playwright = None
+        self.browser = self.page = self.context = self.playwright = None
         self.connected = False
     
+    @_browser_thread
     def get_page_info(self):
         try: return {'url': self.page.url, 'title': self.page.title()} if self.page else None
         except: return None
     
+    def _mini_dom_call(self, method, max_elements):
+        """Ruft die In-Page-Registry auf (installiert sie beim ersten Aufruf pro Dokument)"""
+        return self.page.evaluate(
+            f"([m, n]) => {{ {MINI_DOM_INSTALL_JS} return window.__miniDom[m](n); }}", [method, max_elements])
+
+    @_browser_thread
     def get_mini_dom(self, max_elements=50):
-        """Extrahiert nur klickbare/interaktive Elemente"""
+        """Extrahiert nur klickbare/interaktive Elemente (volle Liste, neue Basis für Diffs)"""
         if not self.page:
             return None
         
-        try:
-            elements = self.page.evaluate("""() => {
-                const results = [];
-                const selectors = 'button, a, input, select, textarea, [onclick], [role="button"], [role="link"], [type="submit"]';
-                const elements = document.querySelectorAll(selectors);
-                
-                for (let i = 0; i < Math.min(elements.length, 100); i++) {
-                    const el = elements[i];
-                    if (!el.offsetParent && el.tagName !== 'INPUT') continue;
-                    
-                    const info = {
-                        tag: el.tagName.toLowerCase(),
-                        id: el.id || null,
-                        classes: el.className ? el.className.split(' ').filter(c => c).slice(0, 3).join('.') : null,
-                        text: (el.innerText || el.value || el.placeholder || '').trim().substring(0, 50),
-                        type: el.type || null,
-                        href: el.href || null,
-                        name: el.name || null,
-                        placeholder: el.placeholder || null
-                    };
-                    results.push(info);
-                }
-                return results;
-            }""")
-            
-            if not elements:
-                return "Keine interaktiven Elemente gefunden."
+        try:
+            snap = self._mini_dom_call('snapshot', max_elements)
+            self.dom_doc, self.dom_version = snap['doc'], snap['version']
+            if not snap['items']:
+                return "Keine interaktiven Elemente gefunden."
+            return "\n".join(format_dom_element(el) for el in snap['items'])
+        
+        except Exception as e:
+            return f"DOM-Fehler: {str(e)[:50]}"
+
+    @_browser_thread
+    def get_mini_dom_delta(self, max_elements=50):
+        """Änderungen seit dem letzten snapshot/diff: (art, text, anzahl)
+
+        art ist 'diff', 'same' oder 'full' (neues Dokument → volle Liste).
+        """
+        if not self.page:
+            return 'full', None, 0
+        try:
+            d = self._mini_dom_call('diff', max_elements)
+        except Exception as e:
+            return 'full', f"DOM-Fehler: {str(e)[:50]}", 0
+        if d['doc'] != self.dom_doc:
+            text = self.get_mini_dom(max_elements)
+            return 'full', text, len(text.split('\n')) if text else 0
+        old_version, self.dom_version = self.dom_version, d['version']
+        lines = [f"+{format_dom_element(el)}" for el in d['added']]
+        lines += [f"-{i}" for i in d['removed']]
+        lines += [f"~{format_dom_element(el)}" for el in d['changed']]
+        if not lines:
+            return 'same', f"(v{d['version']}, {d['total']} Elemente)", 0
+        return 'diff', f"v{old_version}→v{d['version']}, {d['total']} Elemente:\n" + "\n".join(lines), len(lines)
+
+    def _target(self, selector=None, index=None):
+        """Locator für Mini-DOM-Index (data-rid, strikt eindeutig) oder CSS-Selektor"""
+        if index is not None:
+            return self.page.locator(f'[data-rid="{int(index)}"]')
+        # Eine Selektorliste matcht jedes Teil → ein Versuch statt Raten nacheinander
+        return self.page.locator(selector).first
+    
+    def _act(self, fn, selector=None, index=None):
+        try:
+            fn(self._target(selector, index))
+            return True
+        except Exception:
+            if index is not None or not selector or ',' not in selector:
+                return False
+        # Ungültige Teil-Selektoren (z.B. gemischte Playwright-Syntax) einzeln probieren
+        for s in selector.split(','):
+            try: fn(self.page.locator(s.strip()).first); return True
+            except: continue
+        return False
+    
+    @_browser_thread
+    def click(self, selector=None, text=None, index=None):
+        if not self.page: return False
+        try:
+            if index is not None: return self._act(lambda loc: loc.click(timeout=2000), index=index)
+            if text: self.page.click(f'text="{text}"', timeout=3000)
+            elif selector: return self._act(lambda loc: loc.click(timeout=3000), selector)
+            return True
+        except: return False
+    
+    @_browser_thread
+    def type_into(self, selector, text, index=None):
+        if not self.page: return False
+        try:
+            if index is not None: return self._act(lambda loc: loc.fill(text, timeout=2000), index=index)
+            return self._act(lambda loc: loc.fill(text, timeout=3000), selector)
+        except: return False
+    
+    @_browser_thread
+    def wait_ready(self, state='domcontentloaded', quiet_ms=250, timeout=5.0):
+        """Wartet auf Ladezustand und DOM-Ruhe (MutationObserver). Gibt (ok, sekunden) zurück"""
+        if not self.page: return False, 0.0
+        t0 = time.perf_counter()
+        ok = False
+        for _ in range(2):
+            try:
+                if state: self.page.wait_for_load_state(state, timeout=timeout * 1000)
+                left = max(0.05, timeout - (time.perf_counter() - t0))
+                ok = self.page.evaluate(
+                    f"([q, t]) => {{ {MINI_DOM_INSTALL_JS} return new Promise(res => {{"
+                    "  const t0 = performance.now();"
+                    "  const tick = () => { const qf = window.__miniDom.quietFor();"
+                    "    if (qf >= q) res(true); else if (performance.now() - t0 >= t) res(false);"
+                    "    else setTimeout(tick, Math.max(16, q - qf)); };"
+                    "  tick(); }); }", [quiet_ms, left * 1000])
+                break
+            except Exception:
+                # Navigation während des Wartens zerstört den Kontext → einmal wiederholen
+                if time.perf_counter() - t0 >= timeout: break
+        return ok, time.perf_counter() - t0
+    
+    @_browser_thread
+    def get_text(self, selector='body'):
+        try: return self.page.inner_text(selector) if self.page else None
+        except: return None
+    
+    @_browser_thread
+    def get_page_chunks(self, selector='body', max_blocks=3000):
+        """Seitentext als Abschnitte ohne Boilerplate. Gibt (abschnitte, aus_cache) zurück.
+
+        Unveränderte Seite (gleiche URL, gleiche DOM-Version) → Abschnitte aus dem Cache.
+        """
+        if not self.page:
+            return None, False
+        known = self.text_cache.get(selector, (None, None))
+        try:
+            r = self.page.evaluate(f"(a) => {{ {MINI_DOM_INSTALL_JS} return ({PAGE_TEXT_JS})(a); }}",
+                                   [selector, known[0], max_blocks])
+        except Exception:
+            return None, False
+        if r.get('same'):
+            self.text_cache.move_to_end(selector)
+            return known[1], True
+        blocks = r['blocks']
+        if not blocks:  # nur Kurztexte in divs → innerText als Notbehelf
+            txt = self.get_text(selector) or ""
+            blocks = [{'t': l.strip()} for l in txt.split('\n') if l.strip()]
+        chunks = chunk_blocks(blocks)
+        self.text_cache[selector] = (r['key'], chunks)
+        while len(self.text_cache) > 8:
+            self.text_cache.popitem(last=False)
+        return chunks, False
+    
+    @_browser_thread
+    def scroll(self, direction='down'):
+        try: self.page.evaluate(f"window.scrollBy(0, {500 if direction == 'down' else -500})"); return True
+        except: return False
+    
+    @_browser_thread
+    def navigate(self, url):
+        try: self.page.goto(url, wait_until='domcontentloaded', timeout=30000); return True
+        except: return False
+
+
+class PywinautoHelper:
+    def __init__(self):
+        self.app = self.window = None
+        self.connected = False
+
+    def connect(self, title=None, title_re=None):
+        if not CAPS.available('pywinauto'): return False
+        kwargs = {"title_re": title_re} if title_re else {"title": title} if title else {}
+        if not kwargs: return False
+        for _ in range(3):
+            try:
+                self.app = CAPS.load('pywinauto').Application(backend="uia").connect(**kwargs)
+                self.window = self.app.top_window()
+                self.connected = True
+                return True
+            except: time.sleep(2)
+        return False
+
+    def disconnect(self):
+        self.app = self.window = None
+        self.connected = False
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DATEIEN LESEN (begrenzt)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+FILE_READ_LIMIT = 8000          # Zeichen, die das Modell von einer Datei sieht
+FILE_SAMPLE_BYTES = 64 * 1024   # Stichprobe für die Kodierungserkennung
+FILE_MAX_MATCHES = 200
+
+# Reihenfolge wichtig: UTF-32-LE beginnt wie UTF-16-LE
+_BOMS = ((codecs.BOM_UTF32_LE, 'utf-32-le'), (codecs.BOM_UTF32_BE, 'utf-32-be'), (codecs.BOM_UTF8, 'utf-8'),
+         (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be'))
+
+
+def detect_encoding(sample):
+    """Kodierung aus BOM bzw. Byte-Stichprobe: (kodierung, bom_länge) – ohne die Datei ganz zu lesen"""
+    for bom, enc in _BOMS:
+        if sample.startswith(bom):
+            return enc, len(bom)
+    if sample:
+        # UTF-16 ohne BOM: jedes zweite Byte NUL
+        even, odd = sample[0::2].count(0), sample[1::2].count(0)
+        if odd > len(sample) // 4 and even < odd // 8:
+            return 'utf-16-le', 0
+        if even > len(sample) // 4 and odd < even // 8:
+            return 'utf-16-be', 0
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)  # darf mitten im Zeichen enden
+        return 'utf-8', 0
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode('cp1252')
+        return 'cp1252', 0
+    except UnicodeDecodeError:
+        return 'latin-1', 0
+
+
+def _count_newlines(mm, start, end, nl, chunk=1 << 22):
+    return sum(mm[pos:min(end, pos + chunk)].count(nl) for pos in range(start, end, chunk))
+
+
+def _grep_file(path, enc, pattern, context, limit):
+    """Zeilenweise durch die Datei (Speicher bleibt klein): Treffer mit Nummer und Kontext"""
+    try: rx = re.compile(pattern, re.I)
+    except re.error: rx = re.compile(re.escape(pattern), re.I)
+    out, before = [], deque(maxlen=max(0, context))
+    hits = used = after = last = 0
+    cut = False
+    def add(n, mark, line):
+        nonlocal used, last
+        if context and last and n > last + 1:
+            out.append("…")
+        out.append(f"{n}{mark} {line}")
+        used += len(out[-1])
+        last = n
+    with open(path, 'r', encoding=enc, errors='replace', newline='') as f:
+        for n, line in enumerate(f, 1):
+            line = line.rstrip('\r\n')
+            if n == 1:
+                line = line.lstrip('\ufeff')  # BOM
+            if rx.search(line):
+                hits += 1
+                if hits > FILE_MAX_MATCHES or used > limit:
+                    cut = True
+                    continue  # nur noch zählen
+                for b in before:
+                    add(*b)
+                before.clear()
+                add(n, ':', line)
+                after = context
+            elif after > 0:
+                add(n, '-', line)
+                after -= 1
+            elif context:
+                before.append((n, '-', line))
+    return "\n".join(out)[:limit], hits, cut
+
+
+def read_file_slice(path, offset=None, length=None, head=None, tail=None, grep=None, context=0,
+                    limit=FILE_READ_LIMIT):
+    """Liest nur den benötigten Teil einer Datei (mmap) und nummeriert die Zeilen.
+
+    offset/length: Byte-Bereich · head/tail: erste/letzte n Zeilen ·
+    grep: Regex (sonst Text; Groß/klein egal), context = Zeilen davor/danach.
+    Ohne Angaben: Dateianfang bis limit Zeichen.
+    Gibt {'text', 'encoding', 'size', 'mode', 'lines', 'truncated', 'matches'} zurück.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        enc, bom = detect_encoding(f.read(FILE_SAMPLE_BYTES))
+    info = {'encoding': enc, 'size': size, 'mode': 'anfang', 'lines': (0, 0), 'truncated': False, 'matches': None}
+    if grep:
+        text, hits, cut = _grep_file(path, enc, grep, context, limit)
+        return dict(info, text=text, mode='grep', matches=hits, truncated=cut)
+    if size <= bom:
+        return dict(info, text="")
+    width = len('\n'.encode(enc))
+    nl = '\n'.encode(enc)
+    align = lambda pos: pos - (pos - bom) % width
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if tail:
+            end = size - width if mm[size - width:size] == nl else size
+            start, pos = bom, end
+            for _ in range(tail):
+                p = mm.rfind(nl, bom, pos)
+                while p >= 0 and (p - bom) % width:  # UTF-16/32: nur ausgerichtete Treffer
+                    p = mm.rfind(nl, bom, p + width - 1)
+                if p < 0:
+                    start = bom  # weniger Zeilen als verlangt → ab Dateianfang
+                    break
+                pos, start = p, p + width
+            if end - start > limit * 4:
+                start, info['truncated'] = align(end - limit * 4), True
+            info['mode'] = 'ende'
+        else:
+            start = align(min(size, bom + max(0, int(offset or 0))))
+            end = min(size, start + (limit * 4 if length is None else max(0, int(length))))
+            if offset is not None or length is not None:
+                info['mode'] = 'bereich'
+            info['truncated'] = end < size
+        first = _count_newlines(mm, bom, start, nl) + 1
+        raw = mm[start:end]
+    lines = raw.decode(enc, errors='replace').replace('\r\n', '\n').split('\n') if raw else []
+    if head and not tail and len(lines) > head:
+        lines, info['truncated'] = lines[:head], True
+    if lines and lines[-1] == '' and len(lines) > 1:
+        lines.pop()
+    body = "\n".join(f"{first + i}: {line}" for i, line in enumerate(lines))
+    if len(body) > limit:
+        body, info['truncated'] = body[:limit], True
+    return dict(info, text=body, lines=(first, first + body.count('\n')))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BEFEHLE (erfasst, auf Wunsch parallel)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+COMMAND_TIMEOUT = 60            # Sekunden pro Befehl (PowerShell: 120)
+COMMAND_OUTPUT_CAP = 16000      # behaltene Zeichen pro Befehl und Strom (Anfang + Ende)
+COMMAND_PARALLEL = 4            # gleichzeitig laufende erfasste Befehle (nur mit "parallel": true)
+COMMAND_LOG_LINES = 30          # gestreamte Zeilen pro Befehl im Log
+# Programme mit Fenster werden nur gestartet (keine Ausgabe, kein Warten)
+LAUNCH_RE = re.compile(r'^\s*(start|explorer|notepad|calc|mspaint|winword|excel|powerpnt|chrome|msedge|firefox)'
+                       r'(\.exe)?(?=\s|$)', re.I)   # nicht "Write-Output", "calc-x.ps1" usw.
+
+
+def is_launch_command(cmd):
+    return bool(LAUNCH_RE.match(cmd))
+
+
+def _decode_line(raw):
+    """Konsolen-Ausgabe: UTF-8, sonst OEM-Codepage (cmd.exe), sonst Latin-1"""
+    try: return raw.decode('utf-8')
+    except UnicodeDecodeError: return raw.decode('oem' if IS_WINDOWS else 'latin-1', errors='replace')
+
+
+class OutputBuffer:
+    """Begrenzte Ausgabe: Anfang und Ende bleiben, die Mitte wird nur gezählt"""
+
+    def __init__(self, cap=COMMAND_OUTPUT_CAP):
+        self.head, self.tail = [], deque()
+        self.head_left, self.tail_cap, self.tail_size = cap * 3 // 4, cap // 4, 0
+        self.dropped = 0
+
+    def add(self, line):
+        if self.head_left >= len(line) and not self.tail:
+            self.head.append(line)
+            self.head_left -= len(line)
+            return
+        self.tail.append(line)
+        self.tail_size += len(line)
+        while self.tail_size > self.tail_cap and len(self.tail) > 1:
+            old = self.tail.popleft()
+            self.tail_size -= len(old)
+            self.dropped += len(old)
+
+    def text(self):
+        mid = f"… [{self.dropped} Zeichen ausgelassen] …\n" if self.dropped else ""
+        return "".join(self.head) + mid + "".join(self.tail)
+
+
+def _kill_tree(proc):
+    try:
+        if IS_WINDOWS:
+            subprocess.run(['taskkill', '/f', '/t', '/pid', str(proc.pid)], capture_output=True,
+                           creationflags=subprocess.CREATE_NO_WINDOW)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)  # Shell samt Kindern (eigene Prozessgruppe)
+    except: pass
+
+
+def run_command(cmd, timeout=None, cap=COMMAND_OUTPUT_CAP, on_line=None, cancel=None):
+    """Führt einen Shell-Befehl aus und erfasst stdout/stderr begrenzt.
+
+    on_line(strom, zeile) bekommt jede Zeile sofort (Log); cancel() → Abbruch.
+    Gibt {'cmd', 'code', 'out', 'err', 'secs', 'timeout'} zurück (code None = abgebrochen).
+    """
+    timeout = timeout or (COMMAND_TIMEOUT * 2 if 'powershell' in cmd.lower() else COMMAND_TIMEOUT)
+    t0 = time.perf_counter()
+    result = {'cmd': cmd, 'code': None, 'out': "", 'err': "", 'secs': 0.0, 'timeout': False}
+    try:
+        proc = subprocess.Popen(cmd, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, start_new_session=not IS_WINDOWS,
+                                creationflags=subprocess.CREATE_NO_WINDOW if IS_WINDOWS else 0)
+    except Exception as e:
+        result['err'] = str(e)
+        return result
+    bufs = {'out': OutputBuffer(cap), 'err': OutputBuffer(cap)}
+
+    def pump(pipe, name):
+        for raw in iter(pipe.readline, b''):
+            line = _decode_line(raw).replace('\r\n', '\n')
+            bufs[name].add(line)
+            if on_line:
+                on_line(name, line.rstrip('\n'))
+        pipe.close()
+
+    readers = [threading.Thread(target=pump, args=(proc.stdout, 'out'), daemon=True),
+               threading.Thread(target=pump, args=(proc.stderr, 'err'), daemon=True)]
+    for r in readers:
+        r.start()
+    deadline = t0 + timeout
+    while True:
+        try:
+            result['code'] = proc.wait(0.2)
+            break
+        except subprocess.TimeoutExpired:
+            if time.perf_counter() >= deadline or (cancel and cancel()):
+                result['timeout'] = time.perf_counter() >= deadline
+                _kill_tree(proc)
+                proc.wait()
+                break
+    for r in readers:
+        r.join(2.0)  # Enkelprozesse können die Pipe offen halten
+    result['out'], result['err'] = bufs['out'].text(), bufs['err'].text()
+    result['secs'] = time.perf_counter() - t0
+    return result
+
+
+def run_commands_captured(cmds, parallel=False, timeout=None, on_line=None, cancel=None):
+    """Mehrere Befehle erfassen, nacheinander oder (parallel=True) gleichzeitig. Ergebnisse in der Reihenfolge von cmds.
+
+    on_line(nr, strom, zeile) mit nr = Index in cmds.
+    """
+    def one(i):
+        return run_command(cmds[i], timeout, on_line=(lambda s, l: on_line(i, s, l)) if on_line else None,
+                           cancel=cancel)
+    if not parallel or len(cmds) == 1:
+        results = []
+        for i in range(len(cmds)):
+            if cancel and cancel():
+                break
+            results.append(one(i))
+        return results
+    with ThreadPoolExecutor(max_workers=min(COMMAND_PARALLEL, len(cmds)), thread_name_prefix='cmd') as ex:
+        return list(ex.map(one, range(len(cmds))))
+
+
+def format_command_results(results, limit=8000):
+    """Ausgaben für den nächsten LLM-Schritt; das Limit wird gleichmäßig verteilt"""
+    per = max(500, limit // max(1, len(results)))
+    parts = []
+    for r in results:
+        code = "Timeout" if r['timeout'] else "abgebrochen" if r['code'] is None else f"exit {r['code']}"
+        block = f"$ {r['cmd']}  ({code}, {r['secs']:.1f}s)\n"
+        out, err = r['out'].strip(), r['err'].strip()
+        if out:
+            block += out[:per] + (f"\n… [+{len(out) - per} Zeichen]" if len(out) > per else "") + "\n"
+        if err:
+            block += "STDERR:\n" + err[:per // 4] + "\n"
+        if not out and not err:
+            block += "(keine Ausgabe)\n"
+        parts.append(block)
+    return "\n".join(parts)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MAKROS (erfolgreiche Abläufe speichern und wiederholen)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+TRAJECTORY_FILE = os.path.join(SCRIPT_DIR, "trajectories.json")
+TRAJECTORY_MAX = 200
+SCREEN_CHECK_BITS = 10          # max. abweichende dHash-Bits (von 64) für "gleicher Bildschirm"
+PAGE_CHECK_ACTIONS = {'playwright_click', 'playwright_type', 'playwright_scroll'}
+SCREEN_CHECK_ACTIONS = {'mouse_click', 'key', 'pywinauto_type'}
+MACRO_SKIP_ACTIONS = {'screenshot', 'get_dom'}               # nur fürs Modell – beim Abspielen überflüssig
+MACRO_READ_ACTIONS = {'playwright_get_text', 'read_file'}    # Antwort hängt vom Gelesenen ab → kein Makro
+_EDGE_PUNCT = '"\'„“”‚‘’»«.,!?:;'
+
+
+def page_key(url):
+    """Host + Pfad ohne Query: Ergebnisseiten verschiedener Suchbegriffe zählen als dieselbe Seite"""
+    u = urlparse(url or '')
+    return u.netloc + u.path.rstrip('/') if u.netloc else (url or '')
+
+
+def dom_signature(line):
+    """Mini-DOM-Zeile ohne Text und Linkziel: 'id tag#id:type' – bleibt bei anderem Suchbegriff gleich"""
+    return (line or '').split(' "', 1)[0].split(' →', 1)[0].strip()
+
+
+def dom_lines(text):
+    """Mini-DOM-Liste → {index: zeile}"""
+    return {line.split(' ', 1)[0]: line for line in (text or '').split('\n') if line[:1].isdigit()}
+
+
+def screen_hash():
+    """64-Bit-dHash des ganzen Bildschirms als Hex-Text"""
+    return f"{FrameDiffer.dhash(pyautogui.screenshot().convert('L')):016x}"
+
+
+def match_task(stored, new):
+    """Vergleicht zwei Aufgaben wortweise: (ähnlichkeit, alt, neu).
+
+    Passend heißt: gleicher Anfang und gleiches Ende, dazwischen höchstens
+    ein abweichender Teil – der Parameter (z.B. der Suchbegriff), der beim
+    Abspielen ersetzt wird. Ohne Treffer (0.0, None, None).
+    """
+    a, b = list(re.finditer(r'\S+', stored)), list(re.finditer(r'\S+', new))
+    wa = [m.group().lower().strip(_EDGE_PUNCT) for m in a]
+    wb = [m.group().lower().strip(_EDGE_PUNCT) for m in b]
+    n = min(len(a), len(b))
+    p = 0
+    while p < n and wa[p] == wb[p]:
+        p += 1
+    if p == len(a) == len(b):
+        return 1.0, '', ''
+    s = 0
+    while s < n - p and wa[-1 - s] == wb[-1 - s]:
+        s += 1
+    score = (p + s) / max(len(a), len(b))
+    if p + s < 2 or score < 0.5 or p + s in (len(a), len(b)):
+        return 0.0, None, None
+    old = stored[a[p].start():a[len(a) - s - 1].end()].strip(_EDGE_PUNCT)
+    new = new[b[p].start():b[len(b) - s - 1].end()].strip(_EDGE_PUNCT)
+    return (score, old, new) if old and new else (0.0, None, None)
+
+
+def substitute_action(data, old, new):
+    """Setzt den neuen Parameter ein (auch URL-kodiert): (daten, ersetzt?)"""
+    if not old or data is None:
+        return data, False
+    repl = {}
+    for enc in (str, quote_plus, quote):   # Klartext hat Vorrang, falls die Kodierung nichts ändert
+        repl.setdefault(enc(old), enc(new))
+    pattern = re.compile('|'.join(re.escape(k) for k in sorted(repl, key=len, reverse=True)))
+    hit = False
+
+    def sub(v):
+        nonlocal hit
+        if isinstance(v, str):
+            out = pattern.sub(lambda m: repl[m.group()], v)
+            hit = hit or out != v
+            return out
+        if isinstance(v, list):
+            return [sub(x) for x in v]
+        if isinstance(v, dict):
+            return {k: sub(x) for k, x in v.items()}
+        return v
+    return sub(data), hit
+
+
+def check_mismatch(expect, check):
+    """Warum der aktuelle Zustand nicht zum gespeicherten Prüfwert passt – None, wenn er passt"""
+    check = check or {}
+    if 'page' in expect and expect['page'] != check.get('page'):
+        return f"andere Seite ({check.get('page') or 'keine'} statt {expect['page']})"
+    if 'element' in expect and expect['element'] != check.get('element'):
+        return f"anderes Element ({check.get('element') or 'fehlt'} statt {expect['element']})"
+    if 'screen' in expect:
+        if 'screen' not in check:
+            return "kein Screenshot möglich"
+        bits = bin(int(expect['screen'], 16) ^ int(check['screen'], 16)).count('1')
+        if bits > SCREEN_CHECK_BITS:
+            return f"Bildschirm anders ({bits}/64 Bits)"
+    return None
+
+
+def _task_norm(task):
+    return ' '.join(task.lower().split())
+
+
+class TrajectoryLibrary:
+    """Erfolgreiche Abläufe als JSON: Aufgabe, Start-URL, Aktionen mit Prüfwerten.
+
+    Geteilt von allen Sitzungen. Pro Aufgabentext ein Eintrag; über limit
+    fliegen die am längsten unbenutzten raus. Gespeichert wird im Hintergrund.
+    """
+
+    def __init__(self, path=TRAJECTORY_FILE, limit=TRAJECTORY_MAX):
+        self.path, self.limit = path, limit
+        self.lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.items = json.load(f)
+        except (OSError, ValueError):
+            self.items = []
+
+    def match(self, task):
+        """Bestes Makro für eine neue Aufgabe: (eintrag, alt, neu) oder (None, None, None)"""
+        best, best_rank = (None, None, None), (0.0, 0)
+        with self.lock:
+            for t in self.items:
+                score, old, new = match_task(t['task'], task)
+                if not score or (score, t['uses']) <= best_rank:
+                    continue
+                subs = [substitute_action(st['action'], old, new) for st in t['steps']]
+                if old and not any(hit for _, hit in subs):
+                    continue  # Parameter steckt in keiner Aktion → Makro würde das Falsche tun
+                if any(hit and a.get('action') == 'run_commands' for a, hit in subs):
+                    continue  # Nutzertext nie ungeprüft in Shell-Befehle
+                best, best_rank = (t, old, new), (score, t['uses'])
+        return best
+
+    def add(self, task, start_url, steps, tokens):
+        now = time.time()
+        entry = {'task': task, 'start_url': start_url, 'steps': steps, 'tokens': tokens,
+                 'uses': 0, 'fails': 0, 'created': now, 'used': now}
+        with self.lock:
+            self.items = [t for t in self.items if _task_norm(t['task']) != _task_norm(task)]
+            self.items.append(entry)
+            if len(self.items) > self.limit:
+                self.items.sort(key=lambda t: t['used'])
+                del self.items[:-self.limit]
+        self.save()
+        return entry
+
+    def used(self, entry, ok):
+        with self.lock:
+            entry['used'] = time.time()
+            entry['uses' if ok else 'fails'] = entry.get('uses' if ok else 'fails', 0) + 1
+        self.save()
+
+    def save(self):
+        _BACKGROUND.submit(self._write)
+
+    def _write(self):
+        try:
+            with self.lock:
+                data = json.dumps(self.items, ensure_ascii=False, indent=1)
+                tmp = self.path + '.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PLAN-MODUS (mehrere Aktionen pro Antwort)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+PLAN_MAX_ACTIONS = 8
+PLAN_TARGET_RADIUS = 40         # Umgebung eines Klickziels in Pixeln
+PLAN_TARGET_CHANGED = 0.1       # Anteil geänderter Pixel, ab dem das Ziel als verändert gilt
+
+PLAN_PROMPT = """
+
+═══════════════════════════════════════════════════════════════════════════════
+📋 PLAN-MODUS: mehrere Aktionen in EINER Antwort erlaubt
+═══════════════════════════════════════════════════════════════════════════════
+Wenn die nächsten Schritte klar sind, schicke sie als Plan – sie laufen direkt nacheinander:
+{"action": "plan", "steps": [
+  {"action": "playwright_type", "index": 12, "text": "mini pc"},
+  {"action": "key", "key": "Return", "expect": {"url": "search"}},
+  {"action": "playwright_get_text", "selector": "main"}
+]}
+- "if": Vorbedingung VOR dem Schritt, "expect": Kontrolle DANACH.
+  Felder (Teiltext, egal ob groß/klein): "url", "title" (Seitentitel), "element" (Mini-DOM-Zeile)
+- Der Plan stoppt beim ersten Fehler, bei einer falschen Bedingung oder wenn sich Seite bzw.
+  Klickziel unerwartet geändert haben. Du bekommst dann den Stand und planst neu.
+- Höchstens 8 Schritte. Nur Ziele verwenden, die du JETZT siehst (Indizes gelten nur bis zum
+  nächsten Seitenwechsel). "screenshot", "playwright_get_text" und "done" nur als letzten Schritt.
+- Einzelne Aktionen wie bisher sind weiterhin erlaubt."""
+
+
+def target_changed(before, after, x, y, radius=PLAN_TARGET_RADIUS):
+    """Hat sich die Umgebung eines Klickziels sichtbar verändert? (zwei Graustufenbilder)"""
+    box = (max(0, int(x) - radius), max(0, int(y) - radius), int(x) + radius, int(y) + radius)
+    a, b = before.crop(box), after.crop(box)
+    changed = ImageChops.difference(a, b).point(lambda v: 255 if v > 24 else 0).histogram()[255]
+    return changed > a.size[0] * a.size[1] * PLAN_TARGET_CHANGED
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# AGENT-ENGINE (ohne GUI)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+AGENT_SESSIONS = 1              # parallele Sitzungen, mehr nur per --sessions (teilen sich Maus/Tastatur)
+DESKTOP_ACTIONS = {'mouse_click', 'key', 'pywinauto_connect', 'pywinauto_type', 'screenshot'}
+
+
+class AgentSession:
+    """Eine Agent-Sitzung: eigener Verlauf, Fehler-Tracker, Browser-Kontext und Worker-Thread.
+
+    Sitzung 1 nutzt den Standard-Kontext des Debug-Chrome (Profil mit Logins),
+    jede weitere einen eigenen, isolierten Browser-Kontext. LLM-Clients teilen
+    sich alle Sitzungen; Maus und Tastatur bekommt immer nur eine (DESKTOP_LOCK).
+    """
+    MAX_STEPS = 30
+
+    def __init__(self, engine, sid):
+        self.engine, self.id = engine, sid
+        self.cur = engine.cur
+        self.stop = False
+        self.desktop_w, self.desktop_h = get_desktop_size()
+        self.last_screenshot_img = None
+        self.last_screenshot_b64 = None
+        self.pending_image = None
+        self.ss_note = ""
+        self.ss_map = (0, 0, 1.0)      # Offset x, Offset y, scale des zuletzt gesendeten Bildes
+        self.wait_total = 0.0
+        self.cache_hits = 0
+        self.actions_run = 0
+        self.plan_stats = {'plans': 0, 'actions': 0, 'stopped': 0}
+        self.screenshot_count = 0
+        
+        self.browser = BrowserHelper(isolated=sid > 1)
+        self.pw = PywinautoHelper()
+        self.failures = FailureTracker()
+        self.ledger = TokenLedger()
+        self.differ = FrameDiffer()
+        self.ctx = ContextManager()
+        self.task_stats = TaskStats()
+        self.tracer = Tracer()
+        self.trace_path = None
+        
+        self.page_text = ""
+        self.mini_dom = ""
+        self.dom_lines, self.dom_carry = {}, ""
+        self.dom_base_sent = False
+        self._file_content = ""
+        self._cmd_output = ""
+        self._read_ok = None
+        self.msgs = None
+        
+        self.current = None
+        self._queue = queue.Queue()
+        threading.Thread(target=self._worker, name=f'agent-{sid}', daemon=True).start()
+
+    @property
+    def system_prompt(self):
+        return self.engine.system_prompt
+
+    @property
+    def load(self):
+        return (self.current is not None) + self._queue.qsize()
+
+    def emit(self, kind, **data):
+        return self.engine.emit(kind, session=self.id, **data)
+
+    def log(self, text):
+        self.emit('log', task=self.current['id'] if self.current else None, text=text)
+
+    def set_config(self, cfg):
+        self.cur = cfg
+        self.ledger.cache_factor = cfg.get('cache_price_factor', 1.0)
+        self.ctx.budget = cfg.get('context_budget', 16000)
+
+    def reset_context(self):
+        """Verlauf und Aufgaben-Zustand verwerfen (wie 'NEU' bzw. Button Neu)"""
+        self.msgs = None
+        self.page_text = self._file_content = self._cmd_output = ""
+        self.mini_dom = ""
+        self.dom_lines, self.dom_carry = {}, ""
+        self.dom_base_sent = False
+        self._read_ok = None
+        self.failures.reset()
+        self.ctx.reset()
+        self.differ.reset()
+        self.ss_map = (0, 0, 1.0)
+
+    @contextmanager
+    def desktop(self):
+        """Maus, Tastatur und Bildschirm exklusiv für diese Sitzung"""
+        t0 = time.perf_counter()
+        with DESKTOP_LOCK:
+            waited = time.perf_counter() - t0
+            if waited > 0.05:
+                self.tracer.add("Warten Desktop", t0, t0 + waited, 'wait')
+                self.log(f"    🔒 Desktop nach {waited:.2f}s frei\n")
+            yield
+
+    def _worker(self):
+        engine = self.engine
+        while True:
+            task = self._queue.get()
+            if task is None:
+                break
+            with engine._lock:
+                if task['status'] != 'queued':
+                    continue
+                self.stop = False
+                self.current = task
+                task['status'], task['started'] = 'running', time.time()
+            self.emit('task', task=task['id'], status='running', cmd=task['cmd'], source=task['source'])
+            try:
+                if not self.cur:
+                    raise RuntimeError("Kein LLM gewählt")
+                self.run_task(task)
+            except Exception as e:
+                task['status'], task['error'] = 'failed', str(e)
+                self.log(f"❌ {e}\n")
+            task['ended'] = time.time()
+            self.log(self.summary())
+            self.current = None
+            self.emit('task', task=task['id'], status=task['status'], steps=task['steps'],
+                      message=task['message'], error=task['error'])
+
+    def summary(self):
+        """Abschluss-Block einer Aufgabe (Tokens, Kompaktierung, Screenshots, Zeiten)"""
+        lines = [f"\n{'='*60}\n📊 Screenshots: {self.screenshot_count}"]
+        if self.ledger.steps:
+            lines.append(f"🧮 {self.ledger.task_summary()}")
+        if self.ctx.summary():
+            lines.append(self.ctx.summary())
+        st = self.differ.stats
+        if st['unchanged'] or st['region']:
+            lines.append(f"📸 Screenshots: {st['full']} ganz, {st['region']} Ausschnitt, {st['unchanged']} unverändert "
+                         f"→ −{st['bytes_saved']//1024} KB, ~−{st['tokens_saved']} Tokens")
+        if self.ledger.steps:
+            calls, n = len(self.ledger.steps), self.actions_run
+            line = f"🧭 {n} Aktionen in {calls} LLM-Aufrufen ({n / calls:.1f} pro Aufruf)"
+            if self.current and self.current.get('started'):
+                line += f", {(self.current.get('ended') or time.time()) - self.current['started']:.1f}s"
+            ps = self.plan_stats
+            if ps['plans']:
+                line += f" | 📋 {ps['plans']} Pläne, {ps['actions']} Plan-Aktionen, {ps['stopped']}x gestoppt"
+            lines.append(line)
+        if (self.cur or {}).get('hedge_config') and self.ledger.steps:
+            lines.append(PROVIDER_STATS.summary([self.cur, self.cur['hedge_config']]))
+        if (self.cur or {}).get('response_cache') and self.ledger.steps:
+            lines.append(f"🗄️ Antwort-Cache: {self.cache_hits}/{len(self.ledger.steps)} Schritte aus dem Cache")
+        lines.append(self.task_stats.summary())
+        lines.append(f"⏱️ Wartezeit gesamt: {self.wait_total:.2f}s")
+        table = self.tracer.table()
+        if table:
+            lines.append(f"{table}\n📁 Trace: {self.trace_path}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        self.stop = True
+        self._queue.put(None)
+        try:
+            self.browser.shutdown()
+            self.pw.disconnect()
+        except: pass
+
+    # ─── Schritt-Helfer ────────────────────────────────────────────────────────
+
+    def settle(self, what, label, **kw):
+        """Wartet auf ein echtes Signal (Seite/Bildschirm) und loggt die Wartezeit"""
+        if what == 'page':
+            ok, t = self.browser.wait_ready(**kw)
+        else:
+            ok, t, _ = wait_screen_stable(**kw)
+        self.wait_total += t
+        now = time.perf_counter()
+        self.tracer.add(f"Warten {label}", now - t, now, 'wait', ok=ok)
+        self.log(f"    ⏱️ {label} {'bereit' if ok else 'Timeout'} nach {t:.2f}s\n")
+
+    def prewarm_browser(self):
+        """Debug-Chrome im Hintergrund starten, damit browser_start nur noch navigiert"""
+        t0 = time.perf_counter()
+        try: ok, how = self.browser.ensure()
+        except Exception as e: ok, how = False, str(e)[:50]
+        t = time.perf_counter() - t0
+        self.log(f"🌐 Browser vorgewärmt ({how}) in {t:.2f}s\n" if ok else f"⚠️ Browser-Vorwärmen: {how}\n")
+
+    def trace_llm(self, t1, t2, info):
+        """LLM-Spanne plus Aufteilung: bis zum ersten Byte / Rest (Generierung, Stream)"""
+        args = {k: round(info[k], 3) for k in ('ttfb', 'first_token', 'rate_wait', 'slot_wait', 'retry_wait') if k in info}
+        self.tracer.add("LLM", t1, t2, 'llm', attempts=info['attempts'], **args)
+        if 't_send' in info and 'ttfb' in info:
+            t_first = min(t2, info['t_send'] + info['ttfb'])
+            self.tracer.add("LLM bis 1. Byte", info['t_send'], t_first, 'llm')
+            self.tracer.add("LLM Antwort", t_first, t2, 'llm')
+
+    def end_step(self, i, action, t_step, t_act):
+        now = time.perf_counter()
+        self.tracer.add(f"Aktion {action}", t_act, now, 'action')
+        self.tracer.add("Schritt", t_step, now, 'step', step=i + 1, action=action)
+
+    def dom_update(self):
+        """Mini-DOM-Block für den Verlauf: beim ersten Mal die volle Liste, danach nur Änderungen"""
+        if not self.browser.has_page():
+            return ""
+        if self.dom_base_sent:
+            kind, text, n = self.browser.get_mini_dom_delta()
+        else:
+            kind, text = 'full', self.browser.get_mini_dom()
+        if kind == 'full':
+            self.mini_dom = text or ""
+            self.dom_lines = dom_lines(self.mini_dom)
+            self.dom_base_sent = bool(self.mini_dom)
+            n = len(self.mini_dom.split('\n')) if self.mini_dom else 0
+            self.log(f"    📋 Mini-DOM v{self.browser.dom_version}: {n} Elemente (voll)\n")
+            return f"\n\n📋 BROWSER-ELEMENTE (v{self.browser.dom_version}):\n{self.mini_dom}" if self.mini_dom else ""
+        if kind == 'same':
+            return f"\n\n📋 Browser-Elemente unverändert {text}"
+        for line in text.split('\n')[1:]:
+            if line[:1] in '+~':
+                self.dom_lines[line[1:].split(' ', 1)[0]] = line[1:]
+            elif line[:1] == '-':
+                self.dom_lines.pop(line[1:], None)
+        self.log(f"    📋 Mini-DOM Δ: {n} Änderungen\n")
+        return f"\n\n📋 BROWSER-ELEMENTE GEÄNDERT ({text}"
+
+    def step_state(self):
+        """Flüchtiger Zustand für den nächsten LLM-Aufruf: (Warnung, Zustandsblock)"""
+        warn = self.failures.get_failure_warning()
+        
+        mx, my = get_mouse_position()
+        state = f"\n\n🖱️ Maus: {mx},{my} | Bildschirm: {self.desktop_w}x{self.desktop_h}"
+        if self.ss_note:
+            state += f"\n{self.ss_note}"
+            self.ss_note = ""
+        
+        # Dokumenten-Info
+        doc_info = [n for n in ('docx', 'xlsx', 'pptx') if CAPS.known(n)]
+        if doc_info:
+            state += f"\n📄 Verfügbare Dokument-Actions: create_{', create_'.join(doc_info)}"
+        
+        if self.browser.has_page():
+            info = self.browser.get_page_info()
+            if info: 
+                state += f"\n🌐 Browser: {info.get('title', '?')[:50]}"
+        
+        if self.page_text:
+            state += f"\n\n📖 SEITEN-TEXT (relevanteste Abschnitte, [#Position/Anzahl]):\n{self.page_text[:PAGE_TEXT_BUDGET]}"
+        
+        if self._cmd_output:
+            # Nur im Schritt direkt nach run_commands – danach nicht bei jedem Aufruf erneut mitschicken
+            state += f"\n\n💻 BEFEHLSAUSGABE (letztes run_commands, nur jetzt sichtbar):\n{self._cmd_output}"
+            self._cmd_output = ""
+        
+        if self._file_content:
+            state += f"\n\n💻 GELESENE DATEI (✅ ERFOLGREICH):\n{self._file_content[:FILE_READ_LIMIT + 300]}"
+            state += "\n\n✅ Daten sind sichtbar - du kannst 'done' sagen!"
+        elif self._read_ok == False:
+            state += "\n\n⚠️ LETZTES read_file FEHLGESCHLAGEN! NICHT 'done' sagen!"
+        return warn, state
+
+    def make_stream_logger(self):
+        """Zeigt gestreamte LLM-Teilstücke gebündelt (max. 10x/s) im Log"""
+        buf = []
+        state = {'started': False, 't': time.time()}
+        def flush():
+            if buf:
+                text = ''.join(buf)
+                buf.clear()
+                state['t'] = time.time()
+                self.log(text)
+        def on_delta(piece):
+            if piece is None:  # Stream abgerissen → neuer Versuch beginnt eine neue Zeile
+                if state['started']:
+                    buf.append(" ✂️ abgerissen, neuer Versuch\n")
+                    flush()
+                    state['started'] = False
+                return
+            if not state['started']:
+                state['started'] = True
+                buf.append("    🤖 ")
+            buf.append(piece)
+            if '\n' in piece or time.time() - state['t'] >= 0.1:
+                flush()
+        return on_delta, flush, state
+
+    # ─── Agent-Schleife ────────────────────────────────────────────────────────
+
+    def run_task(self, task):
+        """Die Agent-Schleife für eine Aufgabe (blockiert; läuft im Worker-Thread)"""
+        cmd, force_new = task['cmd'], task['new']
+        new_ctx = self.msgs is None or force_new
+        if new_ctx:
+            plan = self.cur.get('plan_mode')
+            msgs = [{"role": "system", "content": self.system_prompt + (PLAN_PROMPT if plan else "")},
+                    {"role": "user", "content": f"Aufgabe: {cmd}\n\nDENKE → HANDLE → KONTROLLIERE. "
+                                                f"{'EINE JSON-Aktion oder EIN Plan!' if plan else 'EINE JSON-Aktion!'}"}]
+            self.page_text = self._file_content = self._cmd_output = ""
+            self.mini_dom = ""
+            self.dom_lines, self.dom_carry = {}, ""
+            self.dom_base_sent = False
+            self._read_ok = None
+            self.failures.reset()
+            self.ctx.reset()
+            self.differ.reset()
+            self.ss_map = (0, 0, 1.0)
+            self.log("🔍 Neuer Kontext\n")
+        else:
+            msgs = list(self.msgs)
+            msgs.append({"role": "user", "content": f"Nachfrage: {cmd}"})
+            self.log("🔍 Kontext beibehalten\n")
+        self.ledger.start_task()
+        self.tracer.reset()
+        
+        self.pw.disconnect()
+        if CAPS.known('pywinauto'): self.log("✅ pywinauto\n")
+        if CAPS.known('playwright'): self.log("✅ Playwright\n")
+        
+        self.pending_image = None
+        task_done = False
+        compactions = self.ctx.stats['compactions']
+        self.wait_total = 0.0
+        self.cache_hits = 0
+        self.actions_run = 0
+        self.plan_stats = {'plans': 0, 'actions': 0, 'stopped': 0}
+        
+        # Makro: gespeicherter Ablauf einer ähnlichen Aufgabe → ohne LLM abspielen
+        self.trajectory = []
+        use_macros = new_ctx and self.cur.get('macros', True)
+        start_url = (self.browser.get_page_info() or {}).get('url', '') if self.browser.has_page() else ''
+        macro, old, new = self.engine.library.match(cmd) if use_macros else (None, None, None)
+        if macro:
+            task_done = self.replay(macro, old, new, task, msgs)
+        
+        for i in range(0 if task_done else self.MAX_STEPS):
+            if self.stop:
+                self.log("⏹ Stop\n")
+                task['status'] = 'cancelled'
+                break
+            
+            task['steps'] = i + 1
+            self.emit('step', task=task['id'], step=i + 1)
+            self.log(f"\n[{i+1}] 🧠 Denke...\n")
+            t_step = time.perf_counter()
+            
+            with self.tracer.span("Kontext kompaktieren", 'context'):
+                msgs, cinfo = self.ctx.compact(msgs)
+            if cinfo:
+                self.log(
+                    f"    🗜️ Kontext kompaktiert: {cinfo['msgs_before']}→{cinfo['msgs_after']} Nachrichten, "
+                    f"~{cinfo['tokens_before']}→~{cinfo['tokens_after']} Tokens\n")
+            
+            if cinfo:
+                self.dom_base_sent = False  # alte Listen sind weg → wieder voll senden
+            with self.tracer.span("Mini-DOM", 'browser'):
+                dom_block = self.dom_carry + self.dom_update()  # Änderungen während eines Plans zuerst
+                self.dom_carry = ""
+            t_ctx = time.perf_counter()
+            warn, state = self.step_state()
+            msgs, volatile, last = assemble_context(msgs, dom_block, warn, state, self.cur.get('prompt_cache', True))
+            self.tracer.add("Kontext zusammenbauen", t_ctx, time.perf_counter(), 'context')
+            
+            ss_b64, ss_size = self.pending_image or (None, None)
+            self.pending_image = None
+            t1 = time.perf_counter()
+            on_delta, flush_stream, streamed = self.make_stream_logger()
+            resp, err, info = llm_chat(self.cur, msgs, ss_b64, on_delta=on_delta, volatile=volatile)
+            sent_size = ss_size if ss_b64 else None
+            t2 = time.perf_counter()
+            self.trace_llm(t1, t2, info)
+            flush_stream()
+            if info['slot_wait'] > 0.05:
+                self.log(f"    🚦 LLM-Slot nach {info['slot_wait']:.2f}s frei (Parallele Anfragen: {self.cur.get('max_parallel', 2)})\n")
+            if info.get('tools_off'):
+                self.log("    ⚠️ Anbieter lehnt Tool-Calling ab → Text-JSON\n")
+            if info.get('hedge'):
+                h = info['hedge']
+                why = "Fehler" if h['failover'] else f"kein Token nach {h['deadline']:.1f}s"
+                self.log(f"    🏁 Hedge ({why}): {h['winner']} schneller, {h['loser']} abgebrochen (+{h['extra_cost']:.4f} €)\n")
+            if info['attempts'] > 1:
+                self.log(f"    🔁 {info['attempts']} Versuche ({info['retry_wait']:.1f}s Backoff) {(err or '')}\n")
+            
+            if resp is not None:
+                entry = self.ledger.record(info['usage'], msgs + [{"content": volatile or ""}], resp,
+                                           sent_size, self.cur.get('model', ''))
+                self.emit('tokens', task=task['id'], step=i + 1, summary=self.ledger.step_summary(entry),
+                          total=self.ledger.total(self.ledger.session))
+                self.log(f"    🧮 {self.ledger.step_summary(entry)}\n")
+                if info.get('usage_later'):
+                    info['usage_later'].add_done_callback(
+                        lambda f, e=entry, t=task['id'], s=i + 1: self.ledger.amend(e, f.result()) and self.emit(
+                            'tokens', task=t, step=s, summary=self.ledger.step_summary(e),
+                            total=self.ledger.total(self.ledger.session)))
+            
+            msgs[-1] = last
+            
+            if resp is None:
+                self.log(f"    ❌ API-Fehler: {err} – Aufgabe angehalten\n")
+                task['status'], task['error'] = 'failed', err
+                break
+            timing = f"{t2-t1:.1f}s, 1. Byte {info['ttfb']:.2f}s" if 'ttfb' in info else f"{t2-t1:.1f}s"
+            if info.get('cached'):
+                self.cache_hits += 1
+                self.log(f"    🗄️ Cache-Treffer ({(t2-t1)*1000:.0f} ms, 0 Tokens) {resp}\n")
+            elif streamed['started']:
+                self.log(f"  ({timing})\n")
+            else:
+                self.log(f"    {'🔧' if info.get('tool_calls') else '🤖'} ({timing}) {resp}\n")
+            self.emit('llm', task=task['id'], step=i + 1, seconds=round(t2 - t1, 3),
+                      ttfb=info.get('ttfb'), response=resp, cached=bool(info.get('cached')))
+            
+            with self.tracer.span("JSON parsen", 'parse'):
+                data, bad = parse_action(resp)
+            if bad:
+                # Nicht still "wait" – das Modell bekommt den Fehler und korrigiert im nächsten Schritt
+                self.log(f"    ⚠️ Ungültige Aktion: {bad}\n")
+                self.emit('action', task=task['id'], step=i + 1, action='invalid', data=None, result=bad)
+                self.ctx.record(resp, f"❌ {bad}")
+                msgs.append({"role": "assistant", "content": resp or "(leer)"})
+                msgs.append({"role": "user", "content": f"❌ Ungültige Aktion: {bad}. Antworte mit genau EINER gültigen JSON-Aktion."})
+                self.tracer.add("Schritt", t_step, time.perf_counter(), 'step', step=i + 1, action='invalid')
+                continue
+            action = data.get('action', '?')
+            t_act = time.perf_counter()
+            
+            report = ""
+            if action == 'plan':
+                res, report, final = self.run_plan(data.get('steps'), task, i + 1, use_macros)
+            else:
+                final = data if action == 'done' else None
+                check = None
+                try:
+                    res, check = self.perform(data, record=use_macros)
+                except Exception as e:
+                    # Eine kaputte Aktion (z.B. ohne Desktop im headless-Betrieb) beendet nicht die Aufgabe
+                    res = f"❌ {str(e)[:80]}"
+                    self.log(f"    ❌ {action}: {str(e)[:80]}\n")
+                self.emit('action', task=task['id'], step=i + 1, action=action, data=data, result=res)
+                if action not in MACRO_SKIP_ACTIONS and not str(res).startswith('❌'):
+                    self.trajectory.append({'action': data, 'check': check})
+            if final:
+                task_done = True
+                task['message'] = final.get('message', 'Fertig')
+                self.end_step(i, action, t_step, t_act)
+                break
+            
+            self.end_step(i, action, t_step, t_act)
+            self.ctx.record(resp, res)
+            msgs.append({"role": "assistant", "content": resp})
+            msgs.append({"role": "user", "content": "Weiter. Nächster Schritt?" + (f"\n\n{report}" if report else "")})
+            time.sleep(0.05)
+        
+        self.tracer.finish()
+        self.trace_path = os.path.join(TRACE_DIR, f"trace_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        _BACKGROUND.submit(write_chrome_trace, self.trace_path, self.tracer.to_chrome())
+        self.msgs = msgs
+        self.task_stats.record(task_done, self.ctx.stats['compactions'] > compactions)
+        if macro:
+            self.engine.library.used(macro, task_done and not self.ledger.steps)
+        if (task_done and use_macros and self.ledger.steps and len(self.trajectory) > 1
+                and not any(st['action'].get('action') in MACRO_READ_ACTIONS for st in self.trajectory)):
+            self.engine.library.add(cmd, start_url, self.trajectory, self.ledger.total(self.ledger.task))
+            self.log(f"⚡ Als Makro gespeichert ({len(self.trajectory) - 1} Aktionen)\n")
+        if task['status'] == 'running':
+            task['status'] = 'done' if task_done else 'incomplete'
+        return task_done
+
+    def fingerprint(self, data):
+        """Prüfwert vor einer Aktion: Seite + Ziel-Element (Browser) bzw. dHash (Bildschirm)"""
+        action = data.get('action')
+        if action in PAGE_CHECK_ACTIONS and self.browser.has_page():
+            check = {'page': page_key((self.browser.get_page_info() or {}).get('url'))}
+            if data.get('index') is not None:
+                check['element'] = dom_signature(self.dom_lines.get(str(data['index'])))
+            return check
+        if action in SCREEN_CHECK_ACTIONS:
+            try: return {'screen': screen_hash()}
+            except: return None
+        return None
+
+    def perform(self, data, expect=None, record=False):
+        """Führt eine Aktion aus (Desktop-Aktionen unter dem Desktop-Lock): (ergebnis, prüfwert).
+
+        expect ist der gespeicherte Prüfwert eines Makros – passt der Zustand
+        nicht, wird nichts ausgeführt und (None, grund) zurückgegeben.
+        """
+        with self.desktop() if data.get('action') in DESKTOP_ACTIONS else nullcontext():
+            check = self.fingerprint(data) if record or expect else None
+            if expect:
+                why = check_mismatch(expect, check)
+                if why:
+                    return None, why
+            self.actions_run += 1
+            return self.execute(data), check
+
+    def refresh_dom(self):
+        """Mini-DOM zwischen Plan-Schritten nachziehen; die Änderungen gehen mit dem nächsten LLM-Aufruf raus"""
+        if self.browser.has_page():
+            self.dom_carry += self.dom_update()
+
+    def plan_condition(self, cond, label):
+        """Prüft "if"/"expect" eines Plan-Schritts (url, title, element als Teiltext): None oder Grund"""
+        if not isinstance(cond, dict):
+            return None
+        info = (self.browser.get_page_info() or {}) if self.browser.has_page() else {}
+        for key, want in cond.items():
+            if key == 'url': have = info.get('url', '')
+            elif key == 'title': have = info.get('title', '')
+            elif key == 'element': have = "\n".join(self.dom_lines.values())
+            else: continue
+            if str(want).lower() not in have.lower():
+                return f"{label}: {key} enthält nicht '{want}'"
+        return None
+
+    def to_screen(self, x, y):
+        """Bildkoordinaten des letzten Screenshots (verkleinert/Ausschnitt) → Bildschirm"""
+        if x is None or y is None:
+            return None, None
+        ox, oy, scale = self.ss_map
+        return ox + round(float(x) / scale), oy + round(float(y) / scale)
+
+    def plan_drift(self, st, base):
+        """Hat sich seit der Planung geändert, worauf der Schritt sich verlässt? None oder Grund"""
+        idx = st.get('index')
+        if idx is not None and st['action'] in PAGE_CHECK_ACTIONS:
+            if self.browser.dom_doc != base['doc']:
+                return f"neue Seite geladen – Index {idx} gilt nicht mehr"
+            now = dom_signature(self.dom_lines.get(str(idx)))
+            if not now or now != dom_signature(base['lines'].get(str(idx))):
+                return f"Element {idx} hat sich geändert ({now or 'fehlt'})"
+        if st['action'] == 'mouse_click' and base['screen'] is not None:
+            try:
+                if target_changed(base['screen'], pyautogui.screenshot().convert('L'), *self.to_screen(st.get('x'), st.get('y'))):
+                    return f"Klickziel {st.get('x')},{st.get('y')} hat sich verändert"
+            except: pass
+        return None
+
+    def run_plan(self, steps, task, step_no, record=False):
+        """Führt die Aktionen eines Plans direkt nacheinander aus: (ergebnis, bericht, done-aktion).
+
+        Vor jedem Schritt werden "if" und – ab dem zweiten Schritt – Ziel-Element
+        bzw. Klickziel gegen den Stand bei der Planung geprüft, danach "expect".
+        Der erste Fehler beendet den Plan; der Bericht sagt dem Modell, wie weit
+        er kam.
+        """
+        steps = [st for st in (steps or []) if isinstance(st, dict) and st.get('action') not in (None, 'plan')]
+        steps = steps[:PLAN_MAX_ACTIONS]
+        self.plan_stats['plans'] += 1
+        if not steps:
+            return "❌ leerer Plan", "📋 Plan war leer – schicke Aktionen in \"steps\".", None
+        self.log(f"    📋 Plan mit {len(steps)} Aktionen\n")
+        base = {'doc': self.browser.dom_doc, 'lines': dict(self.dom_lines), 'screen': None}
+        if any(st['action'] == 'mouse_click' for st in steps[1:]):
+            try: base['screen'] = pyautogui.screenshot().convert('L')
+            except: pass
+        lines, why, final = [], None, None
+        for k, st in enumerate(steps):
+            action = st['action']
+            if self.stop:
+                why = "Stop"
+                break
+            if k:
+                self.refresh_dom()
+                why = self.plan_drift(st, base)
+                if why:
+                    break
+            why = self.plan_condition(st.get('if'), "Vorbedingung")
+            if why:
+                break
+            data = {key: v for key, v in st.items() if key not in ('if', 'expect')}
+            self.log(f"    📋 {k + 1}/{len(steps)} {summarize_action(data)}\n")
+            try:
+                res, check = self.perform(data, record=record)
+            except Exception as e:
+                res, check = f"❌ {str(e)[:80]}", None
+            self.plan_stats['actions'] += 1
+            self.emit('action', task=task['id'], step=step_no, plan_step=k + 1, action=action, data=data, result=res)
+            lines.append(f"{k + 1}. {summarize_action(data)} → {res or '✅'}")
+            if str(res).startswith('❌'):
+                why = f"Schritt {k + 1} fehlgeschlagen"
+                break
+            if action not in MACRO_SKIP_ACTIONS:
+                self.trajectory.append({'action': data, 'check': check})
+            if action == 'done':
+                final = data
+                break
+            if st.get('expect'):
+                self.refresh_dom()
+                why = self.plan_condition(st['expect'], f"Kontrolle nach Schritt {k + 1}")
+                if why:
+                    break
+        done = len(lines) - (1 if why and why.startswith("Schritt") else 0)
+        if why:
+            self.plan_stats['stopped'] += 1
+            self.log(f"    ⚠️ Plan gestoppt nach {done}/{len(steps)}: {why}\n")
+            if len(lines) < len(steps):
+                lines += [f"{n + 1}. {summarize_action(st)} → ⏭ nicht ausgeführt" for n, st in enumerate(steps) if n >= len(lines)]
+        res = f"📋 {done}/{len(steps)} Aktionen" + (f", gestoppt: {why}" if why else " ✅")
+        report = f"📋 PLAN-ERGEBNIS ({done}/{len(steps)} ausgeführt" + (f", gestoppt: {why}" if why else "") + "):\n" + "\n".join(lines)
+        return res, report, final
+
+    def replay(self, macro, old, new, task, msgs):
+        """Spielt ein Makro ab; vor jeder Aktion wird der Prüfwert verglichen.
+
+        Abgespielte Aktionen landen wie LLM-Schritte im Verlauf (msgs) und in
+        self.trajectory. Bei einer Abweichung übernimmt das LLM ab dieser
+        Stelle. Gibt True zurück, wenn das Makro bis 'done' durchlief.
+        """
+        steps = macro['steps']
+        sub = f" ('{old}' → '{new}')" if old else ""
+        self.log(f"⚡ Makro gefunden: \"{macro['task'][:60]}\"{sub}, {len(steps) - 1} Aktionen\n")
+        t0 = time.perf_counter()
+        why = None
+        if macro.get('start_url') and steps[0]['action'].get('action') not in ('browser_start', 'playwright_navigate'):
+            here = (self.browser.get_page_info() or {}).get('url') if self.browser.has_page() else None
+            if page_key(here) != page_key(macro['start_url']):
+                why = f"andere Startseite ({page_key(here) or 'keine'})"
+        k = 0
+        for k, step in enumerate(steps):
+            if why:
+                break
+            if self.stop:
+                why = "Stop"
+                break
+            data, _ = substitute_action(step['action'], old, new)
+            expect, _ = substitute_action(step.get('check'), old, new)
+            action = data.get('action', '?')
+            if self.browser.has_page():
+                self.dom_update()
+            self.log(f"\n⚡ [{k + 1}/{len(steps)}] {json.dumps(data, ensure_ascii=False)[:120]}\n")
+            t_act = time.perf_counter()
+            try:
+                res, check = self.perform(data, expect, record=True)
+            except Exception as e:
+                res, check = None, str(e)[:80]
+            self.tracer.add(f"Makro {action}", t_act, time.perf_counter(), 'action')
+            if res is None:
+                why = f"Schritt {k + 1} ({action}): {check}"
+                break
+            if str(res).startswith('❌'):
+                why = f"Schritt {k + 1} ({action}) fehlgeschlagen: {res}"
+                break
+            self.emit('action', task=task['id'], step=k + 1, action=action, data=data, result=res, macro=True)
+            if action == 'done':
+                task['message'] = data.get('message', 'Fertig')
+                self.trajectory.append({'action': data, 'check': None})
+                spent = f"{macro.get('tokens', 0):,}".replace(",", ".")
+                self.log(f"⚡ Makro fertig: {len(steps) - 1} Aktionen in {time.perf_counter() - t0:.1f}s, "
+                         f"0 Tokens (beim Aufzeichnen ~{spent})\n")
+                self.emit('macro', task=task['id'], status='done', steps=k)
+                return True
+            self.trajectory.append({'action': data, 'check': check})
+            resp = json.dumps(data, ensure_ascii=False)
+            self.ctx.record(resp, res)
+            msgs.append({"role": "assistant", "content": resp})
+            msgs.append({"role": "user", "content": "Weiter. Nächster Schritt?"})
+        # Das LLM übernimmt: volle Elementliste senden und sagen, wo das Makro stehen blieb
+        why = why or "Ablauf ohne Abschluss"
+        self.dom_base_sent = False
+        msgs[-1] = {"role": "user", "content": msgs[-1]["content"] +
+                    f"\n\n⚡ Ein gespeicherter Ablauf wurde bis hier automatisch ausgeführt und abgebrochen: {why}. "
+                    "Prüfe den aktuellen Zustand und mach weiter."}
+        self.log(f"↪️ Makro abgebrochen nach {k} Aktionen: {why} → LLM übernimmt\n")
+        self.emit('macro', task=task['id'], status='fallback', steps=k, reason=why)
+        return False
+
+    def execute(self, data):
+        """Führt eine Aktion aus und gibt das Kurz-Ergebnis für das Schritt-Protokoll zurück"""
+        action = data.get('action', '?')
+        res = ""
+        
+        # ═══════════════════════════════════════════════════════════════
+        # DOKUMENT-AKTIONEN (NEU!)
+        # ═══════════════════════════════════════════════════════════════
+        
+        if action == 'create_docx':
+            path = os.path.expandvars(data.get('path', '').replace('\\\\', '\\'))
+            title = data.get('title', '')
+            content = data.get('content', '')
+            self.log(f"    📄 Erstelle DOCX: {path}\n")
+            ok, msg = create_docx_file(path, title, content)
+            self.log(f"    {'✅' if ok else '❌'} {msg}\n")
+            res = f"{'✅' if ok else '❌'} {msg[:80]}"
+        
+        elif action == 'create_xlsx':
+            path = os.path.expandvars(data.get('path', '').replace('\\\\', '\\'))
+            sheet_data = data.get('data', [])
+            self.log(f"    📊 {'Ergänze' if data.get('append') else 'Erstelle'} XLSX: {path}\n")
+            ok, msg = create_xlsx_file(path, sheet_data, data.get('sheet_name'), bool(data.get('append')))
+            self.log(f"    {'✅' if ok else '❌'} {msg}\n")
+            res = f"{'✅' if ok else '❌'} {msg[:80]}"
+        
+        elif action == 'create_pptx':
+            path = os.path.expandvars(data.get('path', '').replace('\\\\', '\\'))
+            slides = data.get('slides', [])
+            title = data.get('title', '')
+            self.log(f"    📽 Erstelle PPTX: {path}\n")
+            ok, msg = create_pptx_file(path, slides, title)
+            self.log(f"    {'✅' if ok else '❌'} {msg}\n")
+            res = f"{'✅' if ok else '❌'} {msg[:80]}"
+        
+        # ═══════════════════════════════════════════════════════════════
+        # STANDARD-AKTIONEN
+        # ═══════════════════════════════════════════════════════════════
+        
+        elif action == 'mouse_click':
+            x, y = self.to_screen(data.get('x'), data.get('y'))
+            ok, _ = mouse_click(x, y, data.get('button', 'left'), 2 if data.get('double') else 1)
+            self.log(f"    🖱️ {'✅' if ok else '❌'}\n")
+            res = '✅' if ok else '❌'
+            self.settle('screen', 'Bildschirm', timeout=1.0, expect_change=0.15)
+        
+        elif action == 'browser_start':
+            url = data.get('url', '')
+            self.log(f"    🌐 Start: {url[:50]}\n")
+            res = "❌ keine Verbindung"
+            try:
+                # Laufender Browser wird nur navigiert – kein Neustart, kein taskkill
+                ok, how = self.browser.ensure(url, bool(data.get('new_tab')))
+                self.log(f"    {'✅' if ok else '❌'} Browser: {how}\n")
+                if ok:
+                    res = f"✅ {how}"
+                    self.mini_dom = ""
+                    self.dom_base_sent = False
+                    self.settle('page', 'Seite', state='load', quiet_ms=300, timeout=5.0)
+            except Exception as e:
+                self.log(f"    ❌ {str(e)[:50]}\n")
+        
+        elif action == 'get_dom':
+            # Volle Liste statt Diff im nächsten Schritt
+            self.dom_base_sent = False
+            res = "volle Liste folgt"
+        
+        elif action == 'playwright_click':
+            ok = self.browser.click(data.get('selector'), data.get('text'), data.get('index'))
+            self.log(f"    🖱️ {'✅' if ok else '❌'}\n")
+            res = '✅' if ok else '❌'
+            if ok: self.settle('page', 'Seite', state='domcontentloaded', quiet_ms=200, timeout=3.0)
+        
+        elif action == 'playwright_type':
+            ok = self.browser.type_into(data.get('selector', ''), data.get('text', ''), data.get('index'))
+            self.log(f"    ⌨️ {'✅' if ok else '❌'}\n")
+            res = '✅' if ok else '❌'
+        
+        elif action == 'playwright_get_text':
+            with self.tracer.span("Seitentext", 'browser') as sp:
+                chunks, cached = self.browser.get_page_chunks(data.get('selector', 'body'))
+                sp['cached'] = cached
+            res = "❌ kein Text"
+            if chunks:
+                # Rangfolge gegen Aufgabe + das, wonach das Modell gerade sucht
+                query = " ".join(filter(None, [self.current['cmd'] if self.current else "",
+                                               data.get('query'), data.get('reason')]))
+                self.page_text, n, hits = select_page_text(chunks, query)
+                total = sum(len(c['text']) for c in chunks)
+                self.log(f"    📄 {len(chunks)} Abschnitte ({total} Zeichen{', Cache' if cached else ''}) → "
+                         f"{n} gesendet, {hits} mit Treffern\n")
+                res = f"✅ {n}/{len(chunks)} Abschnitte"
+        
+        elif action == 'playwright_navigate':
+            res = "❌"
+            if self.browser.navigate(data.get('url', '')):
+                res = "✅"
+                self.settle('page', 'Seite', state='load', quiet_ms=300, timeout=5.0)
+        
+        elif action == 'playwright_scroll':
+            if self.browser.scroll(data.get('direction', 'down')):
+                self.settle('page', 'Nachladen', state=None, quiet_ms=150, timeout=1.5)
+        
+        elif action == 'key':
+            k = data.get('key', '')
+            if k:
+                self.log(f"    ⌨️ {k}\n")
+                press_key(k)
+                self.settle('screen', 'Bildschirm', timeout=0.6, settle=0.1)
+        
+        elif action == 'run_commands':
+            cmds = [str(c) for c in data.get('commands', []) if str(c).strip()]
+            if cmds:
+                # Fenster-Programme nur starten; alles andere erfassen (Ausgabe geht direkt ans Modell).
+                # Reihenfolge bleibt wie geschickt; nur mit "parallel": true laufen aufeinanderfolgende
+                # erfasste Befehle gleichzeitig (Programmstarts bleiben Trennstellen).
+                detach = data.get('detach', False)
+                launch = [c for c in cmds if detach or is_launch_command(c)]
+                capture = [c for c in cmds if not (detach or is_launch_command(c))]
+                parallel = data.get('parallel') is True and len(capture) > 1
+                self.log(f"    💻 {len(cmds)} Befehle: {len(capture)} erfasst{' (parallel)' if parallel else ''}, "
+                         f"{len(launch)} gestartet\n")
+                groups = []   # [('launch', [cmd]) | ('capture', [cmds])] in Originalreihenfolge
+                for c in cmds:
+                    kind = 'launch' if detach or is_launch_command(c) else 'capture'
+                    if groups and groups[-1][0] == kind == 'capture' and parallel:
+                        groups[-1][1].append(c)
+                    else:
+                        groups.append((kind, [c]))
+                shown = Counter()
+                def on_line(i, stream, line):
+                    shown[i] += 1
+                    if shown[i] <= COMMAND_LOG_LINES:
+                        self.log(f"      {i + 1 if len(capture) > 1 else ''}{'!' if stream == 'err' else '│'} {line[:150]}\n")
+                    elif shown[i] == COMMAND_LOG_LINES + 1:
+                        self.log(f"      {i + 1 if len(capture) > 1 else ''}│ …\n")
+                results = []
+                launched = False
+                for kind, group in groups:
+                    if self.stop:
+                        break
+                    if launched and kind == 'capture':
+                        # Folgebefehle (z.B. SendKeys) erst, wenn das gestartete Fenster da ist
+                        with self.desktop():
+                            self.settle('screen', 'Programmstart', timeout=3.0, expect_change=1.0)
+                        launched = False
+                    if kind == 'launch':
+                        c = group[0]
+                        self.log(f"      → {c[:80]} (gestartet)\n")
+                        try:
+                            subprocess.Popen(c, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                             creationflags=subprocess.CREATE_NO_WINDOW if IS_WINDOWS else 0)
+                            launched = True
+                        except Exception as ex:
+                            self.log(f"      ❌ {str(ex)[:50]}\n")
+                        continue
+                    base = len(results)
+                    for c in group:
+                        self.log(f"      → {c[:80]}\n")
+                    with self.tracer.span("Befehle", 'action', n=len(group), parallel=len(group) > 1):
+                        done = run_commands_captured(group, len(group) > 1, data.get('timeout'),
+                                                     lambda i, s, l, b=base: on_line(b + i, s, l),
+                                                     cancel=lambda: self.stop)
+                    for r in done:
+                        mark = '✅' if r['code'] == 0 else '⏱️' if r['timeout'] else '⚠️'
+                        self.log(f"      {mark} exit {r['code']} ({r['secs']:.1f}s, {len(r['out'])} Zeichen) {r['cmd'][:50]}\n")
+                    results += done
+                if results:
+                    self._cmd_output = format_command_results(results)
+                codes = [r['code'] for r in results]
+                res = (f"{len(results)} erfasst (exit {', '.join(map(str, codes))})" if results else "") + \
+                      (", " if results and launch else "") + (f"{len(launch)} gestartet" if launch else "")
+                if launched:
+                    # Gestartete Programme: auf das Fenster warten, dann auf Ruhe
+                    with self.desktop():
+                        self.settle('screen', 'Programmstart', timeout=3.0, expect_change=1.0)
+        
+        elif action == 'read_file':
+            path = os.path.expandvars(data.get('path', '').replace('\\\\', '\\'))
+            self.log(f"    📄 Lese: {path}\n")
             
-            lines = []
-            for i, el in enumerate(elements[:max_elements], 1):
-                tag = el.get('tag', '?')
-                selector_parts = [tag]
-                if el.get('id'):
-                    selector_parts.append(f"#{el['id']}")
-                elif el.get('classes'):
-                    selector_parts.append(f".{el['classes']}")
-                elif el.get('name'):
-                    selector_parts.append(f"[name=\"{el['name']}\"]")
-                
-                selector = ''.join(selector_parts)
-                extras = []
-                if el.get('type'):
-                    extras.append(f"type={el['type']}")
-                if el.get('href'):
-                    href = el['href'][:40] + '...' if len(el.get('href', '')) > 40 else el.get('href', '')
-                    extras.append(f"href=\"{href}\"")
-                if el.get('placeholder'):
-                    extras.append(f"placeholder=\"{el['placeholder'][:30]}\"")
-                
-                text = f"\"{el['text']}\"" if el.get('text') else ""
-                extra_str = f" ({', '.join(extras)})" if extras else ""
-                lines.append(f"[{i}] {selector}{extra_str} {text}")
+            if not os.path.exists(path):
+                for alt in [os.path.join(tempfile.gettempdir(), os.path.basename(path)),
+                           os.path.join(tempfile.gettempdir(), 'sysinfo.txt')]:
+                    if os.path.exists(alt):
+                        path = alt
+                        break
             
-            return "\n".join(lines)
+            if os.path.exists(path):
+                try:
+                    with self.tracer.span("Datei lesen", 'action') as sp:
+                        r = read_file_slice(path, data.get('offset'), data.get('length'), data.get('head'),
+                                            data.get('tail'), data.get('grep'), data.get('context', 0))
+                        sp.update(bytes=r['size'], mode=r['mode'])
+                    where = (f"{r['matches']} Treffer für '{data.get('grep')}'" if r['mode'] == 'grep'
+                             else f"Zeilen {r['lines'][0]}–{r['lines'][1]} ({r['mode']})")
+                    if r['text']:
+                        self._file_content = (f"{path} – {r['size']//1024} KB, {r['encoding']}, {where}"
+                                              f"{', GEKÜRZT' if r['truncated'] else ''}\n{r['text']}")
+                        self._read_ok = True
+                        res = f"✅ {where}"
+                        preview = r['text'].split('\n')
+                        self.log("\n" + "═"*70 + "\n" + "\n".join(preview[:40]) +
+                                 (f"\n… (+{len(preview) - 40} Zeilen)" if len(preview) > 40 else "") + "\n" + "═"*70 + "\n")
+                        self.log(f"    ✅ {where}, {r['encoding']}, {len(r['text'])} Zeichen\n")
+                    elif r['mode'] == 'grep':
+                        # Kein Treffer ist eine gültige Antwort
+                        self._file_content = f"{path}: keine Treffer für '{data.get('grep')}'"
+                        self._read_ok = True
+                        res = "✅ 0 Treffer"
+                        self.log("    🔎 keine Treffer\n")
+                    else:
+                        self._read_ok = False
+                        self.log("    ❌ Datei leer\n")
+                except Exception as ex:
+                    self._read_ok = False
+                    self.log(f"    ❌ {str(ex)}\n")
+            else:
+                self._read_ok = False
+                self.log("    ❌ Nicht gefunden\n")
+            if not self._read_ok:
+                res = "❌ nicht gelesen"
         
-        except Exception as e:
-            return f"DOM-Fehler: {str(e)[:50]}"
-    
-    def click(self, selector=None, text=None):
-        if not self.page: return False
-        try:
-            if text: self.page.click(f'text="{text}"', timeout=3000)
-            elif selector:
-                for s in selector.split(','):
-                    try: self.page.click(s.strip(), timeout=3000); return True
-                    except: continue
+        elif action == 'pywinauto_connect':
+            ok = self.pw.connect(data.get('title'), data.get('title_re'))
+            self.log(f"    🪟 {'✅' if ok else '❌'}\n")
+            res = '✅' if ok else '❌'
+        
+        elif action == 'pywinauto_type':
+            txt = data.get('text', '')
+            if txt:
+                self.log(f"    ⌨️ '{txt[:30]}'\n")
+                try:
+                    import pyperclip
+                    pyperclip.copy(txt.replace('\\n', '\n'))
+                    time.sleep(0.1)
+                    pyautogui.hotkey('ctrl', 'v')
+                    self.settle('screen', 'Eingabe', timeout=1.0, settle=0.1)
+                except:
+                    pyautogui.write(txt.replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue'))
+                if data.get('auto_enter'):
+                    time.sleep(0.1)
+                    press_key('Return')
+        
+        elif action == 'screenshot':
+            cfg = self.cur
+            with self.tracer.span("Screenshot aufnehmen", 'screenshot'):
+                img = pyautogui.screenshot()
+            with self.tracer.span("Screenshot vergleichen", 'screenshot'):
+                kind, box, thumb, h = self.differ.compare(img)
+            if data.get('full'): kind, box = 'full', None
+            self.last_screenshot_img = img
+            self.screenshot_count += 1
+            if cfg.get('screenshot_clipboard', True):
+                _BACKGROUND.submit(copy_image_to_clipboard, img)
+            st = self.differ.stats
+            st[kind] += 1
+            if kind == 'unchanged':
+                saved_b, saved_t = self.differ.full_bytes, estimate_image_tokens(*self.differ.full_size, cfg.get('model', ''))
+                st['bytes_saved'] += saved_b
+                st['tokens_saved'] += saved_t
+                self.ss_note = ('📸 Bildschirm UNVERÄNDERT seit dem letzten Screenshot – kein neues Bild. '
+                                '(Ganzes Bild erzwingen: {"action": "screenshot", "full": true})')
+                self.log(
+                    f"    📸 Screenshot #{self.screenshot_count}: unverändert → nicht gesendet (−{saved_b//1024} KB, ~−{saved_t} Tokens)\n")
+            else:
+                with self.tracer.span("Screenshot kodieren", 'screenshot', kind=kind) as sp:
+                    b64, _, _, meta = take_screenshot(cfg.get('screenshot_max_side', SCREENSHOT_MAX_SIDE),
+                                                      cfg.get('screenshot_format', SCREENSHOT_FORMAT),
+                                                      cfg.get('screenshot_quality', SCREENSHOT_QUALITY),
+                                                      cfg.get('screenshot_save', True), False,
+                                                      img=img.crop(box) if box else img)
+                    sp['bytes'] = meta['bytes']
+                self.pending_image = (f"data:{meta['mime']};base64,{b64}", meta['size'])
+                self.last_screenshot_b64 = b64
+                self.ss_map = (box[0], box[1], meta['scale']) if box else (0, 0, meta['scale'])
+                self.differ.update(img, thumb, h)
+                if box:
+                    full_t = estimate_image_tokens(*self.differ.full_size, cfg.get('model', ''))
+                    saved_b = max(0, self.differ.full_bytes - meta['bytes'])
+                    saved_t = max(0, full_t - estimate_image_tokens(*meta['size'], cfg.get('model', '')))
+                    st['bytes_saved'] += saved_b
+                    st['tokens_saved'] += saved_t
+                    self.ss_note = (f"📸 Nur ein Ausschnitt hat sich geändert: x={box[0]}..{box[2]}, y={box[1]}..{box[3]} "
+                                    "– das Bild zeigt nur diesen Ausschnitt, Klick-Koordinaten einfach aus dem Bild angeben. "
+                                    'Ganzes Bild: {"action": "screenshot", "full": true}')
+                    self.log(
+                        f"    📸 Screenshot #{self.screenshot_count}: Ausschnitt {box[2]-box[0]}x{box[3]-box[1]} @ {box[0]},{box[1]} "
+                        f"{meta['bytes']//1024} KB (−{saved_b//1024} KB, ~−{saved_t} Tokens)\n")
+                else:
+                    self.differ.full_bytes, self.differ.full_size = meta['bytes'], meta['size']
+                    self.ss_note = screenshot_note(meta, img.size)
+                    self.log(
+                        f"    📸 Screenshot #{self.screenshot_count} {meta['size'][0]}x{meta['size'][1]} {meta['mime'].split('/')[1]} "
+                        f"{meta['bytes']//1024} KB ({meta['encode_ms']:.0f} ms)\n")
+        
+        elif action == 'wait':
+            self.log("    ⏳\n")
+            secs = float(data.get('seconds', 1) or 1)
+            if self.browser.has_page():
+                self.settle('page', 'Seite', state='load', quiet_ms=300, timeout=secs)
+            else:
+                self.settle('screen', 'Bildschirm', timeout=secs, expect_change=secs / 2)
+        
+        elif action == 'done':
+            self.log(f"\n    ✅ FERTIG: {data.get('message', 'Fertig')}\n")
+            res = "✅ fertig"
+        
+        else:
+            self.log(f"    ⚠️ Unbekannt: {action}\n")
+            res = "⚠️ unbekannte Aktion"
+        
+        return res
+
+
+class AgentEngine:
+    """Die Agent-Schleife ohne tkinter: Sitzungen, Aufgaben-Verteilung, Ereignis-Strom.
+
+    Clients (GUI, Task-API, --headless) melden sich mit subscribe(fn) an und
+    bekommen jedes Ereignis als dict {'type', 'seq', 'ts', 'session', ...}.
+    Typen: log, task (Statuswechsel), step, llm, tokens, action. fn läuft im
+    Worker-Thread der jeweiligen Sitzung und muss schnell zurückkehren.
+    """
+
+    def __init__(self, system_prompt=None, sessions=AGENT_SESSIONS):
+        self.cur = None
+        self.system_prompt = system_prompt or load_system_prompt()
+        self.listeners = []
+        self.tasks = {}
+        self._ids = itertools.count(1)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._last = {}             # Quelle → Sitzung ihrer letzten Aufgabe (Nachfragen)
+        self.library = TrajectoryLibrary()
+        self.sessions = [AgentSession(self, i + 1) for i in range(max(1, sessions))]
+
+    # ─── Ereignisse ────────────────────────────────────────────────────────────
+
+    def subscribe(self, fn):
+        self.listeners.append(fn)
+        return fn
+
+    def unsubscribe(self, fn):
+        try: self.listeners.remove(fn)
+        except ValueError: pass
+
+    def emit(self, kind, **data):
+        ev = {'type': kind, 'seq': next(self._seq), 'ts': time.time(), **data}
+        task = self.tasks.get(data.get('task'))
+        if task:
+            task['_events'].append(ev)
+        for fn in list(self.listeners):
+            try: fn(ev)
+            except Exception: pass
+        return ev
+
+    # ─── Aufgaben ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def public(task):
+        return {k: v for k, v in task.items() if not k.startswith('_')}
+
+    @property
+    def busy(self):
+        return any(s.load for s in self.sessions)
+
+    @property
+    def running(self):
+        return [t for t in (s.current for s in self.sessions) if t]
+
+    def set_config(self, cfg):
+        self.cur = cfg
+        for s in self.sessions:
+            s.set_config(cfg)
+
+    def reset_context(self):
+        for s in self.sessions:
+            s.reset_context()
+
+    def prewarm_browser(self):
+        self.sessions[0].prewarm_browser()
+
+    def pick_session(self, new=False, source='api', session=None):
+        """Nachfragen bleiben in der Sitzung ihres Verlaufs, neue Aufgaben gehen in die freieste"""
+        if session:
+            if not 1 <= int(session) <= len(self.sessions):
+                raise ValueError(f"Sitzung {session} gibt es nicht (1..{len(self.sessions)})")
+            return self.sessions[int(session) - 1]
+        last = self._last.get(source)
+        if last and not new:
+            return self.sessions[last - 1]
+        return min(self.sessions, key=lambda s: (s.load, s.id))
+
+    def submit(self, cmd, new=False, source='api', session=None):
+        """Aufgabe einreihen; gibt den Aufgaben-Eintrag zurück (Status über Ereignisse/tasks)"""
+        with self._lock:
+            s = self.pick_session(new, source, session)
+            task = {'id': next(self._ids), 'cmd': cmd, 'new': bool(new), 'source': source, 'session': s.id,
+                    'status': 'queued', 'created': time.time(), 'started': None, 'ended': None, 'steps': 0,
+                    'message': None, 'error': None, '_events': deque(maxlen=2000)}
+            self.tasks[task['id']] = task
+            self._last[source] = s.id
+        self.emit('task', task=task['id'], session=s.id, status='queued', cmd=cmd, source=source)
+        s._queue.put(task)
+        return task
+
+    def cancel(self, task_id=None):
+        """Bricht eine Aufgabe ab (ohne id: alle laufenden). Gibt False zurück, wenn nichts zu tun ist"""
+        with self._lock:
+            if task_id is None:
+                running = [s for s in self.sessions if s.current]
+                for s in running:
+                    s.stop = True
+                return bool(running)
+            task = self.tasks.get(task_id)
+            if not task or task['status'] not in ('queued', 'running'):
                 return False
-            return True
-        except: return False
-    
-    def type_into(self, selector, text):
-        if not self.page: return False
+            if task['status'] == 'running':
+                self.sessions[task['session'] - 1].stop = True
+                return True
+            task['status'] = 'cancelled'  # Worker überspringt sie
+        self.emit('task', task=task['id'], session=task['session'], status='cancelled')
+        return True
+
+    def events_since(self, task_id, since=0):
+        task = self.tasks.get(task_id)
+        return [ev for ev in task['_events'] if ev['seq'] > since] if task else None
+
+    def close(self):
+        for s in self.sessions:
+            s.close()
+        close_llm_clients()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TASK-API (lokal: HTTP + WebSocket)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+API_PORT = 8765
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_MAX_FRAME = 1 << 20
+
+
+def _ws_frame(data, opcode=0x1):
+    """Server-Frame (unmaskiert, FIN gesetzt)"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    n = len(data)
+    if n < 126:
+        head = bytes([0x80 | opcode, n])
+    elif n < 1 << 16:
+        head = bytes([0x80 | opcode, 126]) + n.to_bytes(2, 'big')
+    else:
+        head = bytes([0x80 | opcode, 127]) + n.to_bytes(8, 'big')
+    return head + data
+
+
+def _ws_read_frame(rfile):
+    """(opcode, payload) eines Client-Frames; None bei Verbindungsende. Fragmente werden nicht zusammengesetzt."""
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None
+    opcode, n = head[0] & 0x0F, head[1] & 0x7F
+    if n == 126:
+        n = int.from_bytes(rfile.read(2), 'big')
+    elif n == 127:
+        n = int.from_bytes(rfile.read(8), 'big')
+    if n > WS_MAX_FRAME:
+        return None
+    mask = rfile.read(4) if head[1] & 0x80 else b""
+    data = rfile.read(n)
+    if mask:
+        data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+    return opcode, data
+
+
+class _TaskAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, obj):
+        body = json.dumps(obj, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self, query):
+        token = self.server.token
+        auth = self.headers.get('Authorization', '')
+        given = auth[7:] if auth.startswith('Bearer ') else (query.get('token') or [''])[0]
+        return secrets.compare_digest(given.encode(), token.encode())
+
+    def _route(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if not self._authorized(query):
+            self._send_json(401, {'error': 'token fehlt oder falsch'})
+            return None, None, query
+        return self.server.engine, [p for p in url.path.split('/') if p], query
+
+    def _body(self):
+        n = int(self.headers.get('Content-Length') or 0)
+        if not n:
+            return {}
+        try: return json.loads(self.rfile.read(n))
+        except ValueError: return None
+
+    def do_GET(self):
+        engine, parts, query = self._route()
+        if engine is None:
+            return
+        if parts == ['api', 'ws']:
+            return self._websocket(engine)
+        if parts == ['api', 'status']:
+            return self._send_json(200, {'busy': engine.busy, 'running': [t['id'] for t in engine.running],
+                                         'sessions': [{'id': s.id, 'load': s.load} for s in engine.sessions],
+                                         'llm': (engine.cur or {}).get('model'), 'tasks': len(engine.tasks),
+                                         'providers': PROVIDER_STATS.snapshot()})
+        if parts == ['api', 'tasks']:
+            return self._send_json(200, [engine.public(t) for t in list(engine.tasks.values())])
+        if len(parts) >= 3 and parts[:2] == ['api', 'tasks'] and parts[2].isdigit():
+            task = engine.tasks.get(int(parts[2]))
+            if not task:
+                return self._send_json(404, {'error': 'unbekannte Aufgabe'})
+            if parts[3:] == ['events']:
+                since = int((query.get('since') or ['0'])[0] or 0)
+                return self._send_json(200, engine.events_since(task['id'], since))
+            if not parts[3:]:
+                return self._send_json(200, engine.public(task))
+        self._send_json(404, {'error': 'nicht gefunden'})
+
+    def do_POST(self):
+        engine, parts, _ = self._route()
+        if engine is None:
+            return
+        body = self._body()
+        if body is None:
+            return self._send_json(400, {'error': 'ungültiges JSON'})
+        if parts == ['api', 'tasks']:
+            cmd = str(body.get('task') or '').strip()
+            if not cmd:
+                return self._send_json(400, {'error': "'task' fehlt"})
+            try: task = engine.submit(cmd, body.get('new', False), 'api', body.get('session'))
+            except (TypeError, ValueError) as e: return self._send_json(400, {'error': str(e)})
+            return self._send_json(202, engine.public(task))
+        if parts == ['api', 'cancel']:
+            return self._send_json(200, {'cancelled': engine.cancel()})
+        if len(parts) == 4 and parts[:2] == ['api', 'tasks'] and parts[2].isdigit() and parts[3] == 'cancel':
+            if int(parts[2]) not in engine.tasks:
+                return self._send_json(404, {'error': 'unbekannte Aufgabe'})
+            return self._send_json(200, {'cancelled': engine.cancel(int(parts[2]))})
+        self._send_json(404, {'error': 'nicht gefunden'})
+
+    def _websocket(self, engine):
+        """Ereignis-Strom als JSON-Text-Frames; Client kann {"submit": ...} / {"cancel": id} senden"""
+        key = self.headers.get('Sec-WebSocket-Key')
+        if self.headers.get('Upgrade', '').lower() != 'websocket' or not key:
+            return self._send_json(400, {'error': 'WebSocket-Upgrade erwartet'})
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        
+        out = queue.Queue(2000)
+        def on_event(ev):
+            try: out.put_nowait(_ws_frame(json.dumps(ev, ensure_ascii=False, default=str)))
+            except queue.Full: pass  # langsamer Client verliert Ereignisse statt die Engine zu bremsen
+        
+        def reader():
+            while True:
+                try: frame = _ws_read_frame(self.rfile)
+                except (OSError, ValueError): frame = None
+                if frame is None or frame[0] == 0x8:
+                    out.put(None)
+                    return
+                opcode, data = frame
+                if opcode == 0x9:
+                    out.put(_ws_frame(data, 0xA))
+                elif opcode == 0x1:
+                    try: msg = json.loads(data)
+                    except ValueError: msg = {}
+                    if msg.get('submit'):
+                        try:
+                            task = engine.submit(str(msg['submit']), msg.get('new', False), 'ws', msg.get('session'))
+                            on_event({'type': 'submitted', 'task': task['id'], 'session': task['session']})
+                        except (TypeError, ValueError) as e:
+                            on_event({'type': 'error', 'error': str(e)})
+                    elif 'cancel' in msg:
+                        tid = msg['cancel']
+                        try: tid = None if tid is None else int(tid)  # JS-Clients schicken oft "12"
+                        except (TypeError, ValueError): tid = -1
+                        if not engine.cancel(tid):
+                            on_event({'type': 'error', 'error': f"nichts abzubrechen: {msg['cancel']}"})
+        
+        engine.subscribe(on_event)
+        threading.Thread(target=reader, name='ws-reader', daemon=True).start()
         try:
-            for s in selector.split(','):
-                try: self.page.fill(s.strip(), text, timeout=3000); return True
-                except: continue
-            return False
-        except: return False
-    
-    def get_text(self, selector='body'):
-        try: return self.page.inner_text(selector) if self.page else None
-        except: return None
-    
-    def scroll(self, direction='down'):
-        try: self.page.evaluate(f"window.scrollBy(0, {500 if direction == 'down' else -500})"); return True
-        except: return False
-    
-    def navigate(self, url):
-        try: self.page.goto(url, wait_until='domcontentloaded', timeout=30000); return True
-        except: return False
+            while True:
+                try: frame = out.get(timeout=20)
+                except queue.Empty: frame = _ws_frame(b"", 0x9)  # Ping hält Proxys/Clients wach
+                if frame is None:
+                    self.wfile.write(_ws_frame(b"", 0x8))
+                    break
+                self.wfile.write(frame)
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            engine.unsubscribe(on_event)
 
 
-class PywinautoHelper:
-    def __init__(self):
-        self.app = self.window = None
-        self.connected = False
+class TaskAPIServer(ThreadingHTTPServer):
+    """Lokale Task-API für eine AgentEngine. Jede Anfrage braucht den Token
+    (Header 'Authorization: Bearer <token>' oder ?token=...)."""
+    daemon_threads = True
 
-    def connect(self, title=None, title_re=None):
-        if not PYWINAUTO_AVAILABLE: return False
-        kwargs = {"title_re": title_re} if title_re else {"title": title} if title else {}
-        if not kwargs: return False
-        for _ in range(3):
-            try:
-                self.app = Application(backend="uia").connect(**kwargs)
-                self.window = self.app.top_window()
-                self.connected = True
-                return True
-            except: time.sleep(2)
-        return False
+    def __init__(self, engine, port=API_PORT, token=None, host='127.0.0.1'):
+        super().__init__((host, port), _TaskAPIHandler)
+        self.engine = engine
+        self.token = token or secrets.token_urlsafe(16)
+        self._thread = None
 
-    def disconnect(self):
-        self.app = self.window = None
-        self.connected = False
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='task-api', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def run_headless(args):
+    """Ohne GUI: eine Aufgabe (--task) ausführen oder die Task-API bedienen"""
+    llms = load_llm_configs(LLM_CONFIG_DIR)
+    if not llms:
+        print(f"❌ Keine LLM-Dateien in {LLM_CONFIG_DIR}")
+        return 2
+    name = args.llm or sorted(llms)[0]
+    if name not in llms:
+        print(f"❌ LLM '{name}' unbekannt – vorhanden: {', '.join(sorted(llms))}")
+        return 2
+    engine = AgentEngine(sessions=args.sessions)
+    engine.set_config(llms[name])
+    engine.subscribe(lambda ev: ev['type'] == 'log' and print(ev['text'], end='', flush=True))
+    print(f"🤖 {llms[name].get('model')} (headless)")
+    
+    if args.task:
+        task = engine.submit(args.task, new=True, source='cli')
+        try:
+            while task['status'] in ('queued', 'running'):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            engine.cancel(task['id'])
+            while task['status'] == 'running':
+                time.sleep(0.2)
+        engine.close()
+        return 0 if task['status'] == 'done' else 1
+    
+    server = TaskAPIServer(engine, args.port, os.environ.get('REMOTE_API_TOKEN'))
+    print(f"🔌 Task-API: {server.url}  Token: {server.token}  (Strg+C beendet)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        engine.close()
+    return 0
 
 
 class App:
-    def __init__(self):
+    SESSION_COLORS = ('#0ff', '#ff0', '#f8f', '#fa0', '#8af')
+
+    def __init__(self, api_port=None, sessions=AGENT_SESSIONS, setup=False):
         self.root = tk.Tk()
         self.root.title(APP_TITLE)
         self.root.geometry("1080x900")
         self.root.configure(bg='#5a5a5a')
         
-        self.run = self.stop = False
         self.cur = None
         self.llms = {}
         self.desktop_w, self.desktop_h = get_desktop_size()
-        self.last_screenshot_img = None
-        self.last_screenshot_b64 = None
-        self.screenshot_count = self.token_count = 0
+        self.token_count = 0
         self.token_price = 10.0
         
-        self.browser = BrowserHelper()
-        self.pw = PywinautoHelper()
-        self.failures = FailureTracker()
-        
         self.tracker_on = True
         self.tracker_window = self.tracker_label = None
         
-        self.system_prompt = load_system_prompt()
-        self.page_text = ""
-        self.mini_dom = ""
-        self._file_content = ""
-        self._read_ok = None
-        self.msgs = None
+        # Agent läuft in der Engine; die GUI ist nur ein Client ihres Ereignis-Stroms
+        self.engine = AgentEngine(sessions=sessions)
+        self.view = self.engine.sessions[0]   # Sitzung für Screenshot/Profil/Schritt-Tokens
+        self.engine.subscribe(lambda ev: self.root.after(0, self.handle_event, ev))
+        self.api = None
         
         self.gui()
         self.root.title(APP_TITLE)  # nochmal setzen, falls System/Pfad den Titel überschreibt
         self.root.bind('<F1>', lambda e: self.do_stop())
         self.root.after(100, self.load_configs)
+        probe_capabilities(lambda missing: self.root.after(0, self.show_capabilities, missing))
+        if BROWSER_PREWARM:
+            _BACKGROUND.submit(lambda: CAPS.available('playwright') and self.engine.prewarm_browser())
+        if api_port:
+            try:
+                self.api = TaskAPIServer(self.engine, api_port, os.environ.get('REMOTE_API_TOKEN')).start()
+                self.log(f"🔌 Task-API: {self.api.url}  Token: {self.api.token}\n")
+            except OSError as e:
+                self.log(f"❌ Task-API auf Port {api_port}: {e}\n")
         self.root.after(500, self.start_tracker)
+        self.root.after_idle(self.report_startup)
+        if setup:
+            _BACKGROUND.submit(self.run_setup)
+
+    def report_startup(self):
+        """Zeit vom Modulstart bis zum ersten leeren Event-Loop (Fenster steht)"""
+        self.log(f"⏱️ GUI bereit nach {time.perf_counter() - _T_START:.2f}s\n")
+
+    def run_setup(self):
+        """--setup: pip läuft im Hintergrund, die GUI bleibt bedienbar"""
+        install_dependencies(log=lambda t: self.root.after(0, self.log, t))
+        self.root.after(0, self.update_doc_status)
 
     def gui(self):
         tk.Label(self.root, text=APP_TITLE, 
@@ -781,22 +4884,16 @@ class App:
         f_info = tk.Frame(self.root, bg='#d4a0a0')
         f_info.pack(fill='x', padx=10, pady=5)
         
-        # Doc-Status anzeigen
-        doc_status = []
-        if DOCX_AVAILABLE: doc_status.append("📄docx")
-        if XLSX_AVAILABLE: doc_status.append("📊xlsx")
-        if PPTX_AVAILABLE: doc_status.append("📽pptx")
-        doc_str = " ".join(doc_status) if doc_status else "⚠️Docs fehlen"
-        
-        self.info_lbl = tk.Label(f_info, text=f"{self.desktop_w}x{self.desktop_h} | V42 B | {doc_str}",
-                                 bg='#d4a0a0', fg='#4a2828')
+        self.info_lbl = tk.Label(f_info, bg='#d4a0a0', fg='#4a2828')
         self.info_lbl.pack(side='left', padx=10, pady=5)
+        self.update_doc_status()
         tk.Button(f_info, text="Prompt", command=self.edit_prompt, bg='#c70', fg='white', width=7).pack(side='left', padx=2)
         tk.Button(f_info, text="Letzter Screenshot KI", command=self.show_last_screenshot, bg='#805', fg='white', width=16).pack(side='left', padx=2)
         tk.Button(f_info, text="Screenshot", command=self.test_screenshot, bg='#5a5', fg='white', width=9).pack(side='left', padx=2)
         self.tracker_btn = tk.Button(f_info, text="Tracker", command=self.toggle_tracker, bg='#0a5', fg='white', width=7)
         self.tracker_btn.pack(side='left', padx=2)
         tk.Button(f_info, text="LLM Save", command=self.llm_save, bg='#007bff', fg='white', width=7).pack(side='left', padx=2)
+        tk.Button(f_info, text="Profil", command=self.show_profile, bg='#666', fg='white', width=6).pack(side='left', padx=2)
         
         cf = tk.Frame(self.root, bg='#5a5a5a')
         cf.pack(fill='both', expand=True, padx=10, pady=5)
@@ -805,6 +4902,8 @@ class App:
         self.txt = Text(cf, wrap=tk.WORD, yscrollcommand=sb.set, font=('Monospace', 9), bg='#1a1a1a', fg='#0f0', insertbackground='#aaa')
         self.txt.pack(side='left', fill='both', expand=True)
         sb.config(command=self.txt.yview)
+        for i, color in enumerate(self.SESSION_COLORS, 2):
+            self.txt.tag_config(f's{i}', foreground=color)
         
         ef = tk.Frame(self.root, bg='#5a5a5a')
         ef.pack(fill='x', padx=10, pady=5)
@@ -833,19 +4932,22 @@ class App:
         tk.Label(bf, text="≈", bg='#5a5a5a', fg='white').pack(side='left')
         self.price_lbl = tk.Label(bf, text="0.000 €", bg='#5a5a5a', fg='#0ff')
         self.price_lbl.pack(side='left')
+        self.ledger_lbl = tk.Label(bf, text="", bg='#5a5a5a', fg='#aaa', font=('Arial', 8))
+        self.ledger_lbl.pack(side='left', padx=(8,0))
 
     def show_last_screenshot(self):
-        if self.last_screenshot_img is None:
+        engine = self.view
+        if engine.last_screenshot_img is None:
             self.log("⚠️ Noch kein KI-Screenshot vorhanden.\n")
             return
         try:
             # In Zwischenablage kopieren
-            copy_image_to_clipboard(self.last_screenshot_img)
+            _BACKGROUND.submit(copy_image_to_clipboard, engine.last_screenshot_img)
             self.log("📋 Screenshot in Zwischenablage kopiert!\n")
             
             win = Toplevel(self.root)
-            win.title(f"Letzter KI-Screenshot (#{self.screenshot_count})")
-            img = self.last_screenshot_img
+            win.title(f"Letzter KI-Screenshot (#{engine.screenshot_count})")
+            img = engine.last_screenshot_img
             w, h = img.size
             r = min(1200/w, 800/h, 1)
             img_d = img.resize((int(w*r), int(h*r)), Image.Resampling.LANCZOS) if r < 1 else img
@@ -858,7 +4960,7 @@ class App:
 
     def test_screenshot(self):
         try:
-            _, _, img = take_screenshot()
+            _, _, img, _ = take_screenshot(save=False)
             self.log("📋 Screenshot in Zwischenablage kopiert!\n")
             
             win = Toplevel(self.root)
@@ -907,6 +5009,7 @@ class App:
             self.var.set(msg)
             if msg in self.llms:
                 self.cur = self.llms[msg]
+                self.engine.set_config(self.cur)
                 self.ent.config(state='normal')
                 self.send_btn.config(state='normal')
         else:
@@ -941,35 +5044,70 @@ class App:
         t = Text(f, wrap=tk.WORD, font=('Monospace', 10), bg='#1a1a1a', fg='#0f0', insertbackground='#aaa', yscrollcommand=sb.set)
         t.pack(side='left', fill='both', expand=True)
         sb.config(command=t.yview)
-        t.insert('1.0', self.system_prompt)
+        t.insert('1.0', self.engine.system_prompt)
         bf = tk.Frame(ed, bg='#2a2a3a')
         bf.pack(fill='x', padx=10, pady=10)
         def save():
-            self.system_prompt = t.get('1.0', 'end-1c')
-            save_system_prompt(self.system_prompt)
+            self.engine.system_prompt = t.get('1.0', 'end-1c')
+            save_system_prompt(self.engine.system_prompt)
             self.log("✅ Gespeichert\n")
             ed.destroy()
         tk.Button(bf, text="Speichern", command=save, bg='#0a5', fg='white').pack(side='left', padx=5)
         tk.Button(bf, text="Standard", command=lambda: (t.delete('1.0', tk.END), t.insert('1.0', DEFAULT_GUI_PROMPT)), bg='#c70', fg='white').pack(side='left', padx=5)
 
-    def log(self, t):
-        self.txt.insert(tk.END, t)
+    def log(self, t, session=None):
+        # Sitzung 1 grün wie immer, weitere Sitzungen farbig
+        self.txt.insert(tk.END, t, f's{session}' if session and session > 1 else ())
         self.txt.see(tk.END)
 
+    def handle_event(self, ev):
+        """Engine-Ereignis im GUI-Thread (über root.after eingereicht)"""
+        kind = ev['type']
+        sid = ev.get('session')
+        if kind == 'log':
+            self.log(ev['text'], sid)
+        elif kind == 'tokens':
+            self.update_tokens()
+        elif kind == 'task':
+            status = ev['status']
+            if status == 'queued' and ev.get('source') != 'gui':
+                self.log(f"\n🔌 Aufgabe #{ev['task']} ({ev.get('source')}): {ev.get('cmd')}\n", sid)
+            elif status == 'running':
+                self.view = self.engine.sessions[sid - 1]
+                if len(self.engine.sessions) > 1:
+                    self.log(f"▶️ Sitzung {sid}: Aufgabe #{ev['task']}\n", sid)
+                self.stop_btn.config(state='normal')
+            elif status in ('done', 'incomplete', 'failed', 'cancelled') and not self.engine.busy:
+                self.finish()
+
     def clear(self):
+        if self.engine.busy:
+            self.log("⚠️ Erst stoppen (F1), dann Neu.\n")
+            return
         self.txt.delete('1.0', tk.END)
-        self.msgs = None
-        self.page_text = self._file_content = ""
-        self.mini_dom = ""
-        self._read_ok = None
-        self.failures.reset()
-        self.screenshot_count = self.token_count = 0
+        self.engine.reset_context()
+        for s in self.engine.sessions:
+            s.ledger.reset()
+            s.screenshot_count = 0
+        self.token_count = 0
         self.update_tokens()
         self.log("🆕 Neuer Kontext\n")
 
-    def update_tokens(self):
-        self.token_lbl.config(text=f"{self.token_count:,}".replace(",", "."))
-        self.price_lbl.config(text=f"{(self.token_count / 1_000_000) * self.token_price:.3f} €")
+    def update_tokens(self, step=None):
+        # Summe über alle Sitzungen, Schritt-Details aus der zuletzt gestarteten
+        ledgers = [s.ledger for s in self.engine.sessions]
+        for l in ledgers:
+            l.price = self.token_price
+        ledger = self.view.ledger
+        self.token_count = sum(l.total(l.session) for l in ledgers)
+        est = "~" if any(l.task_estimated for l in ledgers) else ""
+        self.token_lbl.config(text=f"{est}{self.token_count:,}".replace(",", "."))
+        self.price_lbl.config(text=f"{sum(l.cost(l.session) for l in ledgers):.3f} €")
+        if ledger.steps:
+            step = step or ledger.steps[-1]
+            self.ledger_lbl.config(text=f"Schritt: {ledger.step_summary(step)}\n{ledger.task_summary()}")
+        else:
+            self.ledger_lbl.config(text="")
 
     def copy(self):
         self.root.clipboard_clear()
@@ -981,9 +5119,18 @@ class App:
         if self.llms:
             self.combo['values'] = ["--"] + sorted(self.llms.keys())
             self.log(f"✅ {len(self.llms)} gefunden\n")
-        
-        # Doc-Libraries Status
-        self.log(f"📄 Dokumente: docx={'✅' if DOCX_AVAILABLE else '❌'} xlsx={'✅' if XLSX_AVAILABLE else '❌'} pptx={'✅' if PPTX_AVAILABLE else '❌'}\n")
+
+    def show_capabilities(self, missing):
+        """Ergebnis der Backend-Prüfung im Hintergrund (probe_capabilities)"""
+        self.log("📄 Dokumente: " + " ".join(f"{n}={'✅' if CAPS.known(n) else '❌'}" for n in ('docx', 'xlsx', 'pptx')) + "\n")
+        if missing:
+            self.log(f"📦 Fehlt: {', '.join(CAPABILITIES[n][1] for n in missing)} → Start mit --setup installiert im Hintergrund\n")
+        self.update_doc_status()
+
+    def update_doc_status(self):
+        doc_status = [icon + n for n, icon in (('docx', "📄"), ('xlsx', "📊"), ('pptx', "📽")) if CAPS.known(n)]
+        doc_str = " ".join(doc_status) if doc_status else "⚠️Docs fehlen"
+        self.info_lbl.config(text=f"{self.desktop_w}x{self.desktop_h} | V42 B | {doc_str}")
 
     def on_price_changed(self, e=None):
         try:
@@ -1013,6 +5160,7 @@ class App:
             self.model_ent.delete(0, tk.END); self.model_ent.insert(0, self.cur.get('model', ''))
             self.key_ent.delete(0, tk.END); self.key_ent.insert(0, self.cur.get('api_key', ''))
             self.token_price = self.cur.get('token_price', 10.0)
+            self.engine.set_config(self.cur)
             self.price_ent.delete(0, tk.END)
             self.price_ent.insert(0, str(self.token_price))
             self.update_tokens()
@@ -1021,7 +5169,8 @@ class App:
             self.send_btn.config(state='normal')
 
     def send(self, e=None):
-        if self.run or not self.cur: return
+        # Läuft schon etwas: Nachfrage wartet in ihrer Sitzung, 'NEU …' startet parallel
+        if not self.cur: return
         cmd = self.ent.get("1.0", "end-1c").strip()
         if not cmd: return
         self.ent.delete("1.0", tk.END)
@@ -1032,327 +5181,46 @@ class App:
             if not cmd:
                 self.log("⚠️ Nach 'NEU' eine Aufgabe eingeben.\n")
                 return
-            self.msgs = None
-            self.page_text = self._file_content = ""
-            self.mini_dom = ""
-            self._read_ok = None
-            self.failures.reset()
             self.log("🔄 Kontext gelöscht.\n")
         
         self.log(f"\n{'='*60}\n👤 {cmd}\n{'='*60}\n")
-        self.run = True
-        self.stop = False
-        self.send_btn.config(state='disabled')
         self.stop_btn.config(state='normal')
-        self.ent.config(state='disabled')
-        threading.Thread(target=self.work, args=(cmd, force_new), daemon=True).start()
+        self.engine.submit(cmd, force_new, 'gui')
+        return 'break'  # kein Zeilenumbruch im (weiter aktiven) Eingabefeld
 
     def do_stop(self):
-        self.stop = True
-
-    def work(self, cmd, force_new):
-        if self.msgs is None or force_new:
-            msgs = [{"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": f"Aufgabe: {cmd}\n\nDENKE → HANDLE → KONTROLLIERE. EINE JSON-Aktion!"}]
-            self.page_text = self._file_content = ""
-            self.mini_dom = ""
-            self._read_ok = None
-            self.failures.reset()
-            self.root.after(0, lambda: self.log("🔍 Neuer Kontext\n"))
-        else:
-            msgs = list(self.msgs)
-            msgs.append({"role": "user", "content": f"Nachfrage: {cmd}"})
-            self.root.after(0, lambda: self.log("🔍 Kontext beibehalten\n"))
-        
-        self.pw.disconnect()
-        if PYWINAUTO_AVAILABLE: self.root.after(0, lambda: self.log("✅ pywinauto\n"))
-        if PLAYWRIGHT_AVAILABLE: self.root.after(0, lambda: self.log("✅ Playwright\n"))
-        
-        ss_b64 = None
-        
-        for i in range(30):
-            if self.stop:
-                self.root.after(0, lambda: self.log("⏹ Stop\n"))
-                break
-            
-            self.root.after(0, lambda i=i: self.log(f"\n[{i+1}] 🧠 Denke...\n"))
-            
-            last = msgs[-1]
-            enhanced = last["content"]
-            
-            warn = self.failures.get_failure_warning()
-            if warn: enhanced = warn + "\n" + enhanced
-            
-            mx, my = get_mouse_position()
-            enhanced += f"\n\n🖱️ Maus: {mx},{my} | Bildschirm: {self.desktop_w}x{self.desktop_h}"
-            
-            # Dokumenten-Info
-            doc_info = []
-            if DOCX_AVAILABLE: doc_info.append("docx")
-            if XLSX_AVAILABLE: doc_info.append("xlsx")
-            if PPTX_AVAILABLE: doc_info.append("pptx")
-            if doc_info:
-                enhanced += f"\n📄 Verfügbare Dokument-Actions: create_{', create_'.join(doc_info)}"
-            
-            if self.browser.connected:
-                info = self.browser.get_page_info()
-                if info: 
-                    enhanced += f"\n🌐 Browser: {info.get('title', '?')[:50]}"
-                
-                if not self.mini_dom:
-                    self.mini_dom = self.browser.get_mini_dom() or ""
-                
-                if self.mini_dom:
-                    enhanced += f"\n\n📋 BROWSER-ELEMENTE:\n{self.mini_dom}"
-            
-            if self.page_text:
-                enhanced += f"\n\n📖 SEITEN-TEXT:\n{self.page_text[:2000]}"
-            
-            if self._file_content:
-                enhanced += f"\n\n💻 GELESENE DATEI (✅ ERFOLGREICH):\n{self._file_content[:8000]}"
-                enhanced += "\n\n✅ Daten sind sichtbar - du kannst 'done' sagen!"
-            elif self._read_ok == False:
-                enhanced += "\n\n⚠️ LETZTES read_file FEHLGESCHLAGEN! NICHT 'done' sagen!"
-            
-            msgs[-1] = {"role": last["role"], "content": enhanced}
-            
-            t1 = time.time()
-            resp, err = call_llm(self.cur, msgs, ss_b64)
-            ss_b64 = None
-            t2 = time.time()
-            
-            self.token_count += (sum(len(m.get("content", "")) for m in msgs) + len(resp or "")) // 4
-            self.root.after(0, self.update_tokens)
-            
-            msgs[-1] = last
-            
-            if err: self.root.after(0, lambda e=err: self.log(f"    ⚠️ {e}\n"))
-            self.root.after(0, lambda r=resp, t=t2-t1: self.log(f"    🤖 ({t:.1f}s) {r}\n"))
-            
-            data = parse_json(resp)
-            action = data.get('action', '?')
-            
-            # ═══════════════════════════════════════════════════════════════
-            # DOKUMENT-AKTIONEN (NEU!)
-            # ═══════════════════════════════════════════════════════════════
-            
-            if action == 'create_docx':
-                path = os.path.expandvars(data.get('path', '').replace('\\\\', '\\'))
-                title = data.get('title', '')
-                content = data.get('content', '')
-                self.root.after(0, lambda p=path: self.log(f"    📄 Erstelle DOCX: {p}\n"))
-                ok, msg = create_docx_file(path, title, content)
-                self.root.after(0, lambda ok=ok, m=msg: self.log(f"    {'✅' if ok else '❌'} {m}\n"))
-            
-            elif action == 'create_xlsx':
-                path = os.path.expandvars(data.get('path', '').replace('\\\\', '\\'))
-                sheet_data = data.get('data', [])
-                self.root.after(0, lambda p=path: self.log(f"    📊 Erstelle XLSX: {p}\n"))
-                ok, msg = create_xlsx_file(path, sheet_data)
-                self.root.after(0, lambda ok=ok, m=msg: self.log(f"    {'✅' if ok else '❌'} {m}\n"))
-            
-            elif action == 'create_pptx':
-                path = os.path.expandvars(data.get('path', '').replace('\\\\', '\\'))
-                slides = data.get('slides', [])
-                title = data.get('title', '')
-                self.root.after(0, lambda p=path: self.log(f"    📽 Erstelle PPTX: {p}\n"))
-                ok, msg = create_pptx_file(path, slides, title)
-                self.root.after(0, lambda ok=ok, m=msg: self.log(f"    {'✅' if ok else '❌'} {m}\n"))
-            
-            # ═══════════════════════════════════════════════════════════════
-            # STANDARD-AKTIONEN
-            # ═══════════════════════════════════════════════════════════════
-            
-            elif action == 'mouse_click':
-                ok, _ = mouse_click(data.get('x'), data.get('y'), data.get('button', 'left'), 2 if data.get('double') else 1)
-                self.root.after(0, lambda: self.log(f"    🖱️ {'✅' if ok else '❌'}\n"))
-                time.sleep(0.2)
-            
-            elif action == 'browser_start':
-                url = data.get('url', '')
-                self.root.after(0, lambda u=url[:50]: self.log(f"    🌐 Start: {u}\n"))
-                try:
-                    self.browser.disconnect()
-                    self.browser = BrowserHelper()
-                    self.mini_dom = ""
-                    if IS_WINDOWS:
-                        subprocess.run(['taskkill', '/f', '/im', 'chrome.exe'], capture_output=True, 
-                                      creationflags=subprocess.CREATE_NO_WINDOW)
-                    time.sleep(0.5)
-                    cmd_args = [find_chrome_path(), '--remote-debugging-port=9222', '--no-first-run',
-                           '--user-data-dir=' + os.path.join(tempfile.gettempdir(), 'chrome-debug')]
-                    if url: cmd_args.append(url)
-                    subprocess.Popen(cmd_args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-                                    creationflags=subprocess.CREATE_NO_WINDOW if IS_WINDOWS else 0)
-                    time.sleep(2)
-                    if self.browser.connect():
-                        self.root.after(0, lambda: self.log(f"    ✅ Verbunden\n"))
-                        time.sleep(1)
-                        self.mini_dom = self.browser.get_mini_dom() or ""
-                        if self.mini_dom:
-                            self.root.after(0, lambda n=len(self.mini_dom.split('\n')): self.log(f"    📋 {n} Elemente im Mini-DOM\n"))
-                except Exception as e:
-                    self.root.after(0, lambda e=str(e)[:50]: self.log(f"    ❌ {e}\n"))
-            
-            elif action == 'get_dom':
-                self.mini_dom = self.browser.get_mini_dom() or ""
-                n = len(self.mini_dom.split('\n')) if self.mini_dom else 0
-                self.root.after(0, lambda n=n: self.log(f"    📋 Mini-DOM: {n} Elemente\n"))
-            
-            elif action == 'playwright_click':
-                ok = self.browser.click(data.get('selector'), data.get('text'))
-                self.root.after(0, lambda: self.log(f"    🖱️ {'✅' if ok else '❌'}\n"))
-                time.sleep(0.3)
-                self.mini_dom = self.browser.get_mini_dom() or ""
-            
-            elif action == 'playwright_type':
-                ok = self.browser.type_into(data.get('selector', ''), data.get('text', ''))
-                self.root.after(0, lambda: self.log(f"    ⌨️ {'✅' if ok else '❌'}\n"))
-            
-            elif action == 'playwright_get_text':
-                txt = self.browser.get_text(data.get('selector', 'body'))
-                if txt:
-                    self.page_text = txt
-                    self.root.after(0, lambda n=len(txt): self.log(f"    📄 {n} Zeichen\n"))
-            
-            elif action == 'playwright_navigate':
-                if self.browser.navigate(data.get('url', '')):
-                    time.sleep(0.5)
-                    self.mini_dom = self.browser.get_mini_dom() or ""
-                    n = len(self.mini_dom.split('\n')) if self.mini_dom else 0
-                    self.root.after(0, lambda n=n: self.log(f"    📋 {n} Elemente\n"))
-            
-            elif action == 'playwright_scroll':
-                self.browser.scroll(data.get('direction', 'down'))
-                time.sleep(0.3)
-                self.mini_dom = self.browser.get_mini_dom() or ""
-            
-            elif action == 'key':
-                k = data.get('key', '')
-                if k:
-                    self.root.after(0, lambda k=k: self.log(f"    ⌨️ {k}\n"))
-                    press_key(k)
-                time.sleep(0.1)
-            
-            elif action == 'run_commands':
-                cmds = data.get('commands', [])
-                if cmds:
-                    self.root.after(0, lambda n=len(cmds): self.log(f"    💻 {n} Befehle\n"))
-                    for c in cmds:
-                        self.root.after(0, lambda c=c[:60]: self.log(f"      → {c}...\n"))
-                        try:
-                            if 'Out-File' in c or ' > ' in c:
-                                timeout = 120 if 'powershell' in c.lower() else 60
-                                r = subprocess.run(c, shell=True, timeout=timeout, capture_output=True,
-                                                  text=True, encoding='utf-8', errors='replace',
-                                                  creationflags=subprocess.CREATE_NO_WINDOW if IS_WINDOWS else 0)
-                                self.root.after(0, lambda ok=r.returncode==0: self.log(f"      {'✅' if ok else '⚠️'}\n"))
-                            else:
-                                subprocess.Popen(c, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-                                               creationflags=subprocess.CREATE_NO_WINDOW if IS_WINDOWS else 0)
-                        except Exception as ex:
-                            self.root.after(0, lambda e=str(ex)[:50]: self.log(f"      ❌ {e}\n"))
-                time.sleep(0.5)
-            
-            elif action == 'read_file':
-                path = os.path.expandvars(data.get('path', '').replace('\\\\', '\\'))
-                self.root.after(0, lambda p=path: self.log(f"    📄 Lese: {p}\n"))
-                
-                if not os.path.exists(path):
-                    for alt in [os.path.join(tempfile.gettempdir(), os.path.basename(path)),
-                               os.path.join(tempfile.gettempdir(), 'sysinfo.txt')]:
-                        if os.path.exists(alt):
-                            path = alt
-                            break
-                
-                if os.path.exists(path):
-                    try:
-                        content = None
-                        for enc in ['utf-8', 'utf-8-sig', 'utf-16', 'cp1252', 'latin-1']:
-                            try:
-                                with open(path, 'r', encoding=enc) as f:
-                                    content = f.read()
-                                if content and '\x00' not in content[:100]:
-                                    break
-                            except: continue
-                        
-                        if content:
-                            self._file_content = content
-                            self._read_ok = True
-                            def show():
-                                self.log("\n" + "═"*70 + "\n")
-                                self.log(content)
-                                self.log("\n" + "═"*70 + "\n")
-                            self.root.after(0, show)
-                            self.root.after(0, lambda n=len(content): self.log(f"    ✅ {n} Zeichen\n"))
-                        else:
-                            self._read_ok = False
-                            self.root.after(0, lambda: self.log(f"    ❌ Datei leer\n"))
-                    except Exception as ex:
-                        self._read_ok = False
-                        self.root.after(0, lambda e=str(ex): self.log(f"    ❌ {e}\n"))
-                else:
-                    self._read_ok = False
-                    self.root.after(0, lambda: self.log(f"    ❌ Nicht gefunden\n"))
-            
-            elif action == 'pywinauto_connect':
-                ok = self.pw.connect(data.get('title'), data.get('title_re'))
-                self.root.after(0, lambda: self.log(f"    🪟 {'✅' if ok else '❌'}\n"))
-            
-            elif action == 'pywinauto_type':
-                txt = data.get('text', '')
-                if txt:
-                    self.root.after(0, lambda t=txt[:30]: self.log(f"    ⌨️ '{t}'\n"))
-                    try:
-                        import pyperclip
-                        pyperclip.copy(txt.replace('\\n', '\n'))
-                        time.sleep(0.1)
-                        pyautogui.hotkey('ctrl', 'v')
-                        time.sleep(0.3)
-                    except:
-                        pyautogui.write(txt.replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue'))
-                    if data.get('auto_enter'):
-                        time.sleep(0.1)
-                        press_key('Return')
-            
-            elif action == 'screenshot':
-                b64, _, img = take_screenshot()
-                ss_b64 = b64
-                self.last_screenshot_img = img
-                self.last_screenshot_b64 = b64
-                self.screenshot_count += 1
-                self.root.after(0, lambda c=self.screenshot_count: self.log(f"    📸 Screenshot #{c} (📋 Zwischenablage)\n"))
-            
-            elif action == 'wait':
-                self.root.after(0, lambda: self.log("    ⏳\n"))
-                time.sleep(1)
-            
-            elif action == 'done':
-                self.root.after(0, lambda m=data.get('message', 'Fertig'): self.log(f"\n    ✅ FERTIG: {m}\n"))
-                break
-            
-            else:
-                self.root.after(0, lambda a=action: self.log(f"    ⚠️ Unbekannt: {a}\n"))
-            
-            msgs.append({"role": "assistant", "content": resp})
-            msgs.append({"role": "user", "content": "Weiter. Nächster Schritt?"})
-            time.sleep(0.05)
-        
-        self.msgs = msgs
-        self.root.after(0, self.finish)
+        self.engine.cancel()
 
     def finish(self):
-        self.run = False
-        self.send_btn.config(state='normal')
+        # Zusammenfassung kommt als Log-Ereignis aus der Engine
         self.stop_btn.config(state='disabled')
-        self.ent.config(state='normal')
-        self.log(f"\n{'='*60}\n📊 Screenshots: {self.screenshot_count}\n")
+
+    def show_profile(self):
+        """Profil der letzten Aufgabe als Tabelle (Trace-Datei: chrome://tracing oder ui.perfetto.dev)"""
+        tracer = self.view.tracer
+        rows = tracer.summary()
+        if not rows:
+            self.log("⏱️ Noch kein Profil – erst eine Aufgabe ausführen\n")
+            return
+        win = Toplevel(self.root)
+        win.title(f"Profil – Wandzeit {tracer.wall():.1f}s")
+        cols = ('n', 'gesamt', 'avg', 'max', 'pct')
+        tree = ttk.Treeview(win, columns=cols, height=min(len(rows), 25))
+        tree.heading('#0', text='Spanne')
+        tree.column('#0', width=220)
+        for c, t in zip(cols, ('n', 'gesamt s', 'Ø ms', 'max ms', '%')):
+            tree.heading(c, text=t)
+            tree.column(c, width=75, anchor='e')
+        for name, n, tot, avg, mx, pct in rows:
+            tree.insert('', 'end', text=name, values=(n, f"{tot:.2f}", f"{avg:.0f}", f"{mx:.0f}", f"{pct:.1f}"))
+        tree.pack(fill='both', expand=True, padx=5, pady=5)
+        tk.Label(win, text=f"Trace: {self.view.trace_path}", anchor='w').pack(fill='x', padx=5, pady=(0, 5))
 
     def cleanup(self):
-        try:
-            self.browser.disconnect()
-            self.pw.disconnect()
-        except: pass
+        if self.api:
+            try: self.api.stop()
+            except: pass
+        self.engine.close()
     
     def start(self):
         self.root.protocol("WM_DELETE_WINDOW", lambda: (self.cleanup(), self.root.destroy()))
@@ -1360,14 +5228,30 @@ class App:
 
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="KI Remote PC")
+    ap.add_argument('--headless', action='store_true', help="Ohne GUI: --task ausführen oder Task-API bedienen")
+    ap.add_argument('--api', action='store_true', help="Task-API zusätzlich zur GUI starten")
+    ap.add_argument('--port', type=int, default=API_PORT, help="Port der Task-API (nur 127.0.0.1)")
+    ap.add_argument('--llm', help="Name der LLM-Datei (headless; Standard: erste)")
+    ap.add_argument('--task', help="Headless: diese Aufgabe ausführen und beenden")
+    ap.add_argument('--sessions', type=int, default=AGENT_SESSIONS, help="Parallele Agent-Sitzungen (Standard 1; teilen sich Maus und Tastatur)")
+    ap.add_argument('--setup', action='store_true', help="Fehlende Pakete per pip installieren (GUI: im Hintergrund)")
+    args = ap.parse_args()
+    
     print("Remote V42 B - KI Remote PC with Playwright + pywinauto + Screenshot")
     print("F1=Stop, 'NEU' am Anfang = neuer Kontext")
     print("NEU: Screenshots automatisch in Zwischenablage!")
     print("     Direkte Dokumenterstellung (create_docx, create_xlsx, create_pptx)")
     
-    # Prüfe und installiere Doc-Libraries
-    install_doc_libraries()
-    
     if not os.path.exists(LLM_CONFIG_DIR):
         os.makedirs(LLM_CONFIG_DIR, exist_ok=True)
-    App().start()
\ No newline at end of file
+    if args.headless:
+        if args.setup:
+            install_dependencies()
+        else:
+            probe_capabilities()
+        sys.exit(run_headless(args))
+    if not CAPS.available('pyautogui') and not (args.setup and install_dependencies()[0]):
+        print(f"FEHLER: pyautogui – {CAPS.error('pyautogui')} (python {os.path.basename(__file__)!r} --setup)")
+        sys.exit(1)
+    App(api_port=args.port if args.api else None, sessions=args.sessions, setup=args.setup).start()
\ No newline at end of file
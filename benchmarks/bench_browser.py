@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Mini-DOM im Headless-Chromium über statische Seiten verschiedener Größe"""
+
+from common import evaluate, headless_browser, open_page
+
+SIZES = {'small': 20, 'medium': 300, 'large': 3000}
+
+
+def _snapshot(benchmark, size):
+    helper = headless_browser()
+    open_page(helper, SIZES[size])
+    text = benchmark(helper.get_mini_dom)
+    benchmark.extra_info.update(elements=SIZES[size], lines=len(text.split('\n')), chars=len(text))
+
+
+def bench_mini_dom_small(benchmark):
+    _snapshot(benchmark, 'small')
+
+
+def bench_mini_dom_medium(benchmark):
+    _snapshot(benchmark, 'medium')
+
+
+def bench_mini_dom_large(benchmark):
+    _snapshot(benchmark, 'large')
+
+
+def bench_mini_dom_delta_unchanged(benchmark):
+    helper = headless_browser()
+    open_page(helper, SIZES['medium'])
+    helper.get_mini_dom()
+    kind = benchmark(helper.get_mini_dom_delta)[0]
+    benchmark.extra_info['kind'] = kind
+
+
+def bench_mini_dom_delta_one_change(benchmark):
+    helper = headless_browser()
+    open_page(helper, SIZES['medium'])
+    helper.get_mini_dom()
+    add = "document.querySelector('main').prepend(Object.assign(document.createElement('button'), {textContent: 'Neu'}))"
+    kind = benchmark.pedantic(helper.get_mini_dom_delta, setup=lambda: evaluate(helper, add), rounds=30)[0]
+    benchmark.extra_info['kind'] = kind
+
+
+def bench_wait_ready_quiet_page(benchmark):
+    helper = headless_browser()
+    open_page(helper, SIZES['medium'])
+    benchmark(helper.wait_ready, None, 50, 2.0)
+
+
+def bench_page_text_extract_large(benchmark):
+    helper = headless_browser()
+    open_page(helper, SIZES['large'])
+    touch = "document.querySelector('main').append(document.createElement('span'))"  # neue DOM-Version
+    chunks, cached = benchmark.pedantic(helper.get_page_chunks, setup=lambda: evaluate(helper, touch), rounds=20)
+    benchmark.extra_info.update(chunks=len(chunks), cached=cached)
+
+
+def bench_page_text_cached_large(benchmark):
+    helper = headless_browser()
+    open_page(helper, SIZES['large'])
+    helper.get_page_chunks()
+    chunks, cached = benchmark(helper.get_page_chunks)
+    benchmark.extra_info.update(chunks=len(chunks), cached=cached)
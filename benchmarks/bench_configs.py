@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""load_llm_configs über einen Ordner mit vielen LLM-Dateien"""
+
+import os
+
+from common import remote, tmp_path
+
+TEMPLATE = """AI Speech Hybrid Agent V44 D - LLM Einstellungen Gespeichert am: 7.12.2025, 01:30:10
+
+=== API EINSTELLUNGEN ===
+URL: https://openrouter.ai/api/v1
+API Key: sk-or-v1-{i:064d}
+LLM Model: anbieter/modell-{i}
+Temperature: 0.7
+Max Tokens: 128000
+Kosten pro Million: {price}
+Stream: ja
+Anfragen pro Minute: 60
+Max Retries: 3
+Kontext Budget: 24000
+Screenshot Format: WEBP
+Screenshot Qualität: 75
+
+=== SYSTEM PROMPT ===
+Bitte antworte auf Deutsch.
+""" + "Weitere Hinweise zum Verhalten des Modells. " * 40
+
+
+def _config_dir(n):
+    path = tmp_path(f"llm_{n}")
+    if not os.path.isdir(path):
+        os.makedirs(path)
+        for i in range(n):
+            with open(os.path.join(path, f"anbieter_modell_{i}.txt"), 'w', encoding='utf-8') as f:
+                f.write(TEMPLATE.format(i=i, price=1.5 + i % 7))
+    return path
+
+
+def bench_load_llm_configs_40(benchmark):
+    configs = benchmark(remote().load_llm_configs, _config_dir(40))
+    benchmark.extra_info['configs'] = len(configs)
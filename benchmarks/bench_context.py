@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Kontext-Aufbau eines Schritts: kompaktieren, zusammenbauen, Payload serialisieren; Seitentext ranken"""
+
+import json
+
+from common import make_page, remote
+
+DOM = "\n".join(f'{i} button#kaufen-{i} "In den Warenkorb" →/produkt/{i}' for i in range(60))
+
+
+def _history(steps):
+    """System + Aufgabe + steps Schritte mit DOM-Diffs und Ergebnissen, ContextManager gefüllt"""
+    r = remote()
+    ctx = r.ContextManager(budget=16000)
+    msgs = [{"role": "system", "content": r.DEFAULT_GUI_PROMPT},
+            {"role": "user", "content": "Aufgabe: Suche 5 Mini-PCs und speichere sie als Excel"
+                                        f"\n\n📋 BROWSER-ELEMENTE (v1):\n{DOM}"}]
+    for i in range(steps):
+        resp = f'{{"action": "playwright_click", "index": {i + 3}}}'
+        ctx.record(resp, "✅")
+        msgs.append({"role": "assistant", "content": resp})
+        msgs.append({"role": "user", "content": "Weiter. Nächster Schritt?"
+                                                f"\n\n📋 BROWSER-ELEMENTE GEÄNDERT (v{i + 1}→v{i + 2}, 60 Elemente:\n"
+                                                + "\n".join(f'+{j} a "Ergebnis {j}" →/treffer/{j}' for j in range(i, i + 8))})
+    return r, ctx, msgs
+
+
+def _step(benchmark, steps, prompt_cache):
+    r, ctx, msgs = _history(steps)
+    client = r.LLMClient({'url': 'http://127.0.0.1:9/v1', 'api_key': 'bench', 'model': 'anthropic/claude-x',
+                          'prompt_cache': prompt_cache, 'stream': True})
+    state = "\n\n🖱️ Maus: 640,410 | Bildschirm: 1920x1080\n🌐 Browser: Suche – Mini-PC\n\n📖 SEITEN-TEXT:\n" + "Text " * 400
+
+    def run():
+        m, _ = ctx.compact(list(msgs))
+        m, volatile, last = r.assemble_context(m, "", "", state, prompt_cache)
+        body = json.dumps(client.build_payload(m, None, volatile))
+        m[-1] = last
+        return len(body)
+
+    size = benchmark(run)
+    client.close()
+    benchmark.extra_info.update(steps=steps, payload_bytes=size)
+
+
+def bench_context_step_5(benchmark):
+    _step(benchmark, 5, True)
+
+
+def bench_context_step_29(benchmark):
+    _step(benchmark, 29, True)
+
+
+def bench_context_step_29_no_cache(benchmark):
+    _step(benchmark, 29, False)
+
+
+def _page_blocks(n_interactive):
+    """Blöcke wie PAGE_TEXT_JS sie liefert, aus der statischen Benchmark-Seite"""
+    import re
+    html = make_page(n_interactive)
+    return [{'t': re.sub(r'<[^>]+>', ' ', m).strip(), 'h': '', 'k': 'h' if tag[0] == 'h' else ''}
+            for tag, m in re.findall(r'<(p|h2|td)>(.*?)</\1>', html)]
+
+
+def bench_page_text_rank_large(benchmark):
+    r = remote()
+    blocks = _page_blocks(3000)
+
+    def run():
+        return r.select_page_text(r.chunk_blocks(blocks), "Suche Mini-PC Preis Lieferung Prozessor")
+
+    text, n, hits = benchmark(run)
+    benchmark.extra_info.update(blocks=len(blocks), picked=n, hits=hits, chars=len(text))
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""create_xlsx_file mit großen Tabellen.
+
+Jeder Lauf enthält das Erzeugen der Zeilen: bei "table" wird die ganze Liste
+gebaut (wie ein großes "data" vom LLM), bei "stream" kommen die Zeilen aus
+einem Generator. legacy = der frühere Weg ohne write_only (normales Workbook,
+Zelle für Zelle, Font je Kopfzelle) als Vergleich.
+
+extra_info: peak_mb = Speicherspitze (tracemalloc ab vor dem Erzeugen der
+Daten) eines Extra-Laufs außerhalb der Zeitmessung – muss bei stream von 20k
+auf 100k Zeilen flach bleiben.
+"""
+
+import os, tracemalloc
+
+from common import remote, tmp_path
+from run import skip
+
+
+def _row(r, cols=10):
+    return [f"Text {r}-{c}" if c % 3 == 0 else r * cols + c for c in range(cols)]
+
+
+def _table(rows, cols=10):
+    return [[f"Spalte {c}" for c in range(cols)]] + [_row(r, cols) for r in range(rows)]
+
+
+def _stream(rows, cols=10):
+    """Zeilen-Iterator: die Tabelle existiert nie komplett im Speicher"""
+    yield [f"Spalte {c}" for c in range(cols)]
+    for r in range(rows):
+        yield _row(r, cols)
+
+
+def _legacy_xlsx(path, data):
+    """create_xlsx_file vor write_only – nur für den Vergleich"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Tabelle1"
+    for row_idx, row in enumerate(data, 1):
+        for col_idx, value in enumerate(row, 1):
+            cell = ws.cell(row=row_idx, column=col_idx, value=value)
+            if row_idx == 1:
+                cell.font = Font(bold=True)
+    wb.save(path)
+    return True, f"Gespeichert: {path}"
+
+
+def _peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def _xlsx(benchmark, rows, make=_table, legacy=False, rounds=3):
+    r = remote()
+    if not r.CAPS.available('xlsx'):
+        skip("openpyxl nicht installiert")
+    path = tmp_path(f"bench_{rows}.xlsx")
+    write = _legacy_xlsx if legacy else r.create_xlsx_file
+    run = lambda: write(path, make(rows))
+    ok, msg = benchmark.pedantic(run, rounds=rounds, warmup_rounds=1)
+    if not ok:
+        raise RuntimeError(msg)
+    benchmark.extra_info.update(rows=rows, cols=10, data=make.__name__.strip('_'), write_only=not legacy,
+                                size_kb=os.path.getsize(path) // 1024, peak_mb=_peak_mb(run))
+
+
+def bench_create_xlsx_1k(benchmark):
+    _xlsx(benchmark, 1000)
+
+
+def bench_create_xlsx_legacy_20k(benchmark):
+    _xlsx(benchmark, 20000, legacy=True)
+
+
+def bench_create_xlsx_20k(benchmark):
+    _xlsx(benchmark, 20000)
+
+
+def bench_create_xlsx_stream_20k(benchmark):
+    _xlsx(benchmark, 20000, _stream)
+
+
+def bench_create_xlsx_stream_100k(benchmark):
+    _xlsx(benchmark, 100000, _stream, rounds=1)
+
+
+def bench_append_xlsx_1k_to_5k(benchmark):
+    r = remote()
+    if not r.CAPS.available('xlsx'):
+        skip("openpyxl nicht installiert")
+    path = tmp_path("bench_append.xlsx")
+    ok, msg = benchmark.pedantic(r.create_xlsx_file, args=(path, _stream(1000)), kwargs={'append': True},
+                                 setup=lambda: r.create_xlsx_file(path, _stream(5000)), rounds=3)
+    if not ok:
+        raise RuntimeError(msg)
+    benchmark.extra_info.update(rows=1000, existing=5000)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Hedging gegen Tail-Latenz: der primäre Mock-LLM hängt bei jeder zehnten
+Anfrage SLOW s vor dem ersten Token, der zweite antwortet sofort.
+Gemessen werden 20 Anfragen hintereinander über llm_chat.
+
+extra_info: p50/p95/p99 pro Anfrage, Hedge-Rate, Mehrkosten (geschätzt).
+"""
+
+import time
+
+from common import remote
+from mock_llm_server import MockLLMServer
+
+SLOW, EVERY, CALLS = 1.0, 10, 20
+REPLY = '{"action": "done", "message": "ok"}'
+MESSAGES = [{"role": "system", "content": "Benchmark"}, {"role": "user", "content": "Aufgabe " * 200}]
+
+
+class _TailServer(MockLLMServer):
+    """Jede EVERY-te Anfrage mit langsamem Prefill (Header sofort, Token spät)"""
+
+    @property
+    def first_token_delay(self):
+        return SLOW if self.stats['requests'] % EVERY == 0 else 0.0
+
+    @first_token_delay.setter
+    def first_token_delay(self, value):
+        pass
+
+
+def _config(srv, model, **kw):
+    return {'url': srv.url, 'api_key': 'mock', 'model': model, 'stream': True, 'rpm': 100000,
+            'token_price': 2.0, 'response_cache': False, **kw}
+
+
+def _bench(benchmark, hedge):
+    r = remote()
+    with _TailServer(reply=REPLY, chatter="") as primary, MockLLMServer(reply=REPLY, chatter="") as backup:
+        config = _config(primary, 'primaer')
+        if hedge:
+            config.update(hedge_config=_config(backup, 'zweit'), hedge_delay=0.3, hedge_percentile=80)
+        latencies = []
+
+        def batch():
+            for _ in range(CALLS):
+                t = time.perf_counter()
+                text, err, _ = r.llm_chat(config, MESSAGES)
+                latencies.append(time.perf_counter() - t)
+                if text is None:
+                    raise RuntimeError(err)
+
+        benchmark.pedantic(batch, rounds=3)
+        st = r.PROVIDER_STATS.snapshot()[r.PROVIDER_STATS.key(config)]
+        pct = r.ProviderStats.percentile
+        benchmark.extra_info.update(calls=len(latencies), **{f'p{p}': round(pct(latencies, p), 3) for p in (50, 95, 99)},
+                                    hedge_rate=round(st['hedge_rate'], 3), extra_cost=st['extra_cost'])
+
+
+def bench_tail_no_hedge(benchmark):
+    _bench(benchmark, hedge=False)
+
+
+def bench_tail_hedged(benchmark):
+    _bench(benchmark, hedge=True)
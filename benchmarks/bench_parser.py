@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""parse_json über ein Korpus unordentlicher LLM-Antworten"""
+
+import json, os
+
+from common import FIXTURE_DIR, remote
+
+with open(os.path.join(FIXTURE_DIR, "llm_outputs.json"), encoding='utf-8') as f:
+    CORPUS = json.load(f)
+
+
+def bench_parse_json_corpus(benchmark):
+    parse_json = remote().parse_json
+    results = benchmark(lambda: [parse_json(t) for t in CORPUS])
+    benchmark.extra_info['outputs'] = len(CORPUS)
+    benchmark.extra_info['wait_fallbacks'] = sum(r.get('action') == 'wait' for r in results)
+
+
+def bench_parse_json_long_chatter(benchmark):
+    # Geplapper nach dem JSON ist der Normalfall ohne Stream-Abbruch
+    text = '{"action": "done", "message": "Fertig"}' + "\n\nIch habe die Aufgabe erledigt. " * 400
+    benchmark(remote().parse_json, text)
+
+
+def bench_stream_parser_corpus(benchmark):
+    # Inkrementeller Parser, wie beim SSE-Stream in Stücken von 8 Zeichen
+    r = remote()
+
+    def run():
+        for t in CORPUS:
+            p = r.JsonStreamParser()
+            for i in range(0, len(t), 8):
+                p.feed(t[i:i + 8])
+                if p.done:
+                    break
+    benchmark(run)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Plan-Modus gegen Einzelaktionen: dieselbe Aufgabe (zwei Befehle + done)
+über die echte Agent-Schleife und den Mock-LLM mit fester Latenz.
+
+extra_info: LLM-Aufrufe und ausgeführte Aktionen pro Aufgabe.
+"""
+
+import time
+
+from common import remote
+from mock_llm_server import MockLLMServer
+
+LATENCY = 0.05          # simulierte Modell-Latenz pro Aufruf
+ACTIONS = ['{"action": "run_commands", "commands": ["echo eins"]}',
+           '{"action": "run_commands", "commands": ["echo zwei"]}',
+           '{"action": "done", "message": "Fertig"}']
+PLAN = '{"action": "plan", "steps": [%s]}' % ", ".join(ACTIONS)
+
+
+class _ScriptedServer(MockLLMServer):
+    """Antwort nach Anzahl der bisherigen Assistenten-Nachrichten im Verlauf"""
+
+    def reply_for(self, payload):
+        n = sum(m['role'] == 'assistant' for m in payload['messages'])
+        return self.script[min(n, len(self.script) - 1)]
+
+
+def _bench_task(benchmark, script, plan_mode, rounds=5):
+    r = remote()
+    with _ScriptedServer(latency=LATENCY, chatter="") as srv:
+        srv.script = script
+        engine = r.AgentEngine(system_prompt="Benchmark", sessions=1)
+        engine.set_config({'url': srv.url, 'api_key': 'mock', 'model': 'mock-model', 'stream': True,
+                           'rpm': 100000, 'token_price': 0, 'macros': False, 'plan_mode': plan_mode})
+        session = engine.sessions[0]
+
+        def task():
+            t = engine.submit("Zwei Befehle ausführen", new=True, source='bench')
+            while t['status'] in ('queued', 'running'):
+                time.sleep(0.002)
+            return t
+
+        srv.reset_stats()
+        try:
+            t = benchmark.pedantic(task, rounds=rounds, warmup_rounds=1)
+        finally:
+            engine.close()
+        benchmark.extra_info.update(llm_calls=srv.stats['requests'] / (rounds + 1),
+                                    actions=session.actions_run, status=t['status'])
+
+
+def bench_task_single_actions(benchmark):
+    _bench_task(benchmark, ACTIONS, plan_mode=False)
+
+
+def bench_task_plan_mode(benchmark):
+    _bench_task(benchmark, [PLAN], plan_mode=True)
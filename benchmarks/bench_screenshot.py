@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Screenshot-Kodierung und Frame-Diff auf synthetischen Bildern (kein Desktop nötig)"""
+
+from common import remote, synthetic_frame
+
+FRAME = synthetic_frame()
+FRAME_CHANGED = synthetic_frame(changed_box=(1500, 980, 1900, 1060))
+
+
+def _encode(benchmark, fmt):
+    r = remote()
+    _, _, _, meta = benchmark(r.take_screenshot, r.SCREENSHOT_MAX_SIDE, fmt, r.SCREENSHOT_QUALITY,
+                              save=False, clipboard=False, img=FRAME)
+    benchmark.extra_info.update(bytes=meta['bytes'], size=list(meta['size']))
+
+
+def bench_take_screenshot_jpeg(benchmark):
+    _encode(benchmark, 'JPEG')
+
+
+def bench_take_screenshot_png(benchmark):
+    _encode(benchmark, 'PNG')
+
+
+def bench_take_screenshot_webp(benchmark):
+    _encode(benchmark, 'WEBP')
+
+
+def bench_frame_diff_unchanged(benchmark):
+    differ = remote().FrameDiffer()
+    kind, box, thumb, h = differ.compare(FRAME)
+    differ.update(FRAME, thumb, h)
+    kind = benchmark(differ.compare, FRAME)[0]
+    benchmark.extra_info['kind'] = kind
+
+
+def bench_frame_diff_region(benchmark):
+    differ = remote().FrameDiffer()
+    kind, box, thumb, h = differ.compare(FRAME)
+    differ.update(FRAME, thumb, h)
+    kind, box = benchmark(differ.compare, FRAME_CHANGED)[:2]
+    benchmark.extra_info.update(kind=kind, box=list(box) if box else None)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Kaltstart: Hauptmodul in einem frischen Interpreter laden (wie vor dem GUI-Aufbau).
+
+Die Backends (docx, openpyxl, pptx, pyautogui, Playwright, pywinauto) dürfen
+dabei nicht importiert werden – geprüft wird erst beim Programmstart im Hintergrund.
+extra_info: backends = trotzdem geladene Backend-Module (Soll: 0).
+"""
+
+import json, os, subprocess, sys
+
+from common import BENCH_DIR
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+sys.path.insert(0, {tools!r})
+from remote_module import load_remote_module
+r = load_remote_module()
+dt = time.perf_counter() - t
+roots = {{m[0].split('.')[0] for m in r.CAPABILITIES.values()}}
+print(json.dumps({{'load': dt, 'backends': sorted(m for m in sys.modules if m.split('.')[0] in roots)}}))
+"""
+
+
+def _start():
+    tools = os.path.join(os.path.dirname(BENCH_DIR), "tools")
+    out = subprocess.run([sys.executable, '-c', _PROBE.format(tools=tools)], capture_output=True, text=True, timeout=60)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench_module_import_cold(benchmark):
+    _start()   # Bytecode anlegen
+    res = benchmark.pedantic(_start, rounds=5)
+    benchmark.extra_info.update(load_s=round(res['load'], 3), backends=len(res['backends']))
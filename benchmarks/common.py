@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Gemeinsame Fixtures der Benchmarks: Hauptmodul laden, statische HTML-Seiten,
+synthetische Bildschirm-Frames, Headless-Chromium über den echten BrowserHelper.
+"""
+
+import atexit, os, random, shutil, subprocess, sys, tempfile
+
+from run import skip
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "tools"))
+
+from remote_module import load_remote_module  # noqa: E402
+
+_TMP = tempfile.mkdtemp(prefix="remote-bench-")
+atexit.register(shutil.rmtree, _TMP, True)
+
+
+def remote():
+    return load_remote_module()
+
+
+def tmp_path(name):
+    return os.path.join(_TMP, name)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# HTML
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_WORDS = ("Angebot Preis Suche Ergebnis Mini-PC Prozessor Speicher Lieferung Versand Kunde "
+          "Bewertung Konto Warenkorb Hilfe Kontakt Datenschutz Impressum Newsletter").split()
+
+
+def make_page(n_interactive, seed=1):
+    """Statische Seite mit etwa n interaktiven Elementen (Links, Buttons, Formulare) plus Fließtext"""
+    rnd = random.Random(seed)
+    words = lambda k: " ".join(rnd.choice(_WORDS) for _ in range(k))
+    parts = ["<!DOCTYPE html><html><head><meta charset='utf-8'><title>Benchmark %d</title></head><body>" % n_interactive,
+             "<nav>" + "".join(f"<a href='/kategorie/{i}'>{words(2)}</a>" for i in range(min(12, n_interactive))) + "</nav>",
+             "<form action='/suche'><input name='q' type='search' placeholder='Suchen…'>"
+             "<button type='submit'>Suchen</button></form><main>"]
+    made = min(12, n_interactive) + 2
+    i = 0
+    while made < n_interactive:
+        kind = i % 5
+        if kind == 0:
+            parts.append(f"<article><h2>{words(4)}</h2><p>{words(40)}</p>"
+                         f"<a href='/produkt/{i}'>Details</a></article>")
+        elif kind == 1:
+            parts.append(f"<div class='card c{i}'><span>{words(6)}</span>"
+                         f"<button id='kaufen-{i}'>In den Warenkorb</button></div>")
+        elif kind == 2:
+            parts.append(f"<label>{words(2)} <input type='text' name='feld{i}' placeholder='{words(1)}'></label>")
+        elif kind == 3:
+            parts.append(f"<div role='button' onclick='void 0'>{words(3)}</div><p>{words(25)}</p>")
+        else:
+            parts.append(f"<table><tr><td>{words(3)}</td><td>{rnd.randint(50, 2000)} €</td>"
+                         f"<td><a href='https://example.com/extern/{i}'>Shop</a></td></tr></table>")
+        made += 1
+        i += 1
+    parts.append(f"</main><footer><p>{words(30)}</p></footer></body></html>")
+    return "".join(parts)
+
+
+def page_url(n_interactive):
+    """Schreibt die Seite einmal als statische Datei und gibt die file://-URL zurück"""
+    path = tmp_path(f"page_{n_interactive}.html")
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(make_page(n_interactive))
+    return "file://" + path.replace(os.sep, '/')
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BROWSER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_BROWSER = _BROWSER_ERROR = None
+
+
+def headless_browser(port=9333):
+    """Headless-Chromium mit Debug-Port, verbunden über BrowserHelper.connect (wie die App).
+
+    Wird einmal pro Lauf gestartet und beim Beenden geschlossen.
+    """
+    global _BROWSER, _BROWSER_ERROR
+    if _BROWSER:
+        return _BROWSER
+    if _BROWSER_ERROR:
+        skip(_BROWSER_ERROR)
+    r = remote()
+    if not r.CAPS.available('playwright'):
+        skip("playwright nicht installiert")
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        exe = p.chromium.executable_path
+    if not exe or not os.path.exists(exe):
+        skip("Chromium fehlt (python -m playwright install chromium)")
+    proc = subprocess.Popen([exe, '--headless=new', f'--remote-debugging-port={port}', '--no-first-run',
+                             '--no-default-browser-check', f'--user-data-dir={tmp_path("chrome")}', 'about:blank'],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    helper = r.BrowserHelper()
+
+    def close():
+        helper.shutdown()
+        proc.terminate()
+
+    atexit.register(close)
+    if not helper.connect(port, timeout=15.0):
+        _BROWSER_ERROR = "keine CDP-Verbindung zum Headless-Chromium"
+        skip(_BROWSER_ERROR)
+    _BROWSER = helper
+    return helper
+
+
+def open_page(helper, n_interactive):
+    helper.navigate(page_url(n_interactive))
+    helper.wait_ready('load', quiet_ms=50, timeout=5.0)
+
+
+def evaluate(helper, js):
+    """Beliebiges JS im Playwright-Thread des Helpers (Sync-API ist threadgebunden)"""
+    return helper.executor().submit(lambda: helper.page.evaluate(js)).result()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BILDER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def synthetic_frame(w=1920, h=1080, seed=1, changed_box=None):
+    """Desktop-ähnliches Bild: Hintergrund, Fenster, Text, ein Foto-artiger Bereich.
+
+    changed_box=(x0, y0, x1, y1) malt dort zusätzlich etwas (für Frame-Diffs).
+    """
+    from PIL import Image, ImageDraw
+    rnd = random.Random(seed)
+    img = Image.new('RGB', (w, h), (32, 60, 96))
+    d = ImageDraw.Draw(img)
+    for k in range(6):
+        x0, y0 = rnd.randint(0, w // 2), rnd.randint(0, h // 2)
+        x1, y1 = x0 + rnd.randint(300, w // 2), y0 + rnd.randint(200, h // 2)
+        d.rectangle([x0, y0, x1, y1], fill=(245, 245, 245), outline=(90, 90, 90))
+        d.rectangle([x0, y0, x1, y0 + 28], fill=(0, 90, 180))
+        for line in range(y0 + 40, y1 - 14, 18):
+            d.text((x0 + 10, line), " ".join(rnd.choice(_WORDS) for _ in range(8)), fill=(20, 20, 20))
+    noise = Image.effect_noise((w // 4, h // 4), 60).convert('RGB')
+    img.paste(noise, (w - w // 4 - 20, h - h // 4 - 60))
+    d.rectangle([0, h - 40, w, h], fill=(20, 20, 30))
+    if changed_box:
+        d.rectangle(changed_box, fill=(200, 40, 40))
+        d.text((changed_box[0] + 5, changed_box[1] + 5), "Neue Meldung", fill=(255, 255, 255))
+    return img
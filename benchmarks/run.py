@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-Benchmarks der heißen Pfade (Parser, Mini-DOM, Screenshot, Konfig,
+Kontext, XLSX) – headless, ohne echten Desktop.
+
+Jede Datei bench_*.py enthält Funktionen bench_*(benchmark). Das
+benchmark-Objekt verhält sich wie die Fixture von pytest-benchmark:
+benchmark(fn, *args) bzw. benchmark.pedantic(fn, setup=..., rounds=...).
+Ergebnisse landen als JSON (Format wie pytest-benchmark --benchmark-json).
+
+Start:     python benchmarks/run.py
+Auswahl:   python benchmarks/run.py -k screenshot
+Vergleich: python benchmarks/run.py --compare benchmarks/results/alt.json
+"""
+
+import argparse, datetime, glob, importlib.util, json, os, platform, statistics, subprocess, sys, time, traceback
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, BENCH_DIR)
+
+
+class Skip(Exception):
+    """Benchmark kann hier nicht laufen (z.B. Chromium fehlt)"""
+
+
+def skip(reason):
+    raise Skip(reason)
+
+
+# Als Skript ist dieses Modul __main__ – "from run import skip" in den
+# Benchmarks soll dieselbe Skip-Klasse bekommen statt das Modul neu zu laden
+sys.modules.setdefault('run', sys.modules[__name__])
+
+
+class Benchmark:
+    """Misst eine Funktion: Aufwärmen, Iterationen kalibrieren, dann Runden bis max_time"""
+
+    def __init__(self, name, group, min_rounds=5, max_rounds=200, max_time=1.0, min_round_time=0.005):
+        self.name, self.group = name, group
+        self.min_rounds, self.max_rounds, self.max_time = min_rounds, max_rounds, max_time
+        self.min_round_time = min_round_time
+        self.extra_info = {}
+        self.stats = None
+
+    def __call__(self, fn, *args, **kwargs):
+        result = fn(*args, **kwargs)  # Aufwärmen (Caches, JIT im Browser, Imports)
+        t = time.perf_counter()
+        fn(*args, **kwargs)
+        single = time.perf_counter() - t
+        iterations = max(1, int(self.min_round_time / single)) if single > 0 else 1000
+        times = []
+        t_end = time.perf_counter() + self.max_time
+        while len(times) < self.min_rounds or (len(times) < self.max_rounds and time.perf_counter() < t_end):
+            t = time.perf_counter()
+            for _ in range(iterations):
+                fn(*args, **kwargs)
+            times.append((time.perf_counter() - t) / iterations)
+        self._finish(times, iterations)
+        return result
+
+    def pedantic(self, fn, args=(), kwargs=None, setup=None, rounds=1, iterations=1, warmup_rounds=0):
+        """Feste Runden; setup() läuft vor jeder Runde außerhalb der Messung"""
+        kwargs = kwargs or {}
+        result = None
+        for _ in range(warmup_rounds):
+            if setup: setup()
+            fn(*args, **kwargs)
+        times = []
+        for _ in range(rounds):
+            if setup: setup()
+            t = time.perf_counter()
+            for _ in range(iterations):
+                result = fn(*args, **kwargs)
+            times.append((time.perf_counter() - t) / iterations)
+        self._finish(times, iterations)
+        return result
+
+    def _finish(self, times, iterations):
+        q = statistics.quantiles(times, n=4) if len(times) > 1 else [times[0]] * 3
+        mean = statistics.fmean(times)
+        self.stats = {'min': min(times), 'max': max(times), 'mean': mean,
+                      'stddev': statistics.stdev(times) if len(times) > 1 else 0.0,
+                      'median': statistics.median(times), 'q1': q[0], 'q3': q[2], 'iqr': q[2] - q[0],
+                      'rounds': len(times), 'iterations': iterations, 'total': sum(times) * iterations,
+                      'ops': 1 / mean if mean else 0.0}
+
+
+def discover(pattern=None):
+    """(gruppe, name, funktion) aus allen bench_*.py"""
+    found = []
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, "bench_*.py"))):
+        group = os.path.basename(path)[6:-3]
+        spec = importlib.util.spec_from_file_location(f"bench_{group}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        for name in sorted(n for n in vars(module) if n.startswith('bench_') and callable(getattr(module, n))):
+            if not pattern or pattern in f"{group}::{name}":
+                found.append((group, name, getattr(module, name)))
+    return found
+
+
+def machine_info():
+    return {'node': platform.node(), 'processor': platform.processor(), 'machine': platform.machine(),
+            'python_implementation': platform.python_implementation(), 'python_version': platform.python_version(),
+            'system': platform.system(), 'release': platform.release(), 'cpu_count': os.cpu_count()}
+
+
+def commit_info():
+    def git(*a):
+        try: return subprocess.run(['git', *a], cwd=BENCH_DIR, capture_output=True, text=True, timeout=5).stdout.strip()
+        except Exception: return ""
+    return {'id': git('rev-parse', 'HEAD'), 'branch': git('rev-parse', '--abbrev-ref', 'HEAD'),
+            'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def fmt_time(s):
+    for unit, f in (('s', 1), ('ms', 1e3), ('µs', 1e6)):
+        if s * f >= 1:
+            return f"{s * f:8.2f} {unit}"
+    return f"{s * 1e9:8.0f} ns"
+
+
+def compare(results, old_path):
+    with open(old_path, encoding='utf-8') as f:
+        old = {b['fullname']: b['stats'] for b in json.load(f)['benchmarks']}
+    print(f"\nVergleich mit {old_path} (Median):")
+    for b in results:
+        o = old.get(b['fullname'])
+        if not o:
+            print(f"  {b['fullname']:<52} neu")
+            continue
+        d = (b['stats']['median'] / o['median'] - 1) * 100 if o['median'] else 0.0
+        mark = '🔴' if d > 10 else '🟢' if d < -10 else '  '
+        print(f"  {b['fullname']:<52} {fmt_time(o['median'])} → {fmt_time(b['stats']['median'])} {d:+6.1f}% {mark}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Micro-Benchmarks der Agent-Pfade")
+    ap.add_argument('-k', dest='pattern', help="Nur Benchmarks, deren gruppe::name das enthält")
+    ap.add_argument('--json', help="Ergebnisdatei (Standard: benchmarks/results/<zeit>.json)")
+    ap.add_argument('--compare', help="Älteres Ergebnis-JSON zum Vergleich")
+    ap.add_argument('--max-time', type=float, default=1.0, help="Sekunden Messzeit pro Benchmark")
+    ap.add_argument('--min-rounds', type=int, default=5)
+    a = ap.parse_args(argv)
+
+    results, skipped, failed = [], [], []
+    print(f"{'Benchmark':<52}{'Median':>12}{'Min':>12}{'Ops/s':>12}{'Runden':>8}")
+    for group, name, fn in discover(a.pattern):
+        bench = Benchmark(name, group, min_rounds=a.min_rounds, max_time=a.max_time)
+        fullname = f"{group}::{name}"
+        try:
+            fn(bench)
+        except Skip as e:
+            skipped.append(fullname)
+            print(f"{fullname:<52}  übersprungen: {e}")
+            continue
+        except Exception:
+            failed.append(fullname)
+            print(f"{fullname:<52}  FEHLER\n{traceback.format_exc()}")
+            continue
+        if bench.stats is None:
+            continue
+        st = bench.stats
+        print(f"{fullname:<52}{fmt_time(st['median']):>12}{fmt_time(st['min']):>12}{st['ops']:>12.1f}{st['rounds']:>8}")
+        results.append({'group': group, 'name': name, 'fullname': fullname, 'params': None,
+                        'extra_info': bench.extra_info, 'stats': st})
+
+    out = a.json or os.path.join(RESULTS_DIR, datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({'machine_info': machine_info(), 'commit_info': commit_info(), 'benchmarks': results,
+                   'datetime': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                   'version': 'remote-bench-1'}, f, indent=2)
+    print(f"\n{len(results)} gemessen, {len(skipped)} übersprungen, {len(failed)} Fehler → {out}")
+    if a.compare:
+        compare(results, a.compare)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Gemeinsame Fixtures der Tests: Hauptmodul über tools/remote_module.py laden,
+Mock-LLM-Server aus tools/mock_llm_server.py.
+
+Start: python -m pytest -q tests
+"""
+
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+from remote_module import load_remote_module  # noqa: E402
+from mock_llm_server import MockLLMServer  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def remote():
+    return load_remote_module()
+
+
+@pytest.fixture
+def mock_llm():
+    with MockLLMServer() as srv:
+        yield srv
+
+
+def llm_config(srv, **kw):
+    return {'url': srv.url, 'api_key': 'mock', 'model': 'mock-model', 'stream': True, 'rpm': 100000,
+            'token_price': 2.0, 'response_cache': False, **kw}
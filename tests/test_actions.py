@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""parse_action / validate_action: Antworttext → geprüfte Aktion"""
+
+import pytest
+
+
+@pytest.mark.parametrize("txt, want", [
+    ('{"action": "key", "key": "Return"}', {'action': 'key', 'key': 'Return'}),
+    ('```json\n{"action": "wait", "seconds": "2,5"}\n```', {'action': 'wait', 'seconds': 2.5}),
+    ('Ich klicke jetzt. {"action": "mouse_click", "x": "640", "y": 480.4} Fertig.',
+     {'action': 'mouse_click', 'x': 640, 'y': 480}),
+    ('{"action": "done"}', {'action': 'done', 'message': 'Fertig'}),
+    ('{"action": "wait"}', {'action': 'wait'}),
+])
+def test_parse_valid(remote, txt, want):
+    data, err = remote.parse_action(txt)
+    assert err is None
+    assert {k: v for k, v in data.items() if k in want} == want
+
+
+@pytest.mark.parametrize("txt, fragment", [
+    ('', "leere Antwort"),
+    ('Ich weiß nicht weiter.', "keine JSON-Aktion"),
+    ('{"action": "fliegen"}', "unbekannte Aktion"),
+    ('{"action": "browser_start"}', "Pflichtfeld 'url'"),
+    ('{"action": "mouse_click", "x": 5}', "nur zusammen"),
+    ('{"action": "mouse_click", "x": "links", "y": 1}', "'x' muss integer"),
+    ('{"action": "mouse_click", "button": "mitte"}', "eins von"),
+    ('{"action": "playwright_click"}', "eins von index, selector, text"),
+])
+def test_parse_invalid(remote, txt, fragment):
+    data, err = remote.parse_action(txt)
+    assert data is None and fragment in err
+
+
+def test_unknown_fields_dropped_and_bool_coerced(remote):
+    data, err = remote.validate_action({'action': 'create_xlsx', 'path': 'a.xlsx', 'append': 'ja', 'farbe': 'rot'})
+    assert err is None and data == {'action': 'create_xlsx', 'path': 'a.xlsx', 'append': True}
+
+
+def test_plan_steps_checked_and_keep_conditions(remote):
+    data, err = remote.validate_action({'action': 'plan', 'steps': [
+        {'action': 'key', 'key': 'Return', 'expect': {'url': 'suche'}},
+        {'action': 'done', 'message': 'ok'}]})
+    assert err is None and data['steps'][0]['expect'] == {'url': 'suche'}
+    data, err = remote.validate_action({'action': 'plan', 'steps': [{'action': 'key'}]})
+    assert data is None and err.startswith("plan Schritt 1:")
+
+
+def test_tool_calls_round_trip(remote):
+    txt = remote.tool_calls_text([{'function': {'name': 'key', 'arguments': '{"key": "Tab"}'}},
+                                  {'function': {'name': 'done', 'arguments': '{}'}}])
+    data, err = remote.parse_action(txt)
+    assert err is None and [s['action'] for s in data['steps']] == ['key', 'done']
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""AgentEngine gegen den Mock-LLM: was landet im flüchtigen Zustand der Schritte"""
+
+import json, time
+
+import pytest
+
+from conftest import llm_config
+from mock_llm_server import MockLLMServer
+
+
+class _Script(MockLLMServer):
+    """Antwortet der Reihe nach mit script und merkt sich die letzte Nutzer-Nachricht"""
+
+    def __init__(self, script):
+        super().__init__(chatter="")
+        self.script, self.seen = script, []
+
+    def reply_for(self, payload):
+        self.seen.append(json.dumps(payload['messages'][-1], ensure_ascii=False))
+        return self.script[min(len(self.seen), len(self.script)) - 1]
+
+
+@pytest.fixture
+def engine(remote):
+    eng = remote.AgentEngine(system_prompt="Test", sessions=1)
+    yield eng
+    eng.close()
+
+
+def _run(engine, srv, cmd="aufgabe"):
+    engine.set_config(llm_config(srv, macros=False))
+    task = engine.submit(cmd, new=True, source='test')
+    t_end = time.time() + 20
+    while engine.busy and time.time() < t_end:
+        time.sleep(0.01)
+    return task
+
+
+def test_command_output_only_in_next_step(engine):
+    script = ['{"action": "run_commands", "commands": ["echo ausgabe-123"]}',
+              '{"action": "wait", "seconds": 0.1}',
+              '{"action": "done", "message": "ok"}']
+    with _Script(script) as srv:
+        task = _run(engine, srv)
+    assert task['status'] == 'done'
+    assert 'ausgabe-123' in srv.seen[1]
+    assert 'BEFEHLSAUSGABE' not in srv.seen[2]
+
+
+def test_dependent_commands_run_in_order(engine, tmp_path):
+    d = tmp_path / "neu"
+    script = [json.dumps({'action': 'run_commands',
+                          'commands': [f'mkdir "{d}"', f'echo inhalt-42 > "{d / "a.txt"}"', f'cat "{d / "a.txt"}"']}),
+              '{"action": "done", "message": "ok"}']
+    with _Script(script) as srv:
+        task = _run(engine, srv)
+    assert task['status'] == 'done'
+    assert 'inhalt-42' in srv.seen[1]
+    assert 'exit 1' not in srv.seen[1]
+
+
+def test_commands_sequential_by_default(remote, tmp_path):
+    f = tmp_path / "x.txt"
+    results = remote.run_commands_captured([f'sleep 0.3 && echo a > "{f}"', f'cat "{f}"'])
+    assert results[1]['code'] == 0 and results[1]['out'].strip() == 'a'
+
+
+@pytest.mark.parametrize("cmd, launch", [("start notepad", True), ("notepad.exe C:\\a.txt", True), ("calc", True),
+                                         ("Write-Output hi", False), ("write-host x", False),
+                                         ("start-process x", False), ("calc-x.ps1", False), ("echo start", False)])
+def test_launch_detection(remote, cmd, launch):
+    assert remote.is_launch_command(cmd) is launch
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""BrowserHelper: Playwright-Thread überlebt shutdown() (ohne echten Browser)"""
+
+
+def test_usable_after_shutdown(remote):
+    helper = remote.BrowserHelper()
+    assert helper.has_page() is False
+    first = helper.executor()
+    helper.shutdown()
+    assert helper.has_page() is False      # früher: "cannot schedule new futures after shutdown"
+    assert helper.executor() is not first
+    helper.shutdown()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Optionale Backends: Import ohne Prüfung, Cache in capabilities.json, LazyModule"""
+
+import json, os, shutil, subprocess, sys
+
+import pytest
+
+_IMPORT = """
+import json, sys
+sys.path.insert(0, 'tools')
+from remote_module import load_remote_module
+r = load_remote_module()
+roots = {m[0].split('.')[0] for m in r.CAPABILITIES.values()}
+print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in roots)))
+"""
+
+
+def test_import_has_no_probe_side_effects(remote, tmp_path):
+    # Kopie ohne capabilities.json = kalter Cache
+    (tmp_path / "tools").mkdir()
+    shutil.copy(remote.__file__, tmp_path)
+    shutil.copy(os.path.join(os.path.dirname(remote.__file__), "tools", "remote_module.py"), tmp_path / "tools")
+    out = subprocess.run([sys.executable, '-c', _IMPORT], cwd=tmp_path, capture_output=True, text=True, timeout=60)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+    assert not (tmp_path / "capabilities.json").exists()
+
+
+def _registry(remote, tmp_path, monkeypatch):
+    # Eigenes Modul, das garantiert noch nicht importiert ist, und eines, das fehlt
+    (tmp_path / "caps_fake_backend.py").write_text("VALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "caps_fake_backend", raising=False)
+    monkeypatch.setitem(remote.CAPABILITIES, 'fake', ('caps_fake_backend', 'caps-fake', False))
+    monkeypatch.setitem(remote.CAPABILITIES, 'gone', ('caps_no_such_backend', 'caps-gone', False))
+    return remote.CapabilityRegistry(str(tmp_path / "capabilities.json"))
+
+
+def test_known_never_imports(remote, tmp_path, monkeypatch):
+    caps = _registry(remote, tmp_path, monkeypatch)
+    assert caps.known('fake') is False
+    assert "caps_fake_backend" not in sys.modules
+    assert not (tmp_path / "capabilities.json").exists()
+
+
+def test_available_probes_and_saves(remote, tmp_path, monkeypatch):
+    caps = _registry(remote, tmp_path, monkeypatch)
+    assert caps.available('fake') and "caps_fake_backend" in sys.modules
+    assert not caps.available('gone')
+    assert "ModuleNotFoundError" in caps.error('gone')
+    saved = json.loads((tmp_path / "capabilities.json").read_text())
+    assert saved['key'] == caps.key
+    assert saved['probes']['fake']['ok'] and not saved['probes']['gone']['ok']
+    assert caps.known('fake') and not caps.known('gone')
+
+
+def test_cached_probes_reused_without_import(remote, tmp_path, monkeypatch):
+    _registry(remote, tmp_path, monkeypatch).available('gone')
+    caps = remote.CapabilityRegistry(str(tmp_path / "capabilities.json"))
+    assert caps.probes['gone']['ok'] is False
+    monkeypatch.setattr(remote.importlib, 'import_module', lambda name: pytest.fail("kein Import erwartet"))
+    assert not caps.available('gone') and caps.load('gone') is None
+
+
+def test_fingerprint_mismatch_drops_probes(remote, tmp_path, monkeypatch):
+    path = tmp_path / "capabilities.json"
+    _registry(remote, tmp_path, monkeypatch).available('gone')
+    data = json.loads(path.read_text())
+    data['key'] = "veraltet"
+    path.write_text(json.dumps(data))
+    assert remote.CapabilityRegistry(str(path)).probes == {}
+
+
+def test_forget_clears_probes(remote, tmp_path, monkeypatch):
+    caps = _registry(remote, tmp_path, monkeypatch)
+    caps.available('gone')
+    caps.available('fake')
+    caps.forget(['gone'])
+    assert 'gone' not in caps.probes and 'fake' in caps.probes
+    caps.forget()
+    assert caps.probes == {}
+
+
+def test_lazy_module_imports_on_first_access(remote, tmp_path, monkeypatch):
+    monkeypatch.setattr(remote, 'CAPS', _registry(remote, tmp_path, monkeypatch))
+    lazy = remote.LazyModule('fake')
+    assert "caps_fake_backend" not in sys.modules
+    assert lazy.VALUE == 42 and "caps_fake_backend" in sys.modules
+
+
+def test_lazy_module_missing_backend_raises(remote, tmp_path, monkeypatch):
+    monkeypatch.setattr(remote, 'CAPS', _registry(remote, tmp_path, monkeypatch))
+    with pytest.raises(ImportError, match="gone nicht verfügbar"):
+        remote.LazyModule('gone').anything
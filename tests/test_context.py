@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""ContextManager.compact: Verlauf unter dem Budget, Kopf und letzte Schritte bleiben"""
+
+import json
+
+
+def _history(steps, payload=400):
+    msgs = [{"role": "system", "content": "System " * 50},
+            {"role": "user", "content": "Aufgabe: Tabelle anlegen\n\n📋 1 button \"alt\""}]
+    for i in range(steps):
+        msgs.append({"role": "assistant", "content": json.dumps(
+            {"action": "create_docx", "path": f"C:\\d{i}.docx", "content": "x" * payload})})
+        msgs.append({"role": "user", "content": "Weiter. Nächster Schritt?"})
+    return msgs
+
+
+def test_under_budget_untouched(remote):
+    ctx = remote.ContextManager(budget=100000)
+    msgs = _history(5)
+    assert ctx.compact(msgs) == (msgs, None)
+
+
+def test_compacts_to_about_half_and_keeps_pairs(remote):
+    ctx = remote.ContextManager(budget=1200)
+    for i in range(12):
+        ctx.record(json.dumps({"action": "create_docx", "path": f"C:\\d{i}.docx", "content": "x" * 400}), f"✅ {i}")
+    msgs = _history(12)
+    new, info = ctx.compact(msgs)
+    assert info['tokens_after'] < info['tokens_before'] and info['tokens_after'] <= 1200
+    assert new[0] == msgs[0]
+    assert new[1]['content'] == "Aufgabe: Tabelle anlegen"          # veraltete Mini-DOM-Liste weg
+    log = new[2]['content']
+    assert log.startswith(remote.STEP_LOG_HEADER) and "[1] create_docx path=C:\\d0.docx → ✅ 0" in log
+    assert "xxxx" not in log                                          # Nutzlast entfällt
+    assert new[3]['role'] == 'assistant' and new[-1] == msgs[-1]
+    assert ctx.stats['payload_chars'] > 0
+
+
+def test_second_compaction_extends_log(remote):
+    ctx = remote.ContextManager(budget=1200)
+    new, _ = ctx.compact(_history(12))
+    n = ctx.step_no
+    more = new + _history(12)[2:]
+    newer, info = ctx.compact(more)
+    assert info and ctx.step_no > n and sum(m['content'].startswith(remote.STEP_LOG_HEADER) for m in newer) == 1
+
+
+def test_summarize_action_drops_payload(remote):
+    line = remote.summarize_action({"action": "create_xlsx", "path": "C:\\t.xlsx", "data": [[1, 2]] * 500})
+    assert line == "create_xlsx path=C:\\t.xlsx"
+    assert remote.summarize_action({"action": "mouse_click", "x": 5, "y": 7}) == "mouse_click @5,7"
+    assert remote.summarize_action({"action": "done", "message": "fertig"}) == "done fertig"
+
+
+def test_follow_up_kept_in_log_and_summary(remote):
+    ctx = remote.ContextManager(budget=1200)
+    msgs = _history(6)
+    msgs.append({"role": "user", "content": "Nachfrage: auch als PDF"})
+    msgs += _history(6)[2:]
+    new, _ = ctx.compact(msgs)
+    assert "👤 Nachfrage: auch als PDF" in new[2]['content']
+    assert ctx.summary().startswith("🗜️ 1x kompaktiert")
+
+
+def test_log_lines_capped(remote):
+    ctx = remote.ContextManager(budget=1200)
+    ctx.step_log = [f"[{i}] wait" for i in range(ctx.MAX_LOG_LINES + 20)]
+    text = ctx._log_message()['content']
+    assert "… 20 ältere Schritte" in text and "[0] wait" not in text
+    assert text.count("\n") == ctx.MAX_LOG_LINES + 1
+
+
+def test_task_stats(remote):
+    st = remote.TaskStats()
+    st.record(True, True), st.record(False, True), st.record(True, False)
+    assert st.summary() == "🎯 Erfolgsquote: mit Kompaktierung 1/2, ohne 1/1"
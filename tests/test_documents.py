@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Excel-Export: write_only-Streaming aus Generatoren, Kopfzeile, Anhängen"""
+import pytest
+
+
+@pytest.fixture
+def openpyxl(remote):
+    if not remote.CAPS.available('xlsx'):
+        pytest.skip("openpyxl nicht installiert")
+    import openpyxl
+    return openpyxl
+
+
+def _rows(path, openpyxl):
+    return [list(r) for r in openpyxl.load_workbook(path).active.iter_rows(values_only=True)]
+
+
+def test_list_with_bold_header(remote, openpyxl, tmp_path):
+    path = str(tmp_path / "sub" / "a.xlsx")
+    ok, msg = remote.create_xlsx_file(path, [["Name", "Wert"], ["a", 1], ["b", 2]], sheet_name="Daten")
+    assert ok and "3 Zeilen" in msg
+    ws = openpyxl.load_workbook(path)["Daten"]
+    assert [list(r) for r in ws.iter_rows(values_only=True)] == [["Name", "Wert"], ["a", 1], ["b", 2]]
+    assert ws["A1"].font.b and not ws["A2"].font.b
+
+
+def test_generator_is_streamed(remote, openpyxl, tmp_path):
+    pulled = []
+
+    def gen():
+        yield ["Nr", "Quadrat"]
+        for i in range(1000):
+            pulled.append(i)
+            yield [i, i * i]
+
+    path = str(tmp_path / "gen.xlsx")
+    ok, msg = remote.create_xlsx_file(path, gen())
+    assert ok and "1001 Zeilen" in msg
+    rows = _rows(path, openpyxl)
+    assert len(rows) == 1001 and rows[-1] == [999, 998001]
+    assert len(pulled) == 1000                                        # Generator genau einmal verbraucht
+
+
+def test_widths_from_sample(remote, openpyxl, tmp_path):
+    path = str(tmp_path / "w.xlsx")
+    remote.create_xlsx_file(path, [["Kurz", "x" * 200]])
+    ws = openpyxl.load_workbook(path).active
+    assert ws.column_dimensions["A"].width == len("Kurz") + 2
+    assert ws.column_dimensions["B"].width == remote.XLSX_MAX_WIDTH
+
+
+def test_scalar_rows_become_single_cells(remote, openpyxl, tmp_path):
+    path = str(tmp_path / "s.xlsx")
+    remote.create_xlsx_file(path, ["Titel", "eins", "zwei"])
+    assert _rows(path, openpyxl) == [["Titel"], ["eins"], ["zwei"]]
+
+
+def test_append_keeps_existing_rows(remote, openpyxl, tmp_path):
+    path = str(tmp_path / "app.xlsx")
+    remote.create_xlsx_file(path, [["Name", "Wert"], ["a", 1]])
+    ok, msg = remote.create_xlsx_file(path, (r for r in [["b", 2], ["c", 3]]), append=True)
+    assert ok and "angehängt" in msg
+    wb = openpyxl.load_workbook(path)
+    assert [list(r) for r in wb.active.iter_rows(values_only=True)] == [["Name", "Wert"], ["a", 1], ["b", 2], ["c", 3]]
+    assert wb.active["A1"].font.b and not wb.active["A3"].font.b
+
+
+def test_append_new_sheet_gets_header(remote, openpyxl, tmp_path):
+    path = str(tmp_path / "neu.xlsx")
+    remote.create_xlsx_file(path, [["x"]])
+    ok, _ = remote.create_xlsx_file(path, [["Kopf"], ["Wert"]], sheet_name="Zwei", append=True)
+    assert ok
+    ws = openpyxl.load_workbook(path)["Zwei"]
+    assert [list(r) for r in ws.iter_rows(values_only=True)] == [["Kopf"], ["Wert"]]
+    assert ws["A1"].font.b
+
+
+def test_append_without_file_creates_it(remote, openpyxl, tmp_path):
+    path = str(tmp_path / "fehlt.xlsx")
+    ok, msg = remote.create_xlsx_file(path, [["a"]], append=True)
+    assert ok and "angehängt" not in msg and _rows(path, openpyxl) == [["a"]]
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Hedging: Frist aus den Zeiten bis zum ersten Token (ProviderStats), Übernahme in llm_chat"""
+
+import json
+
+from conftest import llm_config
+from mock_llm_server import MockLLMServer
+
+CONFIG = {'url': 'http://mock/v1', 'model': 'm', 'hedge_percentile': 50, 'hedge_delay': 4.0}
+
+
+def test_default_delay_until_enough_samples(remote):
+    stats = remote.ProviderStats()
+    for _ in range(remote.HEDGE_MIN_SAMPLES - 1):
+        stats.record(CONFIG, 1.0)
+    assert stats.deadline(CONFIG) == 4.0
+
+
+def test_censored_samples_only_raise_deadline(remote):
+    stats = remote.ProviderStats()
+    for _ in range(remote.HEDGE_MIN_SAMPLES):
+        stats.record(CONFIG, 1.0)
+    for _ in range(5):
+        stats.record_censored(CONFIG, 0.4)   # früh abgebrochen: sagt nichts über 1.0 s
+    assert stats.deadline(CONFIG) == 1.0
+    for _ in range(15):
+        stats.record_censored(CONFIG, 3.0)   # mindestens 3 s → Median steigt
+    assert stats.deadline(CONFIG) == 3.0
+    snap = stats.snapshot()[stats.key(CONFIG)]
+    assert snap['p50'] == 1.0 and snap['censored'] == 20 and snap['requests'] == 30
+
+
+def test_summary_with_only_censored(remote):
+    stats = remote.ProviderStats()
+    stats.record_censored(CONFIG, 2.0)
+    assert "abgebrochen" in stats.summary([CONFIG])
+
+
+MESSAGES = [{"role": "system", "content": "Test"}, {"role": "user", "content": "Aufgabe: Test"}]
+
+
+def _hedged(primary, backup, delay):
+    return llm_config(primary, model='primaer', max_retries=0, hedge_delay=delay,
+                      hedge_config=llm_config(backup, model='zweit', max_retries=0))
+
+
+def test_backup_takes_over_when_leader_breaks(remote):
+    pieces = []
+    with MockLLMServer(chatter="", first_token_delay=0.3, break_every=1) as primary, \
+            MockLLMServer(chatter="", first_token_delay=0.5) as backup:
+        text, err, info = remote.llm_chat(_hedged(primary, backup, 0.1), MESSAGES, on_delta=pieces.append)
+    assert err is None and json.loads(text)['action'] == 'done'
+    assert info['hedge']['winner'] == 'zweit'
+    reset = pieces.index(None)
+    assert reset > 0 and ''.join(pieces[reset + 1:]) == text
+
+
+def test_backup_started_when_leader_breaks_before_deadline(remote):
+    with MockLLMServer(chatter="", break_every=1) as primary, MockLLMServer(chatter="") as backup:
+        text, err, info = remote.llm_chat(_hedged(primary, backup, 5.0), MESSAGES)
+        assert backup.stats['requests'] == 1
+    assert err is None and json.loads(text)['action'] == 'done'
+    assert info['hedge']['winner'] == 'zweit' and info['hedge']['failover']
+
+
+def test_leader_success_cancels_the_other(remote):
+    with MockLLMServer(chatter="", first_token_delay=0.3) as primary, \
+            MockLLMServer(chatter="", first_token_delay=2.0) as backup:
+        text, err, info = remote.llm_chat(_hedged(primary, backup, 0.1), MESSAGES)
+    assert err is None and info['hedge']['winner'] == 'primaer' and not info['hedge']['failover']
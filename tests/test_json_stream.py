@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""JsonStreamParser: erstes vollständiges JSON-Objekt aus gestreamten Stücken"""
+
+import pytest
+
+
+def _feed(remote, pieces):
+    p = remote.JsonStreamParser()
+    for piece in pieces:
+        p.feed(piece)
+    return p
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 100])
+def test_any_chunking(remote, size):
+    text = 'Denke... {"action": "type", "text": "a } b { \\" c", "n": {"x": 1}} und danach Geplapper {"nein": 1}'
+    p = _feed(remote, [text[i:i + size] for i in range(0, len(text), size)])
+    assert p.done and p.result == {"action": "type", "text": 'a } b { " c', "n": {"x": 1}}
+    assert p.json_text().endswith('{"x": 1}}') and 'Geplapper' not in p.json_text()
+
+
+def test_stops_consuming_after_done(remote):
+    p = _feed(remote, ['{"a": 1}', '{"b": 2}'])
+    assert p.result == {"a": 1} and p.text == '{"a": 1}'
+
+
+def test_incomplete_and_broken(remote):
+    p = _feed(remote, ['{"action": "wa'])
+    assert not p.done and p.json_text() == '{"action": "wa'
+    p = _feed(remote, ['{"action": wait}', '{"action": "wait"}'])
+    assert p.broken and not p.done
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""LLMClient.chat: Wiederholungen, Tool-Fallback, abgerissene Streams"""
+
+import json
+
+import requests
+
+from conftest import llm_config
+from mock_llm_server import MockLLMServer
+
+MESSAGES = [{"role": "system", "content": "Test"}, {"role": "user", "content": "Aufgabe: Test"}]
+
+
+def test_tools_fallback_without_retry_budget(remote):
+    with MockLLMServer(reject_tools=True) as srv:
+        client = remote.LLMClient(llm_config(srv, tool_calling=True), max_retries=0)
+        text, err, info = client.chat(MESSAGES)
+    assert err is None and json.loads(text)['action'] == 'done'
+    assert info['tools_off'] and info['attempts'] == 1 and srv.stats['requests'] == 2
+    assert client.tools_off
+
+
+def test_unrelated_400_keeps_tools(remote):
+    with MockLLMServer(fail_every=1, fail_status=400) as srv:
+        client = remote.LLMClient(llm_config(srv, tool_calling=True), max_retries=0)
+        text, err, info = client.chat(MESSAGES)
+    assert text is None and err.startswith("Status 400") and "rate limited" in err
+    assert not info.get('tools_off') and not client.tools_off and srv.stats['requests'] == 1
+
+
+def test_tools_off_only_remembered_after_success(remote):
+    with MockLLMServer(reject_tools=True, fail_every=2, fail_status=400) as srv:
+        client = remote.LLMClient(llm_config(srv, tool_calling=True), max_retries=0)
+        text, err, info = client.chat(MESSAGES)
+    assert text is None and info['tools_off'] and srv.stats['requests'] == 2
+    assert not client.tools_off
+
+
+def test_broken_stream_resets_deltas(remote, mock_llm, monkeypatch):
+    real, calls = remote._read_sse_stream, []
+
+    def flaky(r, on_delta=None, *args, **kw):
+        if not calls:
+            calls.append(1)
+            on_delta('{"act')
+            r.close()
+            raise requests.ConnectionError("Verbindung abgerissen")
+        return real(r, on_delta, *args, **kw)
+
+    monkeypatch.setattr(remote, '_read_sse_stream', flaky)
+    pieces = []
+    client = remote.LLMClient(llm_config(mock_llm), max_retries=1, backoff=0.01)
+    text, err, info = client.chat(MESSAGES, on_delta=pieces.append)
+    assert err is None and info['attempts'] == 2
+    reset = pieces.index(None)
+    assert pieces[:reset] == ['{"act'] and ''.join(pieces[reset + 1:]) == text
+
+
+def test_chunked_encoding_error_is_retried(remote):
+    pieces = []
+    with MockLLMServer(break_every=2, chatter="") as srv:
+        srv.stats['requests'] = 1  # die erste Anfrage ist Nr. 2 → reißt ab
+        client = remote.LLMClient(llm_config(srv), max_retries=1, backoff=0.01)
+        text, err, info = client.chat(MESSAGES, on_delta=pieces.append)
+    assert err is None and json.loads(text)['action'] == 'done'
+    assert info['attempts'] == 2 and srv.stats['failures'] == 1
+    reset = pieces.index(None)
+    assert reset > 0 and ''.join(pieces[reset + 1:]) == text
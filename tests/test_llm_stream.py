@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Streaming: Aktion nach dem ersten JSON, exakte usage trotzdem in der Buchhaltung"""
+
+import json
+
+from conftest import llm_config
+
+MESSAGES = [{"role": "system", "content": "Test"}, {"role": "user", "content": "Aufgabe: Test"}]
+
+
+def test_stream_returns_action_and_drains_usage(remote, mock_llm):
+    text, err, info = remote.LLMClient(llm_config(mock_llm)).chat(MESSAGES)
+    assert err is None
+    assert json.loads(text) == {"action": "done", "message": "Mock fertig"}
+    usage = info['usage_later'].result(timeout=5)
+    assert usage['prompt_tokens'] > 0 and usage['completion_tokens'] > 0
+
+
+def test_ledger_amend_replaces_estimate(remote, mock_llm):
+    text, err, info = remote.LLMClient(llm_config(mock_llm)).chat(MESSAGES)
+    ledger = remote.TokenLedger()
+    ledger.start_task()
+    entry = ledger.record(info['usage'], MESSAGES, text)
+    assert entry['estimated'] and ledger.task_estimated
+    assert ledger.amend(entry, info['usage_later'].result(timeout=5))
+    usage = info['usage_later'].result()
+    assert not entry['estimated'] and not ledger.task_estimated
+    assert entry['prompt'] == usage['prompt_tokens'] == ledger.task['prompt'] == ledger.session['prompt']
+    assert not ledger.amend(entry, usage)  # nur einmal
+
+
+def test_amend_after_next_task_only_touches_session(remote):
+    ledger = remote.TokenLedger()
+    entry = ledger.record(None, MESSAGES, "{}")
+    ledger.start_task()
+    ledger.amend(entry, {'prompt_tokens': 1000, 'completion_tokens': 10})
+    assert ledger.task['prompt'] == 0 and ledger.session['prompt'] == 1000
+
+
+def test_no_drain_without_stream(remote, mock_llm):
+    text, err, info = remote.LLMClient(llm_config(mock_llm, stream=False)).chat(MESSAGES)
+    assert info['usage']['prompt_tokens'] > 0 and 'usage_later' not in info
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Makros: match_task, substitute_action, Prüfwerte, TrajectoryLibrary, Abspielen in der Engine"""
+
+import time
+
+import pytest
+
+from conftest import llm_config
+from mock_llm_server import MockLLMServer
+
+
+@pytest.mark.parametrize("stored, new, want", [
+    ("suche nach katzen videos auf youtube", "suche nach hunde videos auf youtube", ("katzen", "hunde")),
+    ("suche nach katzen auf youtube", "suche nach süßen hunden auf youtube", ("katzen", "süßen hunden")),
+    ('öffne "Bericht 2023" in Word', 'Öffne "Bericht 2024" in Word.', ("2023", "2024")),
+    ("Gleiche Aufgabe", "gleiche  aufgabe", ('', '')),
+])
+def test_match_task(remote, stored, new, want):
+    score, old, repl = remote.match_task(stored, new)
+    assert score > 0 and (old, repl) == want
+
+
+@pytest.mark.parametrize("stored, new", [
+    ("suche katzen", "suche hunde"),                       # nur ein gemeinsames Wort
+    ("öffne notepad", "schließe alles sofort jetzt"),
+    ("suche nach katzen", "suche nach katzen und hunden"),  # nur angehängt, nichts ersetzt
+])
+def test_no_match(remote, stored, new):
+    assert remote.match_task(stored, new) == (0.0, None, None)
+
+
+def test_substitute_plain_and_url_encoded(remote):
+    action = {"action": "browser_start", "url": "https://www.youtube.com/results?search_query=katzen+videos",
+              "steps": [{"text": "katzen videos"}], "index": 3}
+    out, hit = remote.substitute_action(action, "katzen videos", "süße hunde")
+    assert hit and out["url"].endswith("search_query=s%C3%BC%C3%9Fe+hunde")
+    assert out["steps"][0]["text"] == "süße hunde" and out["index"] == 3
+    assert remote.substitute_action(action, "", "x") == (action, False)
+
+
+def _steps(*actions):
+    return [{"action": a, "check": None} for a in actions]
+
+
+def test_library_match_and_limits(remote, tmp_path):
+    lib = remote.TrajectoryLibrary(str(tmp_path / "traj.json"), limit=2)
+    lib.add("suche nach katzen videos auf youtube", "",
+            _steps({"action": "playwright_type", "index": 1, "text": "katzen videos"}), 100)
+    lib.add("lösche datei alt.txt im ordner temp", "",
+            _steps({"action": "run_commands", "commands": ["del alt.txt"]}), 100)
+    entry, old, new = lib.match("suche nach hunde videos auf youtube")
+    assert entry and (old, new) == ("katzen", "hunde")
+    # Parameter würde in einen Shell-Befehl wandern → kein Makro
+    assert lib.match("lösche datei neu.txt im ordner temp") == (None, None, None)
+    lib.add("dritte aufgabe ganz anders", "", _steps({"action": "done"}), 10)
+    assert len(lib.items) == 2
+
+
+def test_library_persists(remote, tmp_path):
+    path = str(tmp_path / "traj.json")
+    lib = remote.TrajectoryLibrary(path)
+    lib.add("Aufgabe A", "", _steps({"action": "done"}), 1)
+    remote._BACKGROUND.submit(lambda: None).result()   # Speichern läuft im Hintergrund
+    assert remote.TrajectoryLibrary(path).items[0]["task"] == "Aufgabe A"
+
+
+def test_page_key_and_dom_signature(remote):
+    assert remote.page_key("https://www.youtube.com/results?search_query=katzen") == "www.youtube.com/results"
+    assert remote.page_key("https://example.com/a/") == remote.page_key("https://example.com/a?x=1")
+    assert remote.dom_signature('4 input#q:search "katzen" →/suche') == "4 input#q:search"
+
+
+def test_check_mismatch(remote):
+    assert remote.check_mismatch({'page': 'a.com/x'}, {'page': 'a.com/x'}) is None
+    assert remote.check_mismatch({'page': 'a.com/x'}, {'page': 'b.com'}).startswith("andere Seite")
+    assert remote.check_mismatch({'element': '3 button'}, {}).startswith("anderes Element (fehlt")
+    near = f"{0xff00ff00ff00ff00 ^ 0b111:016x}"                    # 3 Bits anders
+    assert remote.check_mismatch({'screen': "ff00ff00ff00ff00"}, {'screen': near}) is None
+    assert "Bildschirm anders" in remote.check_mismatch({'screen': "ff00ff00ff00ff00"}, {'screen': "00ff00ff00ff00ff"})
+    assert remote.check_mismatch({'screen': "ff00ff00ff00ff00"}, {}) == "kein Screenshot möglich"
+
+
+def test_engine_records_and_replays_macro(remote, tmp_path):
+    engine = remote.AgentEngine(system_prompt="Test", sessions=1)
+    engine.library = remote.TrajectoryLibrary(str(tmp_path / "traj.json"))
+    replies = ['{"action": "wait", "seconds": 0.05}', '{"action": "done", "message": "katzen gemeldet"}']
+
+    def run(cmd):
+        task = engine.submit(cmd, new=True, source='test')
+        t_end = time.time() + 20
+        while engine.busy and time.time() < t_end:
+            time.sleep(0.01)
+        return task
+
+    try:
+        with MockLLMServer(chatter="", replies=replies) as srv:
+            engine.set_config(llm_config(srv, macros=True))
+            assert run("warte kurz und melde katzen bitte")['status'] == 'done'
+            assert len(engine.library.items) == 1 and srv.stats['requests'] == 2
+            task = run("warte kurz und melde hunde bitte")
+            assert task['status'] == 'done' and task['message'] == "hunde gemeldet"
+            assert srv.stats['requests'] == 2                         # ohne LLM abgespielt
+            assert engine.library.items[0]['uses'] == 1
+    finally:
+        engine.close()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Mini-DOM: Zeilenformat und Diffs (ohne Browser), data-rid im Headless-Chromium"""
+
+import os, types
+
+import pytest
+
+PAGE = "<div id='box'><button id='a'>Eins</button><span>Text</span></div>"
+
+
+@pytest.fixture(scope="module")
+def page(remote):
+    if not remote.CAPS.available('playwright'):
+        pytest.skip("playwright nicht installiert")
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        if not os.path.exists(p.chromium.executable_path or ''):
+            pytest.skip("Chromium fehlt (python -m playwright install chromium)")
+        browser = p.chromium.launch()
+        yield browser.new_page()
+        browser.close()
+
+
+def test_cloned_node_gets_own_rid(remote, page):
+    page.set_content(PAGE)
+    page.evaluate(remote.MINI_DOM_INSTALL_JS)
+    first = page.evaluate("window.__miniDom.snapshot(50)")['items']
+    rid = first[0]['id']
+    page.evaluate("""() => {
+        const box = document.getElementById('box');
+        box.prepend(box.cloneNode(true));       // Kopie mit data-rid vor dem Original
+    }""")
+    page.wait_for_timeout(50)                   # MutationObserver läuft als Microtask
+    rids = page.evaluate("[...document.querySelectorAll('[data-rid]')].map(e => e.getAttribute('data-rid'))")
+    assert len(rids) == len(set(rids)) == 2
+    assert page.locator(f'[data-rid="{rid}"]').count() == 1
+    items = page.evaluate("window.__miniDom.diff(50)")
+    assert [i['tag'] for i in items['added']] == ['button']
+
+
+@pytest.mark.parametrize("el, want", [
+    ({'id': 3, 'tag': 'input', 'elid': 'q', 'type': 'search', 'placeholder': 'Suche'}, '3 input#q:search ph="Suche"'),
+    ({'id': 7, 'tag': 'a', 'text': 'Mehr', 'href': 'https://example.com/mehr'}, '7 a "Mehr" →https://example.com/mehr'),
+    ({'id': 9, 'tag': 'select', 'name': 'land'}, '9 select[name=land]'),
+])
+def test_format_dom_element(remote, el, want):
+    assert remote.format_dom_element(el) == want
+
+
+class _Page:
+    def is_closed(self):
+        return False
+
+
+@pytest.fixture
+def helper(remote):
+    h = remote.BrowserHelper()
+    h.page, h.calls = _Page(), []
+    yield h
+    h.page = None
+    h.shutdown()
+
+
+def _answer(h, **replies):
+    def call(method, max_elements):
+        h.calls.append(method)
+        return replies[method]
+    h._mini_dom_call = call
+
+
+def test_delta_diff_same_and_new_document(remote, helper):
+    _answer(helper, snapshot={'doc': 'd1', 'version': 1, 'items': [{'id': 1, 'tag': 'button', 'text': 'OK'}]})
+    assert helper.get_mini_dom() == '1 button "OK"' and helper.dom_version == 1
+    _answer(helper, diff={'doc': 'd1', 'version': 3, 'total': 2, 'removed': [1],
+                          'added': [{'id': 2, 'tag': 'a', 'text': 'Neu'}], 'changed': []})
+    kind, text, n = helper.get_mini_dom_delta()
+    assert (kind, n) == ('diff', 2) and text == 'v1→v3, 2 Elemente:\n+2 a "Neu"\n-1'
+    _answer(helper, diff={'doc': 'd1', 'version': 3, 'total': 2, 'removed': [], 'added': [], 'changed': []})
+    assert helper.get_mini_dom_delta() == ('same', '(v3, 2 Elemente)', 0)
+    _answer(helper, diff={'doc': 'd2', 'version': 1, 'total': 1, 'removed': [], 'added': [], 'changed': []},
+            snapshot={'doc': 'd2', 'version': 1, 'items': [{'id': 1, 'tag': 'button', 'text': 'Los'}]})
+    assert helper.get_mini_dom_delta() == ('full', '1 button "Los"', 1) and helper.calls[-2:] == ['diff', 'snapshot']
+
+
+def test_dom_update_applies_diff_to_known_lines(remote):
+    deltas = [('diff', 'v1→v2, 2 Elemente:\n~1 button "Speichern"\n+4 a "Hilfe"\n-2', 3)]
+    browser = types.SimpleNamespace(has_page=lambda: True, dom_version=1, get_mini_dom=lambda: '1 button "OK"\n2 a "Alt"',
+                                    get_mini_dom_delta=lambda: deltas.pop(0))
+    session = types.SimpleNamespace(browser=browser, dom_base_sent=False, log=lambda t: None)
+    block = remote.AgentSession.dom_update(session)
+    assert block.startswith("\n\n📋 BROWSER-ELEMENTE (v1):") and session.dom_base_sent
+    block = remote.AgentSession.dom_update(session)
+    assert block.startswith("\n\n📋 BROWSER-ELEMENTE GEÄNDERT (v1→v2")
+    assert session.dom_lines == {'1': '1 button "Speichern"', '4': '4 a "Hilfe"'}
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""Mock-LLM-Server: abgebrochene Verbindungen bleiben still"""
+
+import socket, struct, time
+
+
+def test_connection_reset_without_traceback(mock_llm, capsys):
+    host, port = mock_llm.server_address[:2]
+    for _ in range(3):
+        s = socket.create_connection((host, port))
+        s.sendall(b"POST /v1/chat/completions HTTP/1.1\r\nHost: x\r\nContent-Length: 2\r\n\r\n{}")
+        time.sleep(0.05)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))  # RST statt FIN
+        s.close()
+    time.sleep(0.2)
+    assert "Traceback" not in capsys.readouterr().err
+    assert mock_llm.stats['requests'] == 3
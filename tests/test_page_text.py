@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Seitentext: Abschnitte bilden, per BM25 nach der Aufgabe ranken, im Budget auswählen"""
+
+
+def _blocks():
+    return [{'k': 'h', 't': 'Versand', 'h': 'Versand'},
+            {'t': 'Wir liefern in 2-3 Werktagen. ' * 5, 'h': 'Versand'},
+            {'k': 'h', 't': 'Rückgabe', 'h': 'Rückgabe'},
+            {'t': 'Rückgabe innerhalb von 30 Tagen kostenlos. Das Rücksendeetikett liegt bei.', 'h': 'Rückgabe'},
+            {'k': 'h', 't': 'Kontakt', 'h': 'Kontakt'},
+            {'t': 'Telefon 0800 123 456, Mo-Fr 8-18 Uhr.', 'h': 'Kontakt'}]
+
+
+def test_terms_drop_stopwords(remote):
+    assert remote._terms("Wie ist die Rückgabe der Ware?") == ['rückgabe', 'ware']
+
+
+def test_chunks_start_at_headings(remote):
+    chunks = remote.chunk_blocks(_blocks())
+    assert [c['head'] for c in chunks] == ['Versand', 'Rückgabe', 'Kontakt']
+    assert chunks[1]['text'].startswith("Rückgabe\nRückgabe innerhalb")   # Überschrift bleibt bei ihrem Text
+
+
+def test_long_block_is_split(remote):
+    text = "Ein Satz mit Inhalt. " * 100
+    chunks = remote.chunk_blocks([{'t': text.strip(), 'h': 'Lang'}], size=200)
+    assert len(chunks) > 4 and all(len(c['text']) <= 400 for c in chunks)
+    assert all(c['text'].endswith('.') for c in chunks[:-1])             # am Satzende geteilt
+
+
+def test_bm25_ranks_matching_chunk_first(remote):
+    chunks = remote.chunk_blocks(_blocks())
+    scores = remote.bm25_scores(chunks, "Wie funktioniert die Rückgabe?")
+    assert scores.index(max(scores)) == 1 and scores[0] == scores[2] == 0.0
+    assert remote.bm25_scores(chunks, "und oder") == [0.0] * 3
+
+
+def test_select_page_text_budget_and_order(remote):
+    chunks = remote.chunk_blocks(_blocks())
+    text, picked, hits = remote.select_page_text(chunks, "Telefon Kontakt Rückgabe", budget=220)
+    assert (picked, hits) == (2, 2)
+    assert text.startswith("[#2/3] Rückgabe\n") and "\n[#3/3] Kontakt\n" in text   # Dokument-Reihenfolge
+    assert "Werktagen" not in text and len(text) <= 220
+
+
+def test_select_without_hits_keeps_document_start(remote):
+    chunks = remote.chunk_blocks(_blocks())
+    text, picked, hits = remote.select_page_text(chunks, "Aufgabe ohne Treffer xyz", budget=200)
+    assert hits == 0 and picked >= 1 and text.startswith("[#1/3] Versand")
+
+
+def test_heading_shown_when_chunk_does_not_start_with_it(remote):
+    chunks = [{'head': 'Preise', 'text': 'Teil zwei der Tabelle'}]
+    assert remote.select_page_text(chunks, "Tabelle")[0] == "[#1/1 Preise] Teil zwei der Tabelle"
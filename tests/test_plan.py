@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Plan-Modus: mehrere Aktionen pro LLM-Antwort, Stopp bei Vorbedingung/Zieländerung"""
+
+import json, time
+
+import pytest
+from PIL import Image, ImageDraw
+
+from conftest import llm_config
+from mock_llm_server import MockLLMServer
+
+
+class _Script(MockLLMServer):
+    def __init__(self, script):
+        super().__init__(chatter="")
+        self.script, self.seen = script, []
+
+    def reply_for(self, payload):
+        self.seen.append(json.dumps(payload['messages'][-1], ensure_ascii=False))
+        return self.script[min(len(self.seen), len(self.script)) - 1]
+
+
+@pytest.fixture
+def engine(remote):
+    eng = remote.AgentEngine(system_prompt="Test", sessions=1)
+    yield eng
+    eng.close()
+
+
+def _run(engine, srv):
+    engine.set_config(llm_config(srv, macros=False, plan_mode=True))
+    task = engine.submit("zwei befehle", new=True, source='test')
+    t_end = time.time() + 20
+    while engine.busy and time.time() < t_end:
+        time.sleep(0.01)
+    return task
+
+
+def _plan(*steps):
+    return json.dumps({"action": "plan", "steps": list(steps)})
+
+
+def test_plan_runs_all_actions_in_one_call(engine):
+    plan = _plan({"action": "run_commands", "commands": ["echo eins"]},
+                 {"action": "run_commands", "commands": ["echo zwei"]},
+                 {"action": "done", "message": "beide"})
+    with _Script([plan]) as srv:
+        task = _run(engine, srv)
+    session = engine.sessions[0]
+    assert task['status'] == 'done' and task['message'] == "beide" and len(srv.seen) == 1
+    assert session.plan_stats == {'plans': 1, 'actions': 3, 'stopped': 0}
+
+
+def test_failed_precondition_stops_and_reports(engine):
+    plan = _plan({"action": "run_commands", "commands": ["echo eins"], "if": {"url": "example.com"}},
+                 {"action": "done"})
+    with _Script([plan, '{"action": "done", "message": "ok"}']) as srv:
+        task = _run(engine, srv)
+    assert task['status'] == 'done' and engine.sessions[0].plan_stats['stopped'] == 1
+    report = json.loads(srv.seen[1])['content']
+    report = report if isinstance(report, str) else " ".join(p.get('text', '') for p in report)
+    assert "PLAN-ERGEBNIS (0/2 ausgeführt, gestoppt: Vorbedingung: url enthält nicht 'example.com')" in report
+    assert "1. run_commands echo eins → ⏭ nicht ausgeführt" in report
+
+
+def test_target_changed(remote):
+    before = Image.new('L', (400, 300), 50)
+    after = before.copy()
+    ImageDraw.Draw(after).rectangle((300, 200, 399, 299), fill=250)   # Änderung weit weg vom Ziel
+    assert not remote.target_changed(before, after, 100, 100)
+    ImageDraw.Draw(after).rectangle((80, 80, 130, 130), fill=250)     # Dialog über dem Klickziel
+    assert remote.target_changed(before, after, 100, 100)
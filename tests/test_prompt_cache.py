@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Prompt-Cache: stabiler Präfix, flüchtiger Block am Ende, Cache-Hinweise pro Anbieter"""
+
+MESSAGES = [{"role": "system", "content": "System"}, {"role": "user", "content": "Aufgabe: Test"},
+            {"role": "assistant", "content": '{"action": "wait"}'}, {"role": "user", "content": "Weiter."}]
+
+
+def _client(remote, **kw):
+    return remote.LLMClient({'url': 'https://api.example.com/v1', 'api_key': 'k', 'model': 'gpt-4o', **kw})
+
+
+def test_cache_hint_style(remote):
+    assert remote.cache_hint_style({'model': 'anthropic/claude-sonnet-4', 'url': 'https://openrouter.ai/api/v1'}) == 'anthropic'
+    assert remote.cache_hint_style({'model': 'gpt-4o', 'url': 'https://api.openai.com/v1'}) == 'openai'
+    assert remote.cache_hint_style({'model': 'llama3', 'url': 'http://localhost:11434/v1'}) is None
+
+
+def test_volatile_block_after_stable_prefix(remote):
+    msgs = remote._build_llm_messages(MESSAGES, volatile="🖱️ Maus: 1,2", cache_style='anthropic')
+    assert msgs[0]['content'][0]['cache_control'] == {"type": "ephemeral"}
+    assert msgs[1:3] == MESSAGES[1:3]
+    stable, volatile = msgs[-1]['content']
+    assert stable == {"type": "text", "text": "Weiter.", "cache_control": {"type": "ephemeral"}}
+    assert volatile == {"type": "text", "text": "🖱️ Maus: 1,2"}
+
+
+def test_prefix_identical_between_steps(remote):
+    a = remote._build_llm_messages(MESSAGES, volatile="🖱️ Maus: 1,2")
+    b = remote._build_llm_messages(MESSAGES, volatile="🖱️ Maus: 300,400")
+    assert a[:-1] == b[:-1] and a[-1]['content'][0] == b[-1]['content'][0]
+
+
+def test_openai_cache_key_stable_and_off_switch(remote):
+    client = _client(remote, url='https://api.openai.com/v1')
+    key = client.build_payload(MESSAGES)['prompt_cache_key']
+    assert key == client.build_payload(MESSAGES + [{"role": "user", "content": "mehr"}])['prompt_cache_key']
+    client.config['prompt_cache'] = False
+    assert 'prompt_cache_key' not in client.build_payload(MESSAGES)
+
+
+def test_assemble_context_without_cache_merges_state(remote):
+    msgs = [dict(m) for m in MESSAGES]
+    out, volatile, last = remote.assemble_context(msgs, "", "⚠️ Warnung", "\n🖱️ Maus: 1,2", prompt_cache=False)
+    assert volatile is None and out[-1]['content'] == "⚠️ Warnung\nWeiter.\n🖱️ Maus: 1,2"
+    assert last == MESSAGES[-1]
+    out, volatile, _ = remote.assemble_context([dict(m) for m in MESSAGES], "", "", "\n🖱️ Maus: 1,2")
+    assert volatile == "🖱️ Maus: 1,2" and out[-1] == MESSAGES[-1]
+
+
+def test_ledger_reads_cached_tokens(remote):
+    parse = remote.TokenLedger.parse_usage
+    assert parse({'prompt_tokens': 100, 'prompt_tokens_details': {'cached_tokens': 80}})['cached'] == 80
+    assert parse({'prompt_tokens': 100, 'cache_read_input_tokens': 60})['cached'] == 60
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""read_file_slice: Grenzfälle bei Bereich, Anfang/Ende, BOM und UTF-16"""
+
+import pytest
+
+
+@pytest.fixture
+def write(tmp_path):
+    def _write(data, name="datei.txt"):
+        p = tmp_path / name
+        p.write_bytes(data)
+        return str(p)
+    return _write
+
+
+LINES = "".join(f"Zeile {i}\n" for i in range(1, 101)).encode()
+
+
+def test_empty_and_bom_only(remote, write):
+    assert remote.read_file_slice(write(b""))['text'] == ""
+    r = remote.read_file_slice(write(b"\xef\xbb\xbf"))
+    assert r['text'] == "" and r['encoding'].startswith('utf-8')
+
+
+def test_tail_with_and_without_final_newline(remote, write):
+    for data in (LINES, LINES.rstrip(b"\n")):
+        r = remote.read_file_slice(write(data), tail=2)
+        assert r['text'] == "99: Zeile 99\n100: Zeile 100" and r['mode'] == 'ende'
+
+
+def test_tail_longer_than_file(remote, write):
+    r = remote.read_file_slice(write(b"a\nb\n"), tail=10)
+    assert r['text'] == "1: a\n2: b" and r['lines'] == (1, 2)
+
+
+def test_head(remote, write):
+    r = remote.read_file_slice(write(LINES), head=3)
+    assert r['text'].splitlines() == ["1: Zeile 1", "2: Zeile 2", "3: Zeile 3"] and r['truncated']
+
+
+def test_offset_length_and_past_end(remote, write):
+    path = write(LINES)
+    r = remote.read_file_slice(path, offset=len(b"Zeile 1\n"), length=len(b"Zeile 2\n"))
+    assert r['text'] == "2: Zeile 2" and r['mode'] == 'bereich' and r['truncated']
+    r = remote.read_file_slice(path, offset=10 ** 9)
+    assert r['text'] == "" and not r['truncated']
+
+
+def test_limit_truncates(remote, write):
+    r = remote.read_file_slice(write(LINES), limit=50)
+    assert len(r['text']) == 50 and r['truncated']
+
+
+def test_utf16_tail_and_offset_alignment(remote, write):
+    path = write("﻿eins\nzwei\ndrei\n".encode('utf-16-le'), "u16.txt")
+    r = remote.read_file_slice(path, tail=1)
+    assert r['text'] == "3: drei"
+    r = remote.read_file_slice(path, offset=3)   # ungerader Offset → auf Zeichengrenze abrunden
+    assert r['text'] == "1: ins\n2: zwei\n3: drei"
+
+
+def test_grep_with_context(remote, write):
+    r = remote.read_file_slice(write(LINES), grep="Zeile 5$", context=1)
+    assert r['mode'] == 'grep' and r['matches'] == 1
+    assert r['text'].splitlines() == ["4- Zeile 4", "5: Zeile 5", "6- Zeile 6"]
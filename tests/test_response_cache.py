@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""ResponseCache: TTL und LRU-Verdrängung ab max_bytes, Schlüssel und Treffer in LLMClient.chat"""
+
+import time
+
+from conftest import llm_config
+
+
+def _cache(remote, tmp_path, **kw):
+    return remote.ResponseCache(str(tmp_path / "cache.sqlite"), **kw)
+
+
+def test_hit_miss_and_usage(remote, tmp_path):
+    c = _cache(remote, tmp_path)
+    assert c.get("k") is None
+    c.put("k", "m", "antwort", {"prompt_tokens": 3})
+    assert c.get("k") == ("antwort", {"prompt_tokens": 3}) and (c.hits, c.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used(remote, tmp_path):
+    c = _cache(remote, tmp_path, max_bytes=1200)   # vier Einträge passen, der fünfte verdrängt
+    for k in "abcd":
+        c.put(k, "m", "x" * 200)
+        time.sleep(0.01)
+    c.get("a")                      # a wieder benutzt → b ist am längsten unbenutzt
+    time.sleep(0.01)
+    c.put("e", "m", "x" * 200)
+    assert c.get("b") is None and c.get("a") and c.get("e")
+    assert c.size <= 1200 * 0.9
+    assert c.size == c.db.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+
+
+def test_replace_keeps_size_and_ttl_expires(remote, tmp_path):
+    c = _cache(remote, tmp_path, ttl=0.05)
+    c.put("k", "m", "eins")
+    c.put("k", "m", "zwei")
+    assert c.size == c.db.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+    time.sleep(0.1)
+    assert c.get("k") is None and c.size == 0
+
+
+def _payload(remote, messages, ss_b64=None, volatile=None, **cfg):
+    client = remote.LLMClient({'url': 'http://mock/v1', 'api_key': 'k', 'model': 'm', **cfg})
+    return client.build_payload(messages, ss_b64, volatile)
+
+
+MESSAGES = [{"role": "system", "content": "System"}, {"role": "user", "content": "Aufgabe: Test"}]
+
+
+def test_key_ignores_layout_whitespace_and_mouse(remote):
+    key = remote.response_cache_key
+    base = key(_payload(remote, MESSAGES, volatile="🖱️ Maus: 10,20 | Bildschirm"))
+    assert key(_payload(remote, MESSAGES, volatile="🖱️ Maus: 300,4  |  Bildschirm", stream=False)) == base
+    merged = [MESSAGES[0], {"role": "user", "content": "Aufgabe: Test 🖱️ Maus: 1,2 | Bildschirm"}]
+    assert key(_payload(remote, merged, prompt_cache=False)) == base            # ein Block statt zwei
+    assert key(_payload(remote, MESSAGES, volatile="🖱️ Maus: 10,20 | Bildschirm", model='n')) != base
+    img = key(_payload(remote, MESSAGES, "data:image/jpeg;base64,AAAA"))
+    assert img != key(_payload(remote, MESSAGES, "data:image/jpeg;base64,BBBB"))
+
+
+def test_chat_served_from_cache(remote, mock_llm, tmp_path, monkeypatch):
+    monkeypatch.setattr(remote, '_RESPONSE_CACHE', _cache(remote, tmp_path))
+    client = remote.LLMClient(llm_config(mock_llm, response_cache=True))
+    first = client.chat(MESSAGES, volatile="🖱️ Maus: 1,1")
+    second = client.chat(MESSAGES, volatile="🖱️ Maus: 9,9")
+    assert first[1] is None and second[0] == first[0]
+    assert second[2]['cached'] and second[2]['usage']['total_tokens'] == 0
+    assert mock_llm.stats['requests'] == 1
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Screenshots: einmal kodieren in Modellgröße, Änderungserkennung (FrameDiffer), Bild- → Bildschirmkoordinaten"""
+
+import base64, os, time, types
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+
+def _screen(size=(2560, 1440), color=(40, 40, 40)):
+    return Image.new('RGB', size, color)
+
+
+@pytest.mark.parametrize("fmt, mime, magic", [('JPEG', 'image/jpeg', b'\xff\xd8'), ('jpg', 'image/jpeg', b'\xff\xd8'),
+                                              ('PNG', 'image/png', b'\x89PNG'), ('bmp', 'image/png', b'\x89PNG')])
+def test_encode_image_formats(remote, fmt, mime, magic):
+    data, got, scale = remote.encode_image(_screen(), fmt, 80, 1568)
+    assert got == mime and data.startswith(magic)
+    assert scale == pytest.approx(1568 / 2560)
+    assert Image.open(BytesIO(data)).size == (1568, 882)
+
+
+def test_encode_image_keeps_small_images(remote):
+    data, _, scale = remote.encode_image(_screen((800, 600)), 'PNG', 80, 1568)
+    assert scale == 1.0 and Image.open(BytesIO(data)).size == (800, 600)
+
+
+def test_take_screenshot_meta(remote):
+    b64, path, img, meta = remote.take_screenshot(1280, 'JPEG', 70, save=False, clipboard=False, img=_screen())
+    assert path is None and img.size == (2560, 1440)
+    assert meta['size'] == (1280, 720) and meta['scale'] == 0.5 and meta['mime'] == 'image/jpeg'
+    assert meta['bytes'] == len(base64.b64decode(b64))
+
+
+def test_take_screenshot_saves_in_background(remote):
+    b64, path, _, _ = remote.take_screenshot(800, 'PNG', save=True, clipboard=False, img=_screen())
+    want, t_end = base64.b64decode(b64), time.time() + 5
+    try:
+        while not (os.path.exists(path) and os.path.getsize(path) == len(want)) and time.time() < t_end:
+            time.sleep(0.01)
+        with open(path, 'rb') as f:
+            assert f.read() == want
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def test_screenshot_note(remote):
+    assert remote.screenshot_note({'size': (1280, 720), 'scale': 1.0}, (1280, 720)) == \
+        "📸 Screenshot 1280x720 = Bildschirm-Koordinaten"
+    note = remote.screenshot_note({'size': (1280, 720), 'scale': 0.5}, (2560, 1440))
+    assert "1280x720" in note and "2560x1440" in note and "÷" not in note
+
+
+@pytest.mark.parametrize("ss_map, xy, want", [((0, 0, 1.0), (10, 20), (10, 20)), ((0, 0, 0.5), (640, 360), (1280, 720)),
+                                              ((0, 0, 0.5), (None, 5), (None, None))])
+def test_to_screen(remote, ss_map, xy, want):
+    session = types.SimpleNamespace(ss_map=ss_map)
+    assert remote.AgentSession.to_screen(session, *xy) == want
+
+
+def _differ(remote, img):
+    d = remote.FrameDiffer()
+    d.update(img)
+    return d
+
+
+def test_first_frame_full_then_unchanged(remote):
+    d = remote.FrameDiffer()
+    img = _screen((1280, 720))
+    assert d.compare(img)[:2] == ('full', None)
+    d.update(img)
+    assert d.compare(img.copy())[:2] == ('unchanged', None)
+
+
+def test_small_change_gives_region_box(remote):
+    img = _screen((1280, 720))
+    d = _differ(remote, img)
+    changed = img.copy()
+    changed.paste((250, 250, 250), (300, 200, 340, 230))
+    kind, box, _, _ = d.compare(changed)
+    assert kind == 'region'
+    x0, y0, x1, y1 = box
+    assert x0 <= 300 and y0 <= 200 and x1 >= 340 and y1 >= 230           # ganze Änderung drin
+    assert (x0, y0) == (x0 // 128 * 128, y0 // 128 * 128) and x1 - x0 <= 256  # auf Kacheln gerundet
+
+
+def test_large_change_or_new_size_is_full(remote):
+    img = _screen((1280, 720))
+    d = _differ(remote, img)
+    assert d.compare(_screen((1280, 720), (200, 200, 200)))[:2] == ('full', None)
+    assert d.compare(_screen((1920, 1080)))[:2] == ('full', None)
+    d.reset()
+    assert d.compare(img)[0] == 'full'
+
+
+def test_region_click_maps_back_to_screen(remote):
+    # Ausschnitt ab 256,128 unverkleinert gesendet: Bildpunkt 10,20 → Bildschirm 266,148
+    session = types.SimpleNamespace(ss_map=(256, 128, 1.0))
+    assert remote.AgentSession.to_screen(session, 10, 20) == (266, 148)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Task-API: WebSocket-Frames und Abbrechen über den Ereignis-Strom"""
+
+import base64, io, json, os, socket, time
+
+import pytest
+
+from conftest import llm_config
+from mock_llm_server import MockLLMServer
+
+
+def _client_frame(data, opcode=0x1):
+    """Client-Frame wie ein Browser: immer maskiert"""
+    data = data.encode('utf-8') if isinstance(data, str) else data
+    n, mask = len(data), os.urandom(4)
+    if n < 126:
+        head = bytes([0x80 | opcode, 0x80 | n])
+    elif n < 1 << 16:
+        head = bytes([0x80 | opcode, 0x80 | 126]) + n.to_bytes(2, 'big')
+    else:
+        head = bytes([0x80 | opcode, 0x80 | 127]) + n.to_bytes(8, 'big')
+    return head + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+
+
+@pytest.mark.parametrize("size", [0, 125, 126, 65535, 65536])
+def test_frame_round_trip(remote, size):
+    data = bytes(i % 251 for i in range(size))
+    assert remote._ws_read_frame(io.BytesIO(remote._ws_frame(data, 0x2))) == (0x2, data)
+    assert remote._ws_read_frame(io.BytesIO(_client_frame(data, 0x2))) == (0x2, data)
+
+
+def test_frame_text_and_limits(remote):
+    assert remote._ws_read_frame(io.BytesIO(remote._ws_frame("ä€"))) == (0x1, "ä€".encode())
+    assert remote._ws_read_frame(io.BytesIO(b"\x81")) is None                        # Verbindung zu
+    big = bytes([0x82, 127]) + (remote.WS_MAX_FRAME + 1).to_bytes(8, 'big')
+    assert remote._ws_read_frame(io.BytesIO(big)) is None
+
+
+class _WS:
+    def __init__(self, remote, api):
+        self.remote = remote
+        host, port = api.server_address[:2]
+        self.sock = socket.create_connection((host, port), timeout=10)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall((f"GET /api/ws?token={api.token} HTTP/1.1\r\nHost: x\r\nUpgrade: websocket\r\n"
+                           f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        self.rfile = self.sock.makefile('rb')
+        assert b" 101 " in self.rfile.readline()
+        while self.rfile.readline() not in (b"\r\n", b""):
+            pass
+
+    def send(self, obj):
+        self.sock.sendall(_client_frame(json.dumps(obj)))
+
+    def wait_for(self, pred, timeout=10):
+        t_end = time.time() + timeout
+        while time.time() < t_end:
+            opcode, data = self.remote._ws_read_frame(self.rfile)
+            if opcode == 0x1:
+                ev = json.loads(data)
+                if pred(ev):
+                    return ev
+        raise AssertionError("Ereignis kam nicht")
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def api(remote):
+    with MockLLMServer(latency=0.5, chatter="", reply='{"action": "wait", "seconds": 0.1}') as srv:
+        engine = remote.AgentEngine(system_prompt="Test", sessions=1)
+        engine.set_config(llm_config(srv, macros=False))
+        server = remote.TaskAPIServer(engine, port=0).start()
+        yield server
+        engine.cancel()
+        server.stop()
+        engine.close()
+
+
+def test_ws_cancel_with_string_id(remote, api):
+    ws = _WS(remote, api)
+    try:
+        ws.send({"submit": "erste"})
+        first = ws.wait_for(lambda ev: ev['type'] == 'submitted')['task']
+        ws.send({"submit": "zweite"})
+        second = ws.wait_for(lambda ev: ev['type'] == 'submitted')['task']
+        ws.send({"cancel": str(second)})                    # JS-Clients schicken ids oft als Text
+        ws.wait_for(lambda ev: ev['type'] == 'task' and ev['task'] == second and ev['status'] == 'cancelled')
+        assert api.engine.tasks[second]['status'] == 'cancelled'
+        ws.send({"cancel": "keine-zahl"})
+        assert "nichts abzubrechen" in ws.wait_for(lambda ev: ev['type'] == 'error')['error']
+        ws.send({"cancel": str(first)})
+        ws.wait_for(lambda ev: ev['type'] == 'task' and ev['task'] == first and ev['status'] == 'cancelled')
+    finally:
+        ws.close()
+
+
+def test_single_session_by_default(remote):
+    engine = remote.AgentEngine(system_prompt="Test")
+    try:
+        assert len(engine.sessions) == 1
+    finally:
+        engine.close()
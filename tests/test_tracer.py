@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Tracer: Zeitspannen pro Schritt, Profil-Tabelle und Chrome-Trace-Export"""
+
+import json, os, threading, time
+
+
+def test_spans_and_summary(remote):
+    tr = remote.Tracer()
+    with tr.span("LLM", 'llm', attempts=1) as args:
+        time.sleep(0.02)
+        args['tokens'] = 42                          # Aufrufer ergänzt args
+    t = time.perf_counter()
+    tr.add("Aktion click", t, t + 0.005, 'action')
+    tr.add("Aktion click", t, t + 0.001, 'action')
+    tr.finish()
+    rows = {r[0]: r for r in tr.summary()}
+    assert tr.summary()[0][0] == "LLM"               # nach Gesamtzeit sortiert
+    assert rows["LLM"][1] == 1 and rows["LLM"][2] >= 0.02
+    name, n, total, avg, mx, pct = rows["Aktion click"]
+    assert n == 2 and abs(total - 0.006) < 1e-5 and abs(avg - 3.0) < 0.01 and abs(mx - 5.0) < 0.01
+    assert 0 < pct <= 100
+    assert tr.table().startswith("⏱️ PROFIL") and "Aktion click" in tr.table()
+    assert next(e for e in tr.events if e['name'] == "LLM")['args'] == {'attempts': 1, 'tokens': 42}
+
+
+def test_chrome_trace_has_thread_names(remote):
+    tr = remote.Tracer()
+    t = threading.Thread(target=lambda: tr.add("Hintergrund", tr.t0, tr.t0 + 0.001), name='bg-test')
+    t.start(), t.join()
+    tr.add("Vorne", tr.t0, tr.t0 + 0.002)
+    trace = json.loads(json.dumps(tr.to_chrome()))
+    names = {e['args']['name'] for e in trace['traceEvents'] if e['ph'] == 'M'}
+    assert 'bg-test' in names and trace['displayTimeUnit'] == 'ms'
+    spans = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+    assert [e['dur'] for e in spans] == [1000, 2000] and all(e['ts'] == 0 for e in spans)
+
+
+def test_reset_clears_events(remote):
+    tr = remote.Tracer()
+    tr.add("x", tr.t0, tr.t0 + 0.001)
+    tr.reset()
+    assert tr.events == [] and tr.summary() == [] and tr.table() == ""
+
+
+def test_write_chrome_trace_keeps_newest(remote, tmp_path):
+    for i in range(5):
+        remote.write_chrome_trace(str(tmp_path / f"trace_{i:03d}.json"), {'traceEvents': [], 'n': i}, keep=3)
+    assert sorted(os.listdir(tmp_path)) == ['trace_002.json', 'trace_003.json', 'trace_004.json']
+    assert json.loads((tmp_path / 'trace_004.json').read_text(encoding='utf-8'))['n'] == 4
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Warten auf echte Signale: ruhiger Bildschirm (wait_screen_stable), DevTools-Endpunkt (wait_for_cdp)"""
+
+import socket, threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from PIL import Image, ImageDraw
+
+
+def _frame(shade=0, dot=None, box=None):
+    img = Image.new('L', (120, 80), shade)
+    if dot:
+        img.putpixel(dot, 255)                       # blinkender Cursor: ein Pixel
+    if box:
+        ImageDraw.Draw(img).rectangle(box, fill=255)
+    return img
+
+
+@pytest.fixture
+def frames(remote, monkeypatch):
+    seq = []
+
+    def thumb():
+        return seq.pop(0) if len(seq) > 1 else seq[0]
+    monkeypatch.setattr(remote, '_screen_thumb', thumb)
+    return seq
+
+
+def test_stable_screen_returns_after_settle(remote, frames):
+    frames.append(_frame())
+    ok, t, changed = remote.wait_screen_stable(timeout=1.0, settle=0.1, interval=0.01)
+    assert ok and not changed and 0.1 <= t < 0.5
+
+
+def test_waits_for_expected_change(remote, frames):
+    frames += [_frame()] * 5 + [_frame(box=(10, 10, 60, 40))]
+    ok, t, changed = remote.wait_screen_stable(timeout=2.0, settle=0.05, expect_change=1.0, interval=0.01)
+    assert ok and changed and t < 1.0                 # Fenster da → nicht bis expect_change warten
+
+
+def test_cursor_blink_is_not_a_change(remote, frames):
+    frames += [_frame(dot=(5, 5)), _frame(), _frame(dot=(5, 5)), _frame()]
+    ok, _, changed = remote.wait_screen_stable(timeout=1.0, settle=0.05, interval=0.01)
+    assert ok and not changed
+
+
+def test_restless_screen_times_out(remote, frames):
+    frames += [_frame(shade=(i % 2) * 200) for i in range(200)]
+    ok, t, changed = remote.wait_screen_stable(timeout=0.3, settle=0.1, interval=0.01)
+    assert not ok and changed and t >= 0.3
+
+
+def test_no_screen_gives_up_at_once(remote, monkeypatch):
+    def broken():
+        raise OSError("kein Display")
+    monkeypatch.setattr(remote, '_screen_thumb', broken)
+    assert remote.wait_screen_stable() == (False, 0.0, False)
+
+
+class _DevTools(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.path == '/json/version' else 404)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+def test_wait_for_cdp(remote):
+    srv = HTTPServer(('127.0.0.1', 0), _DevTools)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        ok, t = remote.wait_for_cdp(srv.server_address[1], timeout=2.0)
+        assert ok and t < 1.0
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]                     # danach frei, niemand hört zu
+    ok, t = remote.wait_for_cdp(port, timeout=0.2, interval=0.02)
+    assert not ok and t >= 0.2
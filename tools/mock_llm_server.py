@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lokaler OpenAI-kompatibler Mock-Server für Offline-Tests und Benchmarks.
+
+- POST .../chat/completions (mit und ohne "stream": true)
+- Keep-Alive (HTTP/1.1) und Zählung der TCP-Verbindungen
+- Simulierte Latenz, Token-Tempo, Geplapper nach dem JSON
+- --first-token-delay: Header sofort, erstes Token erst später (langsamer Prefill,
+  zum Testen des Hedgings)
+- Künstliche 429/503-Fehler mit Retry-After
+- --break-every: jeder n-te Stream reißt nach dem ersten Stück ab (ohne
+  Abschluss-Chunk → ChunkedEncodingError beim Client)
+- Tool-Calling: bei "tools" im Request kommt eine JSON-Antwort als tool_calls
+  zurück (--reject-tools simuliert einen Anbieter ohne tools → 400)
+
+Start:     python tools/mock_llm_server.py --port 8011
+Benchmark: python tools/mock_llm_server.py --bench 30 --latency 0.05 --fail-every 5
+LLM-Datei: URL: http://127.0.0.1:8011/v1
+"""
+
+import argparse, json, os, ssl, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = '{"action": "done", "message": "Mock fertig"}'
+DEFAULT_CHATTER = "\n\nIch habe die Aufgabe erledigt. " * 20
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-Alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.stats['connections'] += 1
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status, obj, extra_headers=None):
+        body = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (extra_headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-model", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            self._send_json(400, {"error": "invalid json"})
+            return
+
+        srv = self.server
+        with srv.lock:
+            srv.stats['requests'] += 1
+            n = srv.stats['requests']
+        if srv.fail_every and n % srv.fail_every == 0:
+            with srv.lock:
+                srv.stats['failures'] += 1
+            self._send_json(srv.fail_status, {"error": {"message": "rate limited (mock)"}},
+                            {"Retry-After": str(srv.retry_after)})
+            return
+
+        if payload.get("tools") and srv.reject_tools:
+            self._send_json(400, {"error": {"message": "tools not supported (mock)"}})
+            return
+
+        time.sleep(srv.latency)
+        reply = srv.reply_for(payload)
+        calls = _tool_calls(reply) if payload.get("tools") else None
+        text = "" if calls else reply + srv.chatter
+        prompt_tokens = len(raw) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(text or reply) // 4,
+                 "total_tokens": prompt_tokens + len(text or reply) // 4}
+        if payload.get("stream"):
+            self._stream(text, usage, calls, broken=bool(srv.break_every and n % srv.break_every == 0))
+        else:
+            message = {"role": "assistant", "content": text or None}
+            if calls:
+                message["tool_calls"] = calls
+            self._send_json(200, {"id": f"mock-{n}", "object": "chat.completion", "model": payload.get("model"),
+                                  "choices": [{"index": 0, "finish_reason": "tool_calls" if calls else "stop",
+                                               "message": message}],
+                                  "usage": usage})
+
+    def _stream(self, text, usage, calls=None, broken=False):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        srv = self.server
+        try:
+            if srv.first_token_delay:
+                # Wie echte Anbieter: Rolle sofort, der Inhalt kommt erst nach dem Prefill
+                self._chunk({"choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}}]})
+                time.sleep(srv.first_token_delay)
+            for i in range(0, len(text), srv.chunk_size):
+                piece = text[i:i + srv.chunk_size]
+                self._chunk({"choices": [{"index": 0, "delta": {"content": piece}}]})
+                if broken:
+                    # Verbindung mitten im Stream kappen, ohne den 0-Chunk
+                    with srv.lock:
+                        srv.stats['failures'] += 1
+                    self.close_connection = True
+                    return
+                time.sleep(srv.token_delay)
+            for k, call in enumerate(calls or ()):
+                # Name zuerst, dann die Argumente stückweise – wie die echten Anbieter
+                fn = call["function"]
+                self._chunk({"choices": [{"index": 0, "delta": {"tool_calls": [
+                    {"index": k, "id": call["id"], "type": "function", "function": {"name": fn["name"], "arguments": ""}}]}}]})
+                for i in range(0, len(fn["arguments"]), srv.chunk_size):
+                    self._chunk({"choices": [{"index": 0, "delta": {"tool_calls": [
+                        {"index": k, "function": {"arguments": fn["arguments"][i:i + srv.chunk_size]}}]}}]})
+            self._chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage})
+            self._raw_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client hat nach dem ersten JSON-Objekt abgebrochen – genau das wollen wir
+            with srv.lock:
+                srv.stats['cancelled_streams'] += 1
+            self.close_connection = True
+
+    def _chunk(self, obj):
+        self._raw_chunk(b"data: " + json.dumps(obj).encode('utf-8') + b"\n\n")
+
+    def _raw_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def _tool_calls(reply):
+    """Antwort-JSON → tool_calls; ein Plan wird zu mehreren Calls, Nicht-JSON bleibt Text"""
+    try:
+        data = json.loads(reply)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not data.get("action"):
+        return None
+    actions = data["steps"] if data["action"] == "plan" and isinstance(data.get("steps"), list) else [data]
+    return [{"id": f"call_{k}", "type": "function",
+             "function": {"name": a.get("action"), "arguments": json.dumps({x: v for x, v in a.items() if x != "action"})}}
+            for k, a in enumerate(actions)]
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, token_delay=0.0, chunk_size=8,
+                 reply=DEFAULT_REPLY, chatter=DEFAULT_CHATTER, replies=None,
+                 fail_every=0, fail_status=429, retry_after=0.2, certfile=None, keyfile=None, verbose=False,
+                 reject_tools=False, first_token_delay=0.0, break_every=0):
+        super().__init__((host, port), _Handler)
+        self.latency, self.token_delay, self.chunk_size = latency, token_delay, max(1, chunk_size)
+        self.reply, self.chatter, self.replies = reply, chatter, list(replies or [])
+        self.fail_every, self.fail_status, self.retry_after = fail_every, fail_status, retry_after
+        self.verbose, self.reject_tools, self.first_token_delay = verbose, reject_tools, first_token_delay
+        self.break_every = break_every
+        self.lock = threading.Lock()
+        self.stats = {'connections': 0, 'requests': 0, 'failures': 0, 'cancelled_streams': 0}
+        self.scheme = "http"
+        if certfile:
+            ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            ctx.load_cert_chain(certfile, keyfile)
+            self.socket = ctx.wrap_socket(self.socket, server_side=True)
+            self.scheme = "https"
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        """Vom Client gekappte Verbindungen (Abbruch nach dem JSON, Hedging) ohne Traceback"""
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"{self.scheme}://{host}:{port}/v1"
+
+    def reply_for(self, payload):
+        """Feste Antworten der Reihe nach, danach die Standardantwort"""
+        with self.lock:
+            return self.replies.pop(0) if self.replies else self.reply
+
+    def reset_stats(self):
+        with self.lock:
+            for k in self.stats:
+                self.stats[k] = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def run_benchmark(server, n, stream):
+    """Vergleicht nacktes requests.post pro Schritt mit dem gepoolten LLMClient"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from remote_module import load_remote_module
+    import requests
+    remote = load_remote_module()
+
+    config = {'url': server.url, 'api_key': 'mock', 'model': 'mock-model', 'stream': stream,
+              'rpm': 100000, 'token_price': 0}
+    messages = [{"role": "system", "content": "Mock"}, {"role": "user", "content": "Aufgabe: Test"}]
+    payload = {"model": "mock-model", "messages": messages, "max_tokens": 4000, "temperature": 0}
+    results = {}
+
+    server.reset_stats()
+    t0, ok = time.perf_counter(), 0
+    for _ in range(n):
+        try:
+            r = requests.post(config['url'] + '/chat/completions', json=payload, timeout=90,
+                              headers={"Authorization": "Bearer mock"})
+            ok += r.status_code == 200
+        except requests.RequestException:
+            pass
+    results['requests.post'] = dict(server.stats, seconds=time.perf_counter() - t0, ok=ok)
+
+    server.reset_stats()
+    client = remote.LLMClient(config)
+    t0, ok = time.perf_counter(), 0
+    for _ in range(n):
+        text, err, _ = client.chat(messages)
+        ok += text is not None
+    client.close()
+    results['LLMClient'] = dict(server.stats, seconds=time.perf_counter() - t0, ok=ok)
+
+    for name, r in results.items():
+        print(f"{name:14s} {r['seconds']:7.3f}s  ok={r['ok']}/{n}  Verbindungen={r['connections']}  "
+              f"Anfragen={r['requests']}  Fehler(inj.)={r['failures']}  abgebrochen={r['cancelled_streams']}")
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="OpenAI-kompatibler Mock-LLM-Server")
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8011)
+    ap.add_argument('--latency', type=float, default=0.0, help="Sekunden bis zum ersten Byte")
+    ap.add_argument('--token-delay', type=float, default=0.0, help="Sekunden pro Stream-Stück")
+    ap.add_argument('--first-token-delay', type=float, default=0.0, help="Stream: Sekunden zwischen Header und erstem Token")
+    ap.add_argument('--reply', default=DEFAULT_REPLY)
+    ap.add_argument('--no-chatter', action='store_true', help="Kein Text nach dem JSON")
+    ap.add_argument('--fail-every', type=int, default=0, help="Jede n-te Anfrage mit Fehler beantworten")
+    ap.add_argument('--fail-status', type=int, default=429)
+    ap.add_argument('--retry-after', type=float, default=0.2)
+    ap.add_argument('--break-every', type=int, default=0, help="Jeden n-ten Stream nach dem ersten Stück abreißen")
+    ap.add_argument('--cert'), ap.add_argument('--key')
+    ap.add_argument('--reject-tools', action='store_true', help="Requests mit tools mit 400 ablehnen")
+    ap.add_argument('--bench', type=int, default=0, help="n Anfragen: requests.post vs. LLMClient")
+    ap.add_argument('--stream', action='store_true', help="Benchmark mit Streaming")
+    ap.add_argument('-v', '--verbose', action='store_true')
+    a = ap.parse_args(argv)
+
+    server = MockLLMServer(a.host, 0 if a.bench else a.port, a.latency, a.token_delay, reply=a.reply,
+                           chatter="" if a.no_chatter else DEFAULT_CHATTER, fail_every=a.fail_every,
+                           fail_status=a.fail_status, retry_after=a.retry_after,
+                           certfile=a.cert, keyfile=a.key, verbose=a.verbose, reject_tools=a.reject_tools,
+                           first_token_delay=a.first_token_delay, break_every=a.break_every)
+    if a.bench:
+        with server:
+            run_benchmark(server, a.bench, a.stream)
+        return
+    print(f"Mock-LLM läuft auf {server.url}  (Strg+C beendet)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
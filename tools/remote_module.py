@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lädt das Hauptskript (Dateiname mit Leerzeichen) als Modul "remote",
+damit Werkzeuge und Benchmarks dieselben Funktionen nutzen wie die GUI.
+"""
+
+import glob, importlib.util, os, sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def find_remote_script():
+    hits = sorted(glob.glob(os.path.join(REPO_DIR, "Remote V42*.py")))
+    if not hits:
+        raise FileNotFoundError(f"Hauptskript 'Remote V42*.py' nicht gefunden in {REPO_DIR}")
+    return hits[-1]
+
+
+def load_remote_module(name="remote"):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, find_remote_script())
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module